@@ -153,7 +153,12 @@ def make_args_parser():
                              help=f"FLM content to parse and convert.  One of "
                              f"html,text,markdown,latex or a "
                              "fully specified module or class name defining a "
-                             "FragmentRenderer subclass.")
+                             "FragmentRenderer subclass.  Specify several formats "
+                             "separated by commas (e.g. ‘-f html,latex,markdown’) to "
+                             "render the document to each of these formats, parsing "
+                             "it only once where their configurations allow; the "
+                             "output files are then named by adding the format's "
+                             "extension to the --output name.")
 
     args_parser.add_argument('-w', '--workflow', action='store',
                              default=None,
@@ -277,6 +282,8 @@ def _run_main_inner(cmdargs=None):
     #
 
     if args.view:
+        if args.format is not None and ',' in args.format:
+            raise ValueError("You cannot use --view with multiple output formats")
         if not args.output or args.output == '-':
             raise ValueError("You cannot use --view without --output")
         flm_main_oshelper.os_open_file(args.output)
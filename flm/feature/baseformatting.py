@@ -25,6 +25,8 @@ class NoExtraSpaceAfterDotMacro(FLMMacroSpecBase):
 
     allowed_in_standalone_mode = True
 
+    _fields = ('macroname', )
+
     def render(self, node, render_context):
         r"""
         Render the ``\@`` macro.
@@ -1,13 +1,21 @@
 r"""
 Provides the ``\begin{cells}...\end{cells}`` environment for typesetting data
-tables.  Cells can be placed individually with ``\cell`` or in bulk with
-``\celldata``; merging across rows or columns is supported via ``\merge``.
+tables.  Cells can be placed individually with ``\cell``, in bulk with
+``\celldata``, or loaded from an external CSV/TSV file with ``\celldatafile``;
+merging across rows or columns is supported via ``\merge``.
 The cell grid model is built at parse time and rendered to HTML tables or
 LaTeX ``tblr`` environments.
 """
 
 import re
 
+### BEGINPATCH_CELLS_INDEX_GRID
+import array
+def _make_cells_index_grid(size):
+    # compact int32 storage for the grid of cell indices, initialized to -1
+    return array.array('i', [-1]) * size
+### ENDPATCH_CELLS_INDEX_GRID
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -136,6 +144,21 @@ class CelldataMacroSpec(macrospec.MacroSpec):
             _macro_args['celldata_contents'],
         ])
 
+_macro_args['celldata_file'] = LatexArgumentSpec(
+    latexnodes_parsers.LatexCharsGroupParser(
+        delimiters=('{','}'),
+    ),
+    argname='celldata_file',
+)
+
+class CelldatafileMacroSpec(macrospec.MacroSpec):
+    def __init__(self, macroname='celldatafile',):
+        super().__init__(macroname, arguments_spec_list=[
+            _macro_args['styles_mapping'],
+            _macro_args['placement_mapping'],
+            _macro_args['celldata_file'],
+        ])
+
 
 # ------------------
 
@@ -191,33 +214,124 @@ class CellPlacementModel:
 class CellModel:
     r"""
     Represents a single cell within a ``cells`` environment, combining its
-    grid placement, style annotations, and content nodes.
+    grid placement, style annotations, and content.
+
+    A cell's content is either a parsed node list (:attr:`content_nodes`) or,
+    for plain-text values loaded from an external data file, a raw string
+    (:attr:`content_value`, with :attr:`content_nodes` set to `None`) that
+    renderers output directly via ``fragment_renderer.render_value()``.
     """
-    def __init__(self, placement, styles, content_nodes):
+    def __init__(self, placement, styles, content_nodes, content_value=None):
         r"""
         :param placement: A :class:`CellPlacementModel` specifying the cell's
             row and column span.
         :param styles: A list of style annotation strings (e.g. from the
             ``<...>`` argument of ``\cell``).
-        :param content_nodes: A ``LatexNodeList`` containing the cell body.
+        :param content_nodes: A ``LatexNodeList`` containing the cell body, or
+            `None` if the cell holds a plain-text `content_value`.
+        :param content_value: A plain-text string to render as the cell
+            contents if `content_nodes` is `None`.
         """
         super().__init__()
         self.placement = placement
         self.styles = styles
         self.content_nodes = content_nodes
+        self.content_value = content_value
 
-    _fields = ('placement', 'styles', 'content_nodes',)
+    _fields = ('placement', 'styles', 'content_nodes', 'content_value',)
 
     def __repr__(self):
+        if self.content_nodes is not None:
+            content_s = _splfysidews(self.content_nodes.latex_verbatim())
+        else:
+            content_s = self.content_value
         return (
             f"<Cell @{repr(self.placement)} <{' '.join(self.styles)}> "
-            f"(‘{_splfysidews(self.content_nodes.latex_verbatim())}’)>"
+            f"(‘{content_s}’)>"
         )
 
 def _splfysidews(s):
     # simplify white space on the sides
     return re.sub(r'(^\s+|\s+$)', ' ', s)
 
+
+# ------------------
+
+
+# Values that contain any of these can't be rendered as-is: they might contain
+# FLM markup or be subject to FLM's text processing (whitespace
+# simplification, automatic quotes, ligatures).
+_rx_cell_value_needs_parsing = re.compile(
+    r'''[\\{}$%&#^_~"'`\t\n]|\s\s|--|\.\.\.'''
+)
+
+def _can_store_plain_cell_values(latex_context):
+    # Plain values can only be stored without parsing them if any value that
+    # contains one of the specials defined in this context is caught by
+    # _rx_cell_value_needs_parsing (e.g., not if custom specials were defined
+    # with the substmacros feature).
+    for specials_spec in latex_context.iter_specials_specs():
+        if _rx_cell_value_needs_parsing.search(specials_spec.specials_chars) is None:
+            return False
+    return True
+
+def _split_cells_data_file_contents(data, delimiter, quoting=True):
+    r"""
+    Split the contents of a CSV (or TSV) data file into a list of rows, each
+    row being a list of string values.
+
+    If `quoting` is true, a field may be enclosed in double quotes, in which
+    case it can contain the delimiter, line breaks, or doubled double quotes
+    (``""``) that stand for a literal double quote.  Blank lines are ignored.
+    """
+    lines = data.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    rows = []
+    j = 0
+    while j < len(lines):
+        line = lines[j]
+        j += 1
+        if len(line.strip()) == 0:
+            continue
+        if not quoting or '"' not in line:
+            # fast path -- no quoted fields on this line
+            rows.append(line.split(delimiter))
+            continue
+        row = []
+        field = []
+        in_quotes = False
+        i = 0
+        while True:
+            if i >= len(line):
+                if in_quotes and j < len(lines):
+                    # quoted field continues on the next line
+                    field.append('\n')
+                    line = lines[j]
+                    j += 1
+                    i = 0
+                    continue
+                break
+            c = line[i]
+            if in_quotes:
+                if c == '"':
+                    if i + 1 < len(line) and line[i+1] == '"':
+                        field.append('"')
+                        i += 2
+                        continue
+                    in_quotes = False
+                else:
+                    field.append(c)
+            elif c == '"':
+                in_quotes = True
+            elif c == delimiter:
+                row.append(''.join(field))
+                field = []
+            else:
+                field.append(c)
+            i += 1
+        row.append(''.join(field))
+        rows.append(row)
+    return rows
+
 # ------------------
 
 
@@ -272,8 +386,23 @@ class CellsModel:
 
     Built incrementally during parsing via :meth:`add_cell`,
     :meth:`add_cell_node`, and :meth:`add_celldata_node`, then finalized with
-    :meth:`finalize` which populates the :attr:`grid_data` matrix used during
-    rendering.  Row and column indices are zero-based internally.
+    :meth:`finalize` which populates the :attr:`grid_cell_indices` occupancy
+    grid used during rendering.  Row and column indices are zero-based
+    internally.
+
+    .. py:attribute:: grid_cell_indices
+
+       After :meth:`finalize` was called, a flat row-major array of size
+       ``rows × cols`` with, for each grid position, the index in
+       :attr:`cells_data` of the cell that occupies it, or ``-1`` if the
+       position is empty.  Renderers should use :meth:`get_row_items` to
+       iterate over a row's cells rather than inspecting this array directly.
+
+    .. py:attribute:: grid_data
+
+       Legacy dense representation of the grid as a list of rows of
+       ``{'cell': ..., 'is_topleft': ...}`` dicts (or `None`).  It is no longer
+       computed by :meth:`finalize`; call :meth:`get_grid_data` to build it.
     """
     def __init__(self, **kwargs):
         r"""
@@ -303,6 +432,7 @@ class CellsModel:
         self.cells_size = [None, None] # rows, columns.  None = TBD
         self.cells_data = [] # list of cells instruction.
 
+        self.grid_cell_indices = None
         self.grid_data = None
 
 
@@ -343,7 +473,7 @@ class CellsModel:
 
         return self.add_cell(placement_spec, styles, cell_contents)
 
-    def add_cell(self, placement_spec, styles, content_nodes):
+    def add_cell(self, placement_spec, styles, content_nodes, content_value=None):
 
         placement = self.parse_placement_spec(placement_spec)
 
@@ -351,6 +481,7 @@ class CellsModel:
             placement=placement,
             styles=styles,
             content_nodes=content_nodes,
+            content_value=content_value,
         )
         self.cells_data.append( cell )
 
@@ -373,30 +504,106 @@ class CellsModel:
 
 
     def finalize(self):
-        # self.grid_data[row][col]
-        self.grid_data = [
-            [ None for _ in range(self.cells_size[1]) ]
-            for _ in range(self.cells_size[0])
-        ]
-        for cell in self.cells_data:
-            is_topleft = True
+        num_rows, num_cols = self.get_grid_size()
+        # self.grid_cell_indices[row*num_cols + col] = index in self.cells_data
+        grid = _make_cells_index_grid(num_rows * num_cols)
+        for cell_index, cell in enumerate(self.cells_data):
+            col_start = cell.placement.col_range.start
+            col_end = cell.placement.col_range.end
             for rowidx in range(cell.placement.row_range.start,
                                 cell.placement.row_range.end):
-                for colidx in range(cell.placement.col_range.start,
-                                    cell.placement.col_range.end):
-                    if self.grid_data[rowidx][colidx] is not None:
-                        existing_cell = self.grid_data[rowidx][colidx]['cell']
+                row_offset = rowidx * num_cols
+                for colidx in range(col_start, col_end):
+                    existing_index = grid[row_offset + colidx]
+                    if existing_index != -1:
+                        existing_cell = self.cells_data[existing_index]
                         raise ValueError(
                             f"‘{repr(cell)}’ overlaps with ‘{repr(existing_cell)}’"
                         )
                     # mark this grid location as being occupied by this cell
-                    self.grid_data[rowidx][colidx] = {
-                        'cell': cell,
-                        'is_topleft': is_topleft
-                    }
-                    is_topleft = False
+                    grid[row_offset + colidx] = cell_index
+        self.grid_cell_indices = grid
         # done.
 
+    def get_grid_size(self):
+        r"""
+        Return the tuple ``(num_rows, num_cols)`` of the grid dimensions.
+        """
+        num_rows, num_cols = self.cells_size
+        if num_rows is None:
+            num_rows = 0
+        if num_cols is None:
+            num_cols = 0
+        return (num_rows, num_cols)
+
+    def get_row_items(self, row_j):
+        r"""
+        Return the contents of the grid row `row_j` as a list of tuples
+        ``(item_type, col_start, col_end, cell)``, in column order.  The
+        column ranges of the items cover the entire row, without overlaps.
+        Only :meth:`finalize` needs to be called before this method.
+
+        The `item_type` is one of:
+
+        - ``'cell'``: the top-left corner of the given `cell` is located at
+          this row and at column `col_start`; the cell spans the columns
+          `col_start` to `col_end` (exclusive).
+
+        - ``'covered'``: the columns `col_start` to `col_end` (exclusive) are
+          occupied by the given `cell`, which starts on an earlier row.
+
+        - ``'empty'``: a run of empty grid positions from `col_start` to
+          `col_end` (exclusive); `cell` is `None`.
+        """
+        num_rows, num_cols = self.get_grid_size()
+        grid = self.grid_cell_indices
+        row_offset = row_j * num_cols
+        items = []
+        col_j = 0
+        while col_j < num_cols:
+            cell_index = grid[row_offset + col_j]
+            if cell_index == -1:
+                col_end = col_j + 1
+                while col_end < num_cols and grid[row_offset + col_end] == -1:
+                    col_end += 1
+                items.append( ('empty', col_j, col_end, None) )
+                col_j = col_end
+                continue
+            cell = self.cells_data[cell_index]
+            col_end = cell.placement.col_range.end
+            if cell.placement.row_range.start == row_j:
+                items.append( ('cell', col_j, col_end, cell) )
+            else:
+                items.append( ('covered', col_j, col_end, cell) )
+            col_j = col_end
+        return items
+
+    def get_grid_data(self):
+        r"""
+        Build and return the legacy dense grid representation
+        :attr:`grid_data`, a list of rows, each a list of `None` (empty grid
+        position) or a dictionary ``{'cell': cell, 'is_topleft': bool}``.
+
+        This representation allocates one object per occupied grid position.
+        Prefer :meth:`get_row_items` for iterating over the grid.
+        """
+        num_rows, num_cols = self.get_grid_size()
+        grid_data = []
+        for row_j in range(num_rows):
+            row = []
+            for (item_type, col_start, col_end, cell) in self.get_row_items(row_j):
+                for col_j in range(col_start, col_end):
+                    if cell is None:
+                        row.append(None)
+                    else:
+                        row.append({
+                            'cell': cell,
+                            'is_topleft': (item_type == 'cell' and col_j == col_start),
+                        })
+            grid_data.append(row)
+        self.grid_data = grid_data
+        return grid_data
+
     # ------------------------------------------------------
 
     def add_celldata_node(self, celldata_node):
@@ -405,16 +612,7 @@ class CellsModel:
             ('styles_mapping', 'placement_mapping', 'celldata_contents',),
         )
 
-        # Note: ''.split() returns [] in Python but [''] in Transcrypt/JS.
-        # When no <styles> arg is provided, get_content_as_chars() returns '',
-        # so ''.split(',') gives [''], and then ''.split() gives [] (Py) vs
-        # [''] (JS), causing JS to add a spurious empty 'cellstyle-' class.
-        # Fix: filter out empty strings from each style spec.
-        styles_mapping = [
-            [s for s in styles_spec.split() if s]
-            for styles_spec in
-                celldata_node_args['styles_mapping'].get_content_as_chars().split(',')
-        ]
+        styles_mapping = self.parse_styles_mapping(celldata_node_args['styles_mapping'])
 
         placement_mapping_spec = celldata_node_args['placement_mapping'].get_content_nodelist()
 
@@ -446,7 +644,122 @@ class CellsModel:
         self.add_celldata(placement_mapping_spec, styles_mapping, data_content_nodes)
 
 
-    def add_celldata(self, placement_mapping_spec, styles_mapping, data_content_nodes):
+    def add_celldatafile_node(self, celldatafile_node):
+        # parse the node's arguments
+        celldatafile_node_args = \
+            ParsedArgumentsInfo(node=celldatafile_node).get_all_arguments_info(
+                ('styles_mapping', 'placement_mapping', 'celldata_file',),
+            )
+
+        styles_mapping = self.parse_styles_mapping(
+            celldatafile_node_args['styles_mapping']
+        )
+
+        placement_mapping_spec = \
+            celldatafile_node_args['placement_mapping'].get_content_nodelist()
+
+        data_file_name = celldatafile_node_args['celldata_file'].get_content_as_chars().strip()
+
+        data_values = self.load_cells_data_file(celldatafile_node, data_file_name)
+
+        self.add_celldata(
+            placement_mapping_spec,
+            styles_mapping,
+            data_values,
+            parse_cell_value_fn=lambda value: self.parse_cell_value(
+                celldatafile_node, data_file_name, value
+            ),
+            parse_all_cell_values=not _can_store_plain_cell_values(
+                celldatafile_node.parsing_state.latex_context
+            ),
+        )
+
+    def load_cells_data_file(self, celldatafile_node, data_file_name):
+        r"""
+        Read the external data file `data_file_name` referenced by the given
+        ``\celldatafile`` node and return a list of rows of string values.
+
+        The file is read via the ``read_resource_file(fname, ftype)`` method
+        of the parsed fragment's `resource_info`, which resolves the file name
+        relative to the fragment's source (see
+        :py:class:`flm.main.run.ResourceInfo`).  Files with a ``.tsv`` or
+        ``.tab`` extension are split at tab characters; any other file is read
+        as comma-separated values.
+        """
+        resource_info = celldatafile_node.latex_walker.resource_info
+        if resource_info is None or not hasattr(resource_info, 'read_resource_file'):
+            raise LatexWalkerLocatedError(
+                f"Cannot load cells data file ‘{data_file_name}’: external "
+                f"resources cannot be accessed in this context",
+                pos=celldatafile_node.pos,
+            )
+
+        try:
+            data = resource_info.read_resource_file(data_file_name, ftype='cells_data')
+        except Exception as e:
+            logger.debug(f"Failed to read cells data file ‘{data_file_name}’: {e}",
+                         exc_info=True)
+            raise LatexWalkerLocatedError(
+                f"Cannot load cells data file ‘{data_file_name}’: {e}",
+                pos=celldatafile_node.pos,
+            )
+
+        data_file_name_lower = data_file_name.lower()
+        if data_file_name_lower.endswith('.tsv') or data_file_name_lower.endswith('.tab'):
+            return _split_cells_data_file_contents(data, '\t', quoting=False)
+        return _split_cells_data_file_contents(data, ',')
+
+    def parse_cell_value(self, celldatafile_node, data_file_name, value):
+        r"""
+        Parse a value read from an external data file as inline FLM content.
+        Only values that contain FLM markup are parsed; plain-text values are
+        stored directly in the cell model.
+        """
+        base_latex_walker = celldatafile_node.latex_walker
+        flm_environment = base_latex_walker.flm_environment
+
+        latex_walker = flm_environment.make_latex_walker(
+            value,
+            is_block_level=False,
+            parsing_mode=base_latex_walker.parsing_mode,
+            resource_info=base_latex_walker.resource_info,
+            standalone_mode=base_latex_walker.standalone_mode,
+            tolerant_parsing=base_latex_walker.tolerant_parsing,
+            what=f"{base_latex_walker.what}→{data_file_name}",
+            input_lineno_colno_offsets=None,
+        )
+        nodes, _ = latex_walker.parse_content(
+            latexnodes_parsers.LatexGeneralNodesParser(),
+            parsing_state=celldatafile_node.parsing_state.sub_context(
+                is_block_level=False,
+            ),
+        )
+        return nodes
+
+    def parse_styles_mapping(self, styles_mapping_arg):
+        # Note: ''.split() returns [] in Python but [''] in Transcrypt/JS.
+        # When no <styles> arg is provided, get_content_as_chars() returns '',
+        # so ''.split(',') gives [''], and then ''.split() gives [] (Py) vs
+        # [''] (JS), causing JS to add a spurious empty 'cellstyle-' class.
+        # Fix: filter out empty strings from each style spec.
+        return [
+            [s for s in styles_spec.split() if s]
+            for styles_spec in styles_mapping_arg.get_content_as_chars().split(',')
+        ]
+
+    def add_celldata(self, placement_mapping_spec, styles_mapping, data_content_nodes,
+                     parse_cell_value_fn=None, parse_all_cell_values=False):
+        r"""
+        Place the given data in the grid according to the given placement and
+        styles mappings.
+
+        Each item of the rows in `data_content_nodes` is either a node list or
+        a plain string value (e.g., read from an external data file).  String
+        values are stripped of surrounding whitespace; values that contain FLM
+        markup are parsed with `parse_cell_value_fn`, while the others are
+        stored as the cell's `content_value` and are rendered as-is.  If
+        `parse_all_cell_values` is true, all string values are parsed.
+        """
 
         placement_mapping = self.parse_placement_mapping_spec(
             placement_mapping_spec,
@@ -480,6 +793,21 @@ class CellsModel:
                 else:
                     styles = styles_mapping[-1]
 
+                if isinstance(cell_content, str):
+                    cell_value = cell_content.strip()
+                    if len(cell_value) == 0:
+                        # no contents for this cell -- skip it
+                        self.current_col = col_range.end
+                        data_col_j += 1
+                        continue
+                    if not parse_all_cell_values \
+                       and _rx_cell_value_needs_parsing.search(cell_value) is None:
+                        # fast path -- plain text value, no need to parse it
+                        self.add_cell( placement, styles, None, content_value=cell_value )
+                        data_col_j += 1
+                        continue
+                    cell_content = parse_cell_value_fn(cell_value)
+
                 cell_content_nl = \
                     cell_content.latex_walker.filter_whitespace_comments_nodes(
                         cell_content
@@ -872,6 +1200,7 @@ class CellsEnvironment(FLMEnvironmentSpecBase):
                     macros=[
                         CellMacro(),
                         CelldataMacroSpec(),
+                        CelldatafileMacroSpec(),
                         LatexTabularRowSeparatorSpec(),
                     ]
                 )
@@ -896,6 +1225,9 @@ class CellsEnvironment(FLMEnvironmentSpecBase):
                 elif n.macroname == 'celldata':
                     cells_model.add_celldata_node(n)
                     continue
+                elif n.macroname == 'celldatafile':
+                    cells_model.add_celldatafile_node(n)
+                    continue
                 elif n.macroname == '\\':
                     cells_model.move_next_row()
                     continue
@@ -911,7 +1243,7 @@ class CellsEnvironment(FLMEnvironmentSpecBase):
 
             raise LatexWalkerLocatedError(
                 f"You cannot place ‘{_splfysidews(n.latex_verbatim())}’ here.  Expected: "
-                f"\\cell, \\celldata, \\\\."
+                f"\\cell, \\celldata, \\celldatafile, \\\\."
             )
 
         cells_model.finalize()
@@ -1002,6 +1334,7 @@ class FeatureCells(Feature):
             macros=[
                 CellMacro(),
                 CelldataMacroSpec(),
+                CelldatafileMacroSpec(),
                 MergeMacroSpec(),
                 LatexTabularRowSeparatorSpec(),
             ],
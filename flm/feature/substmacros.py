@@ -93,7 +93,7 @@ class SimpleMacroArgumentPlaceholder(FLMSpecialsSpecBase):
     def __init__(self,
                  specials_chars='#',
                  *,
-                 macro_content_substitutor,
+                 macro_content_substitutor=None,
                  parse_arg_information_only=False,
                  ):
         super().__init__(specials_chars=specials_chars,
@@ -101,6 +101,9 @@ class SimpleMacroArgumentPlaceholder(FLMSpecialsSpecBase):
         self.macro_content_substitutor = macro_content_substitutor
         self.parse_arg_information_only = parse_arg_information_only
 
+    def get_macro_content_substitutor(self, node):
+        return _get_macro_content_substitutor(self, node)
+
     def postprocess_parsed_node(self, node):
 
         node_args = ParsedArgumentsInfo(node=node).get_all_arguments_info(
@@ -116,13 +119,15 @@ class SimpleMacroArgumentPlaceholder(FLMSpecialsSpecBase):
             # stop here
             return
 
-        value = self.macro_content_substitutor.get_placeholder_value(
+        macro_content_substitutor = self.get_macro_content_substitutor(node)
+
+        value = macro_content_substitutor.get_placeholder_value(
             placeholder_ref,
             placeholder_node=node,
             substitution_arg_info=node_args['substitution_arg'],
         )
         if isinstance(value, str):
-            nodelist = self.macro_content_substitutor.compile_flm_text(
+            nodelist = macro_content_substitutor.compile_flm_text(
                 value,
                 add_what=f"placeholder ‘{placeholder_ref}’ value",
                 is_block_level=node.parsing_state.is_block_level,
@@ -174,9 +179,32 @@ class SimpleMacroArgumentPlaceholder(FLMSpecialsSpecBase):
     
 
 
+def _get_macro_content_substitutor(spec, node):
+    r"""
+    Return the :py:class:`MacroContentSubstitutor` that the placeholder or
+    condition `node` should be resolved against.
+
+    Placeholder and condition specs are normally shared between all
+    substitution callables (see :py:data:`_macro_content_specials`) and are not
+    bound to any specific substitutor.  In that case, the substitutor is the one
+    that is compiling the replacement text, which is recorded on the latex
+    walker that parsed the node (see
+    :py:meth:`MacroContentSubstitutor.compile_flm_text()`).
+    """
+    if spec.macro_content_substitutor is not None:
+        return spec.macro_content_substitutor
+    latex_walker = node.latex_walker
+    if hasattr(latex_walker, 'flm_macro_content_substitutor'):
+        return latex_walker.flm_macro_content_substitutor
+    raise LatexWalkerLocatedError(
+        "Argument placeholder or condition can only be used in the replacement "
+        f"content of a substitution macro",
+        pos=node.pos,
+    )
+
 
 
-def _make_ifarg_argument_argspec(macro_content_substitutor):
+def _make_ifarg_argument_argspec(macro_content_substitutor=None):
     return FLMArgumentSpec(
         parser='{',
         parsing_state_delta=ParsingStateDeltaExtendLatexContextDb(
@@ -265,7 +293,7 @@ _ifargcmd_types = {
 
 
 
-def _make_ifarg_arguments_spec_list(macroname, macro_content_substitutor):
+def _make_ifarg_arguments_spec_list(macroname, macro_content_substitutor=None):
 
     if macroname not in _ifargcmd_types:
         raise ValueError(f"Invalid/unknown macro name for ifarg-type macro: {macroname}")
@@ -331,7 +359,7 @@ class SimpleMacroContentIfArgCondition(FLMMacroSpecBase):
     def __init__(self,
                  macroname,
                  *,
-                 macro_content_substitutor,
+                 macro_content_substitutor=None,
                  ):
         arguments_spec_list = _make_ifarg_arguments_spec_list(
             macroname, macro_content_substitutor
@@ -339,6 +367,9 @@ class SimpleMacroContentIfArgCondition(FLMMacroSpecBase):
         super().__init__(macroname=macroname,
                          arguments_spec_list=arguments_spec_list)
         self.macro_content_substitutor = macro_content_substitutor
+
+    def get_macro_content_substitutor(self, node):
+        return _get_macro_content_substitutor(self, node)
         
     def postprocess_parsed_node(self, node):
         
@@ -373,7 +404,9 @@ class SimpleMacroContentIfArgCondition(FLMMacroSpecBase):
 
         # figure out if condition is true or false and do substitution accordingly.
 
-        argument_info = self.macro_content_substitutor.get_parsed_argument_info(
+        macro_content_substitutor = self.get_macro_content_substitutor(node)
+
+        argument_info = macro_content_substitutor.get_parsed_argument_info(
             placeholder_ref,
             placeholder_node=arg_ref_node,
         )
@@ -409,6 +442,40 @@ class SimpleMacroContentIfArgCondition(FLMMacroSpecBase):
 
 
 
+# The placeholder and condition specs that are available in the replacement
+# content of all substitution callables.  They are not bound to any specific
+# MacroContentSubstitutor instance, so they can be created once and shared
+# across all invocations of all substitution callables.
+_macro_content_specials = [
+    SimpleMacroArgumentPlaceholder('#'),
+]
+_macro_content_ifarg_macros = [
+    SimpleMacroContentIfArgCondition(macroname=ifmacroname)
+    for ifmacroname in _ifargcmd_types.keys()
+]
+
+
+def _make_macro_content_parsing_state_delta(environment):
+    r"""
+    Create the parsing state delta that is applied to parse the replacement
+    content of substitution callables in the given `environment`.  It adds the
+    argument placeholder and condition specs as well as the patched callables
+    (see `_make_patched_callables()`) to the latex context.
+    """
+    patched_callables = _make_patched_callables(environment)
+    return ParsingStateDeltaExtendLatexContextDb(
+        extend_latex_context={
+            'specials': _macro_content_specials + patched_callables['specials'],
+            'macros': _macro_content_ifarg_macros + patched_callables['macros'],
+            'environments': patched_callables['environments'],
+        },
+        set_attributes={
+            'is_block_level': None,
+        }
+    )
+
+
+
 # ------------------------------------------------------------------------------
 
 
@@ -478,28 +545,13 @@ class MacroContentSubstitutor:
             else:
                 self.argument_names.append(arg)
 
-        ifmacros = [
-            SimpleMacroContentIfArgCondition(
-                macroname=ifmacroname,
-                macro_content_substitutor=self,
+        # The placeholder & condition specs are shared; they find this
+        # substitutor instance via the latex walker that parses the content
+        # (see compile_flm_text()).
+        self.macro_content_parsing_state_delta = \
+            self.substitutor_manager.get_macro_content_parsing_state_delta(
+                self.callable_node.latex_walker.flm_environment
             )
-            for ifmacroname in _ifargcmd_types.keys()
-        ]
-
-        self.macro_content_parsing_state_delta = ParsingStateDeltaExtendLatexContextDb(
-            extend_latex_context={
-                'specials': [
-                    SimpleMacroArgumentPlaceholder(
-                        '#',
-                        macro_content_substitutor=self,
-                    ),
-                ],
-                'macros': ifmacros
-            },
-            set_attributes={
-                'is_block_level': None,
-            }
-        )
 
         # set the argument number offset, if applicable:
         if self.callable_node.nodeargd is not None:
@@ -713,7 +765,6 @@ class MacroContentSubstitutor:
     def compile_flm_text(self, flm_text, add_what=None, is_block_level=None, 
                          parsing_state_delta=None):
 
-        mc_parsing_state_delta = self.macro_content_parsing_state_delta
         callable_node = self.callable_node
         base_latex_walker = callable_node.latex_walker
         flm_environment = base_latex_walker.flm_environment
@@ -722,26 +773,6 @@ class MacroContentSubstitutor:
         if add_what:
             what += f"[{add_what}]"
 
-        patched_callables = _make_patched_callables(flm_environment)
-
-        if 'macros' in patched_callables:
-            if 'macros' not in mc_parsing_state_delta.extend_latex_context:
-                mc_parsing_state_delta.extend_latex_context['macros'] = []
-            mc_parsing_state_delta.extend_latex_context['macros'] \
-                += patched_callables['macros']
-
-        if 'environments' in patched_callables:
-            if 'environments' not in mc_parsing_state_delta.extend_latex_context:
-                mc_parsing_state_delta.extend_latex_context['environments'] = []
-            mc_parsing_state_delta.extend_latex_context['environments'] \
-                += patched_callables['environments']
-
-        if 'specials' in patched_callables:
-            if 'specials' not in mc_parsing_state_delta.extend_latex_context:
-                mc_parsing_state_delta.extend_latex_context['specials'] = []
-            mc_parsing_state_delta.extend_latex_context['specials'] \
-                += patched_callables['specials']
-
         # No, don't parse macro content with *outer* parsing state block mode.  The
         # way the macro content is parsed shouldn't depend on where it is inserted.
         #
@@ -758,11 +789,15 @@ class MacroContentSubstitutor:
             what=what,
             input_lineno_colno_offsets=None,
         )
-
-        content_parsing_state = mc_parsing_state_delta.get_updated_parsing_state(
-            callable_node.parsing_state,
-            content_latex_walker
-        )
+        # placeholders & conditions in the content refer to this substitutor
+        content_latex_walker.flm_macro_content_substitutor = self
+
+        content_parsing_state = \
+            self.substitutor_manager.get_macro_content_parsing_state(
+                callable_node.parsing_state,
+                content_latex_walker,
+                parsing_state_delta=self.macro_content_parsing_state_delta,
+            )
         if parsing_state_delta is not None:
             content_parsing_state = parsing_state_delta.get_updated_parsing_state(
                 content_parsing_state,
@@ -798,6 +833,51 @@ class MacroContentSubstitutorManager:
         self.argument_number_offset = argument_number_offset
         self.default_argument_values = default_argument_values
 
+        # (environment, parsing_state_delta)
+        self._cached_macro_content_parsing_state_delta = None
+        # (base_parsing_state, parsing_state_delta, content_parsing_state)
+        self._cached_macro_content_parsing_state = None
+
+    def get_macro_content_parsing_state_delta(self, environment):
+        r"""
+        Return the parsing state delta to apply when parsing the replacement
+        content of this callable in the given `environment`.
+
+        The delta is created only once per environment and reused by all
+        invocations of the callable.
+        """
+        cached = self._cached_macro_content_parsing_state_delta
+        if cached is not None and cached[0] is environment:
+            return cached[1]
+        parsing_state_delta = _make_macro_content_parsing_state_delta(environment)
+        self._cached_macro_content_parsing_state_delta = \
+            (environment, parsing_state_delta)
+        return parsing_state_delta
+
+    def get_macro_content_parsing_state(self, parsing_state, latex_walker, *,
+                                        parsing_state_delta):
+        r"""
+        Return the parsing state with which to parse the replacement content of
+        a callable node whose own parsing state is `parsing_state`.
+
+        Successive invocations of a callable typically appear in the same
+        parsing state (e.g., in the same paragraph or the same equation), so
+        the last computed content parsing state is kept and reused as long as
+        the same `parsing_state` and `parsing_state_delta` are requested.
+        This avoids rebuilding an extended latex context for each invocation.
+        """
+        cached = self._cached_macro_content_parsing_state
+        if cached is not None and cached[0] is parsing_state \
+           and cached[1] is parsing_state_delta:
+            return cached[2]
+        content_parsing_state = parsing_state_delta.get_updated_parsing_state(
+            parsing_state,
+            latex_walker
+        )
+        self._cached_macro_content_parsing_state = \
+            (parsing_state, parsing_state_delta, content_parsing_state)
+        return content_parsing_state
+
     def make_macro_content_substitutor(self, callable_node):
 
         parsed_arguments_infos = \
@@ -927,6 +1007,12 @@ class SubstitutionCallableSpecInfo(FLMSpecInfo):
 
         self.macro_content_substitutor_manager = macro_content_substitutor_manager
 
+        # for _fields
+        self.default_argument_values = default_argument_values
+        self.argument_number_offset = argument_number_offset
+        self.content = content
+        self.render_time_substitution = render_time_substitution
+
         if content is None:
             content = ''
 
@@ -941,7 +1027,6 @@ class SubstitutionCallableSpecInfo(FLMSpecInfo):
             if 'mathmode' in content:
                 self.content_mathmode = content['mathmode']
 
-        self.render_time_substitution = render_time_substitution
 
         logger.debug("Constructing SimpleSubstitutionMacro, arguments_spec_list = %r; "
                      "content_textmode=%r, content_mathmode=%r, render_time_substitution=%r; "
@@ -1065,6 +1150,9 @@ class SubstitutionMacro(SubstitutionCallableSpecInfo):
             **kwargs
         )
 
+    _fields = ('macroname', 'arguments_spec_list', 'default_argument_values',
+               'argument_number_offset', 'content', 'render_time_substitution', )
+
 
 class SubstitutionEnvironment(SubstitutionCallableSpecInfo):
     def __init__(self, environmentname, **kwargs):
@@ -1074,6 +1162,9 @@ class SubstitutionEnvironment(SubstitutionCallableSpecInfo):
             **kwargs
         )
 
+    _fields = ('environmentname', 'arguments_spec_list', 'default_argument_values',
+               'argument_number_offset', 'content', 'render_time_substitution', )
+
 
 
 class SubstitutionSpecials(SubstitutionCallableSpecInfo):
@@ -1084,6 +1175,9 @@ class SubstitutionSpecials(SubstitutionCallableSpecInfo):
             **kwargs
         )
 
+    _fields = ('specials_chars', 'arguments_spec_list', 'default_argument_values',
+               'argument_number_offset', 'content', 'render_time_substitution', )
+
 
 
 
@@ -49,6 +49,52 @@ def _import_class(fullclsname, restype):
     return getattr(mod, clsname)
 ### ENDPATCH_IMPORT_FLMSPECINFO_CLASS
 
+### BEGINPATCH_OBJECT_DUMP_FIELDNAMES
+# cls -> frozenset of the field names that are common to all instances of cls
+_object_dump_class_fieldnames = {}
+
+def _get_object_dump_fieldnames(obj):
+    # The fields to dump are the declared `_fields` along with all `flm*`
+    # attributes.  Find the class-level ones once per class; per object, only
+    # scan the instance's own attributes rather than calling dir().
+    cls = obj.__class__
+    cls_fieldnames = _object_dump_class_fieldnames.get(cls, None)
+    if cls_fieldnames is None:
+        cls_fieldnames = set(obj._fields)
+        for fieldname in dir(cls):
+            if fieldname.startswith('flm'):
+                cls_fieldnames.add(fieldname)
+        cls_fieldnames = frozenset(cls_fieldnames)
+        _object_dump_class_fieldnames[cls] = cls_fieldnames
+    fieldnames = set(cls_fieldnames)
+    instance_dict = getattr(obj, '__dict__', None)
+    if instance_dict is None:
+        instance_dict = dir(obj)
+    for fieldname in instance_dict:
+        if fieldname.startswith('flm'):
+            fieldnames.add(fieldname)
+    return fieldnames
+### ENDPATCH_OBJECT_DUMP_FIELDNAMES
+
+### BEGINPATCH_TEXT_INTERN_KEY
+import hashlib
+def _text_intern_key(text):
+    # Don't keep all source texts alive as dictionary keys
+    return hashlib.sha256(text.encode('utf-8')).digest()
+### ENDPATCH_TEXT_INTERN_KEY
+
+def _make_intern_key(data):
+    # A string that identifies the given dumped data structurally.  The keys
+    # of dumped objects are always sorted, so equal objects have equal keys.
+    if isinstance(data, list):
+        return '[' + ','.join([ _make_intern_key(item) for item in data ]) + ']'
+    if isinstance(data, dict):
+        return '{' + ','.join([
+            repr(k) + ':' + _make_intern_key(v)
+            for (k, v) in data.items()
+        ]) + '}'
+    return repr(data)
+
 def _fullclassname(clsobj):
     # It would have been better to use __qualname__, but the latter is not
     # supported by Transcrypt.  So we fix here that serializable classes must be
@@ -111,7 +157,12 @@ def _is_known_serializable_object_type_names(typename):
 
 # ------------------------------------------------------------------------------
 
-_dump_version = 2
+# Version 3 stores the source texts (``flm_text``) as ``FLMText`` resources.
+_dump_version = 3
+
+# Dump versions that can still be loaded.  Version 2 dumps store the source
+# texts directly in each fragment and latex walker.
+_supported_load_dump_versions = (2, 3)
 
 
 
@@ -138,6 +189,9 @@ class FLMDataDumper:
     The dumper tracks shared resources (latex walkers, spec-info objects, parsing
     states, nodes) in a resource table so that repeated references produce
     lightweight ``$restype``/``$reskey`` pointers rather than duplicate copies.
+    Parsing states and latex walkers that are structurally equal share a single
+    resource entry, and each distinct source text (``flm_text``) is stored only
+    once, as an ``FLMText`` resource.
 
     Use :meth:`add_object_dump` to serialize objects under named keys, then
     retrieve the full dump dictionary via :meth:`get_data`.
@@ -165,22 +219,62 @@ class FLMDataDumper:
                 'version': _dump_version,
             }
         }
+        # restype -> { object id -> reskey of an equal, already dumped object }
+        self._resource_aliases = {}
+        # restype -> { intern key -> reskey }
+        self._interned_resource_keys = {}
         
     def get_data(self):
         return self.data
 
     def add_object_dump(self, key, obj):
         dump = self._make_object_dump(obj, dumping_state={'object': obj})
-        self.data['dumps'][key] = dump
+        self._store_object_dump(key, dump)
 
     # ---
 
+    # The following methods determine where the dumped data is stored.
+    # Subclasses can reimplement them to store the data elsewhere (see, e.g.,
+    # flm.flmdumpstream.FLMDataStreamDumper).
+
+    def _store_object_dump(self, key, dump):
+        self.data['dumps'][key] = dump
+
+    def _find_resource_key(self, restype, y):
+        # Return the resource key of the object `y` if it was already dumped
+        # (or is currently being dumped), or None otherwise.
+        objkey = str(fn_unique_object_id(y))
+        if restype in self.data['resources'] \
+           and objkey in self.data['resources'][restype]:
+            return objkey
+        if restype in self._resource_aliases \
+           and objkey in self._resource_aliases[restype]:
+            return self._resource_aliases[restype][objkey]
+        return None
+
+    def _register_resource(self, restype, y, reskey=None):
+        # Mark the object `y` as being dumped and return its new resource key.
+        # If `reskey` is given, then `y` is recorded as referring to that
+        # existing resource instead.
+        objkey = str(fn_unique_object_id(y))
+        if reskey is not None:
+            if restype not in self._resource_aliases:
+                self._resource_aliases[restype] = {}
+            self._resource_aliases[restype][objkey] = reskey
+            return reskey
+        if restype not in self.data['resources']:
+            self.data['resources'][restype] = {}
+        self.data['resources'][restype][ objkey ] = '$currently-dumping'
+        return objkey
+
+    def _store_resource(self, restype, reskey, resdata):
+        if restype not in self.data['resources']:
+            self.data['resources'][restype] = {}
+        self.data['resources'][restype][ reskey ] = resdata
+
     def _make_object_dump(self, obj, *, dumping_state, type_name=None):
 
-        fieldnames = set(obj._fields)
-        for fieldname in dir(obj): # dir() is supported by Transcrypt
-            if fieldname.startswith('flm'):
-                fieldnames.add(fieldname)
+        fieldnames = _get_object_dump_fieldnames(obj)
 
         if type_name is None:
             cls = obj.__class__
@@ -202,7 +296,13 @@ class FLMDataDumper:
             raise ValueError("Invalid object field: " + repr(fieldname) + " in " + repr(obj))
 
         for field in sorted(fieldnames):
-            val = self._make_dump(get_obj_attr(field), dumping_state=dumping_state)
+            fieldvalue = get_obj_attr(field)
+            if field == 'flm_text' and isinstance(fieldvalue, str):
+                # The source text is stored only once, even if it is shared by
+                # a fragment, its latex walker, and possibly other fragments.
+                objdata[field] = self._make_text_resource(fieldvalue)
+                continue
+            val = self._make_dump(fieldvalue, dumping_state=dumping_state)
             if val is _Skip:
                 val = { '$skip': True }
             objdata[field] = val
@@ -211,6 +311,13 @@ class FLMDataDumper:
 
     def _make_dump(self, x, *, dumping_state):
 
+        # plain values are by far the most common, check for them first
+        if x is None:
+            return None
+
+        if isinstance(x, (str, bool, int, float)):
+            return x
+
         if isinstance(x, (tuple,list)):
             result = []
             for item in x:
@@ -236,6 +343,7 @@ class FLMDataDumper:
                 x,
                 _FakeDataLoadedFLMLatexWalker(x),
                 dumping_state=dumping_state,
+                intern=True,
             )
         
         if isinstance(x, FLMSpecInfo):
@@ -253,6 +361,7 @@ class FLMDataDumper:
                 x, # actual object (used for id/references identification)
                 x, # object to dump (will pass through _make_object_dump())
                 dumping_state=dumping_state,
+                intern=True,
             )
 
         if isinstance(x, latex_node_types):
@@ -270,38 +379,61 @@ class FLMDataDumper:
         if hasattr(x, '_fields'):
             return self._make_object_dump(x, dumping_state=dumping_state)
 
-        if isinstance(x, (str, bool, int, float)):
-            return x
-
-        if x is None:
-            return None
-
         if not x:
             # catch undefined in Transcrypt
             return None
 
         raise ValueError(f"Cannot dump value {repr(x)} of unsupported type")
 
-    def _make_resource(self, restype, y, ydata, *, restype_dumptype=None, dumping_state):
-        if restype not in self.data['resources']:
-            self.data['resources'][restype] = {}
-
-        reskey = str(fn_unique_object_id(y))
-        if reskey not in self.data['resources'][restype]:
+    def _make_resource(self, restype, y, ydata, *, restype_dumptype=None,
+                       intern=False, dumping_state):
+        reskey = self._find_resource_key(restype, y)
+        if reskey is None and intern:
+            # Structurally equal objects share a single resource entry (e.g.
+            # parsing states, of which many copies differ only in a few
+            # fields).  These objects must not refer back to themselves.
+            ydata_dump = self._make_object_dump(
+                ydata, dumping_state=dumping_state,
+                type_name=(restype_dumptype if restype_dumptype is not None else restype)
+            )
+            internkey = _make_intern_key(ydata_dump)
+            if restype not in self._interned_resource_keys:
+                self._interned_resource_keys[restype] = {}
+            interned = self._interned_resource_keys[restype]
+            if internkey in interned:
+                reskey = self._register_resource(restype, y, interned[internkey])
+            else:
+                reskey = self._register_resource(restype, y)
+                self._store_resource(restype, reskey, ydata_dump)
+                interned[internkey] = reskey
+        elif reskey is None:
             # already mark this object as being dumped, in case we recursively
             # encounter a reference to this object while dumping this object
             # itself.
-            self.data['resources'][restype][ reskey ] = '$currently-dumping'
+            reskey = self._register_resource(restype, y)
 
             ydata_dump = self._make_object_dump(
                 ydata, dumping_state=dumping_state,
                 type_name=(restype_dumptype if restype_dumptype is not None else restype)
             )
 
-            self.data['resources'][restype][ reskey ] = ydata_dump
+            self._store_resource(restype, reskey, ydata_dump)
 
         return { '$restype': restype, '$reskey': reskey }
-    
+
+    def _make_text_resource(self, text):
+        if 'FLMText' not in self._interned_resource_keys:
+            self._interned_resource_keys['FLMText'] = {}
+        interned = self._interned_resource_keys['FLMText']
+        internkey = _text_intern_key(text)
+        if internkey in interned:
+            reskey = interned[internkey]
+        else:
+            reskey = str(len(interned))
+            self._store_resource('FLMText', reskey, text)
+            interned[internkey] = reskey
+        return { '$restype': 'FLMText', '$reskey': reskey }
+
 
 
 class FLMDataLoadNotSupported:
@@ -332,15 +464,15 @@ class FLMDataLoader:
     :param environment: The :class:`~flm.flmenvironment.FLMEnvironment`
         instance used for reconstructing walkers, parsing states, and
         fragments.
-    :raises ValueError: If the dump version in *data* does not match the
-        expected version.
+    :raises ValueError: If the dump version in *data* is not one that can be
+        loaded (the current version, or version 2).
     """
 
     def __init__(self, data, *, environment):
         self.data = data
         self.environment = environment
 
-        if self.data['_dump']['version'] != _dump_version:
+        if self.data['_dump']['version'] not in _supported_load_dump_versions:
             raise ValueError(
                 f"Dump version mismatch: {self.data['_dump']['version']}, "
                 f"expected {_dump_version}"
@@ -356,11 +488,21 @@ class FLMDataLoader:
         return list(dict(self.data['dumps']).keys())
 
     def get_object_dump(self, key):
-        data = self.data['dumps'][key]
+        data = self._get_dump_data(key)
         return self._load_from_data(data)
 
     # ---
 
+    def _get_dump_data(self, key):
+        return self.data['dumps'][key]
+
+    def _get_resource_data(self, restype, reskey):
+        if restype not in self.data['resources']:
+            raise ValueError(f"Invalid internal resource reference type {restype}")
+        if reskey not in self.data['resources'][restype]:
+            raise ValueError(f"Invalid internal resource reference key {restype}/{reskey}")
+        return self.data['resources'][restype][reskey]
+
     def _load_from_data(self, data):
 
         if data is None:
@@ -442,12 +584,10 @@ class FLMDataLoader:
 
     def _load_resource_from_data(self, restype, reskey):
 
-        if restype not in self.data['resources']:
-            raise ValueError(f"Invalid internal resource reference type {restype}")
-        if reskey not in self.data['resources'][restype]:
-            raise ValueError(f"Invalid internal resource reference key {restype}/{reskey}")
+        resdata = self._get_resource_data(restype, reskey)
 
-        resdata = self.data['resources'][restype][reskey]
+        if restype == 'FLMText':
+            return resdata
 
         if restype == 'FLMLatexWalker':
             resdata2 = dict(resdata)
@@ -456,6 +596,8 @@ class FLMDataLoader:
                 raise ValueError(
                     "flmdump: Can't create LatexWalker instances other than FLMLatexWalker"
                 )
+            # resolve a reference to a shared FLMText resource
+            resdata2['flm_text'] = self._load_from_data(resdata2['flm_text'])
             return self.environment.make_latex_walker(
                 **resdata2
             )
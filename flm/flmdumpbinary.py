@@ -0,0 +1,557 @@
+r"""
+Compact binary encoding of the dump data produced by
+:py:class:`flm.flmdump.FLMDataDumper`.
+
+The data returned by :py:meth:`~flm.flmdump.FLMDataDumper.get_data()` is a
+JSON-compatible structure in which every object repeats all of its field names
+and in which resources are keyed by long unique object IDs.  The binary format
+stores the same data much more compactly:
+
+- All strings (field names, type names, resource keys, chars content, source
+  text, ...) are interned in a single string table, stored as one shared
+  UTF-8 buffer.  Each distinct string is stored only once.
+
+- Each dictionary is stored as a reference to its *shape*, i.e., its sequence
+  of keys, followed by its values.  Node objects of the same type and with the
+  same set of fields share the same shape, so field names are not repeated
+  per object.  (The tables of dumps and of resources are stored as sequences
+  of key-value pairs instead.)
+
+- Resource keys are renumbered with small integers.
+
+- The values themselves are encoded as a flat array of 32-bit tokens, which
+  can be written and read back in bulk.
+
+- An index records where each dump and each resource starts in the token
+  array, so that individual dumps can be decoded without decoding the rest of
+  the data.
+
+Use :py:func:`dump_binary` to encode the dump data and :py:func:`load_binary`
+to decode it back into a data structure that can be passed on to
+:py:class:`flm.flmdump.FLMDataLoader`::
+
+    dumper = FLMDataDumper(environment=environment)
+    dumper.add_object_dump('my-fragment', fragment)
+    binary_data = dump_binary(dumper.get_data())
+
+    loader = FLMDataLoader(load_binary(binary_data), environment=environment)
+    fragment = loader.get_object_dump('my-fragment')
+
+If you only need a few of the dumped objects, use
+:py:class:`FLMBinaryDataLoader` instead, which decodes the data of a dumped
+object only when it is requested (and which can read a dump file via a memory
+map)::
+
+    with FLMBinaryDataLoader.from_file('dump.flmdumpb', environment=environment) as loader:
+        fragment = loader.get_object_dump('my-fragment')
+
+This module is not available in the JavaScript version of FLM.
+"""
+
+import sys
+import array
+import mmap
+import struct
+import zlib
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .flmdump import FLMDataLoader
+
+
+_binary_magic = b'FLMDUMPB'
+
+_binary_format_version = 2
+
+_header_struct = struct.Struct('<8sIIIIIIII')
+
+
+# Each value is encoded as one or more 32-bit tokens.  The low 4 bits of the
+# first token hold the value tag, the remaining bits hold a payload (a string
+# index, a small integer, a list length, a shape index, ...).
+
+_TAG_NONE = 0
+_TAG_FALSE = 1
+_TAG_TRUE = 2
+_TAG_INT = 3  # payload = zigzag-encoded integer
+_TAG_BIGINT = 4  # payload = string index of the integer's decimal repr
+_TAG_FLOAT = 5  # payload = index in float table
+_TAG_STR = 6  # payload = string index
+_TAG_LIST = 7  # payload = number of items; followed by the items
+_TAG_DICT = 8  # payload = shape index; followed by the values
+_TAG_MAP = 9  # payload = number of items; followed by (key, value) pairs
+
+_tag_bits = 4
+_tag_mask = (1 << _tag_bits) - 1
+_max_payload = (1 << (32 - _tag_bits)) - 1
+_max_small_int = _max_payload >> 1
+
+# The index is an array of 32-bit integers:
+#
+#   [ <token offset of data['_dump']>,
+#     <number of dumps>, (<key string index>, <token offset>)*,
+#     <number of resource types>,
+#       ( <restype string index>, <number of resources>, (<token offset>)* )* ]
+#
+# The j-th resource of each resource type has resource key str(j).
+_no_offset = 0xFFFFFFFF
+
+
+class _BinaryDumpEncoder:
+    def __init__(self):
+        super().__init__()
+        self.strings = []
+        self.string_index = {}
+        self.shapes = []
+        self.shape_index = {}
+        self.floats = array.array('d')
+        self.tokens = array.array('I')
+        self.reskey_map = {}
+        self.index = array.array('I')
+
+    def intern(self, s):
+        idx = self.string_index.get(s, None)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(s)
+            self.string_index[s] = idx
+        return idx
+
+    def get_shape(self, keys):
+        idx = self.shape_index.get(keys, None)
+        if idx is None:
+            idx = len(self.shapes)
+            self.shapes.append(tuple(self.intern(k) for k in keys))
+            self.shape_index[keys] = idx
+        return idx
+
+    def encode_data(self, data):
+        # Renumber resource keys so that they can be stored compactly.  The
+        # resource keys only need to be unique within each resource type.
+        resources = data.get('resources', None)
+        if resources is None:
+            resources = {}
+        for restype, resdict in resources.items():
+            self.reskey_map[restype] = {
+                reskey: str(j)
+                for j, reskey in enumerate(resdict.keys())
+            }
+
+        # The top-level structure is encoded as any other dictionary, but we
+        # record where the individual dumps and resources start.
+        dump_info_offset = _no_offset
+        dumps_index = array.array('I', [0])
+        resources_index = array.array('I', [0])
+
+        tokens = self.tokens
+        tokens.append( (self.get_shape(tuple(data.keys())) << _tag_bits) | _TAG_DICT )
+        for k, v in data.items():
+            if k == '_dump':
+                dump_info_offset = len(tokens)
+                self.encode(v)
+            elif k == 'dumps':
+                tokens.append( (len(v) << _tag_bits) | _TAG_MAP )
+                dumps_index[0] = len(v)
+                for dumpkey, dumpdata in v.items():
+                    self.encode(dumpkey)
+                    dumps_index.append(self.intern(dumpkey))
+                    dumps_index.append(len(tokens))
+                    self.encode(dumpdata)
+            elif k == 'resources':
+                tokens.append( (len(v) << _tag_bits) | _TAG_MAP )
+                resources_index[0] = len(v)
+                for restype, resdict in v.items():
+                    self.encode(restype)
+                    resources_index.append(self.intern(restype))
+                    resources_index.append(len(resdict))
+                    restype_reskey_map = self.reskey_map[restype]
+                    tokens.append( (len(resdict) << _tag_bits) | _TAG_MAP )
+                    for reskey, resdata in resdict.items():
+                        self.encode(restype_reskey_map[reskey])
+                        resources_index.append(len(tokens))
+                        self.encode(resdata)
+            else:
+                self.encode(v)
+
+        self.index.append(dump_info_offset)
+        self.index.extend(dumps_index)
+        self.index.extend(resources_index)
+
+    def encode(self, x):
+        tokens = self.tokens
+        if x is None:
+            tokens.append(_TAG_NONE)
+        elif x is True:
+            tokens.append(_TAG_TRUE)
+        elif x is False:
+            tokens.append(_TAG_FALSE)
+        elif isinstance(x, str):
+            tokens.append( (self.intern(x) << _tag_bits) | _TAG_STR )
+        elif isinstance(x, int):
+            if -_max_small_int <= x <= _max_small_int:
+                zz = (x << 1) if x >= 0 else ((-x << 1) - 1)
+                tokens.append( (zz << _tag_bits) | _TAG_INT )
+            else:
+                tokens.append( (self.intern(str(x)) << _tag_bits) | _TAG_BIGINT )
+        elif isinstance(x, float):
+            tokens.append( (len(self.floats) << _tag_bits) | _TAG_FLOAT )
+            self.floats.append(x)
+        elif isinstance(x, (list, tuple)):
+            tokens.append( (len(x) << _tag_bits) | _TAG_LIST )
+            for item in x:
+                self.encode(item)
+        elif isinstance(x, dict):
+            if '$reskey' in x and '$restype' in x:
+                x = dict(x)
+                x['$reskey'] = self.reskey_map[x['$restype']][x['$reskey']]
+            tokens.append( (self.get_shape(tuple(x.keys())) << _tag_bits) | _TAG_DICT )
+            for v in x.values():
+                self.encode(v)
+        else:
+            raise ValueError(f"Cannot encode value {repr(x)} in binary dump")
+
+    def get_binary(self, compress):
+
+        if len(self.strings) > _max_payload or len(self.shapes) > _max_payload \
+           or len(self.floats) > _max_payload:
+            raise ValueError("Dump data is too large to be encoded in binary format")
+
+        encoded_strings = [ s.encode('utf-8') for s in self.strings ]
+        strings_end_offsets = array.array('I')
+        q = 0
+        for es in encoded_strings:
+            q += len(es)
+            strings_end_offsets.append(q)
+        strings_buffer = b''.join(encoded_strings)
+
+        shapes_tokens = array.array('I')
+        for shape in self.shapes:
+            shapes_tokens.append(len(shape))
+            shapes_tokens.extend(shape)
+
+        body = b''.join([
+            _to_little_endian_bytes(strings_end_offsets),
+            strings_buffer,
+            _to_little_endian_bytes(shapes_tokens),
+            _to_little_endian_bytes(self.floats),
+            _to_little_endian_bytes(self.tokens),
+            _to_little_endian_bytes(self.index),
+        ])
+        if compress:
+            body = zlib.compress(body)
+
+        header = _header_struct.pack(
+            _binary_magic,
+            _binary_format_version,
+            1 if compress else 0,
+            len(self.strings),
+            len(strings_buffer),
+            len(shapes_tokens),
+            len(self.floats),
+            len(self.tokens),
+            len(self.index),
+        )
+        return header + body
+
+
+def _to_little_endian_bytes(arr):
+    if sys.byteorder != 'little':
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _from_little_endian_bytes(typecode, data):
+    if sys.byteorder == 'little':
+        # no need to copy the data
+        return data.cast(typecode)
+    arr = array.array(typecode)
+    arr.frombytes(data)
+    arr.byteswap()
+    return arr
+
+
+class _BinaryDumpReader:
+    r"""
+    Decodes values from binary dump data on demand.
+    """
+    def __init__(self, binary_data):
+        super().__init__()
+
+        header_size = _header_struct.size
+        if len(binary_data) < header_size:
+            raise ValueError("Invalid binary FLM dump (truncated header)")
+
+        (magic, format_version, compressed, num_strings, strings_buffer_len,
+         num_shapes_tokens, num_floats, num_tokens, num_index_tokens) = \
+             _header_struct.unpack_from(binary_data, 0)
+        if magic != _binary_magic:
+            raise ValueError("Invalid binary FLM dump (bad magic header)")
+        if format_version != _binary_format_version:
+            raise ValueError(
+                f"Binary FLM dump format version mismatch: {format_version}, "
+                f"expected {_binary_format_version}"
+            )
+
+        body = memoryview(binary_data)[header_size:]
+        if compressed:
+            body = memoryview(zlib.decompress(body))
+
+        p = 0
+        def _take(nbytes):
+            nonlocal p
+            if p + nbytes > len(body):
+                raise ValueError("Invalid binary FLM dump (truncated data)")
+            chunk = body[p:p+nbytes]
+            p += nbytes
+            return chunk
+
+        self.strings_end_offsets = _from_little_endian_bytes('I', _take(4*num_strings))
+        self.strings_buffer = _take(strings_buffer_len)
+        shapes_tokens = _from_little_endian_bytes('I', _take(4*num_shapes_tokens))
+        self.floats = _from_little_endian_bytes('d', _take(8*num_floats))
+        self.tokens = _from_little_endian_bytes('I', _take(4*num_tokens))
+        index = _from_little_endian_bytes('I', _take(4*num_index_tokens))
+
+        # strings are decoded as they are needed
+        self.strings = [ None ] * num_strings
+
+        self.shapes = []
+        q = 0
+        while q < len(shapes_tokens):
+            nkeys = shapes_tokens[q]
+            self.shapes.append(
+                tuple(self.get_string(k) for k in shapes_tokens[q+1:q+1+nkeys])
+            )
+            q += 1 + nkeys
+
+        # read the index
+        self.dump_info_offset = index[0]
+        num_dumps = index[1]
+        self.dump_offsets = {}
+        q = 2
+        for _ in range(num_dumps):
+            self.dump_offsets[self.get_string(index[q])] = index[q+1]
+            q += 2
+        num_restypes = index[q]
+        q += 1
+        self.resource_offsets = {}
+        for _ in range(num_restypes):
+            restype = self.get_string(index[q])
+            num_resources = index[q+1]
+            # the j-th offset is that of the resource with key str(j)
+            self.resource_offsets[restype] = index[q+2:q+2+num_resources]
+            q += 2 + num_resources
+
+    def release(self):
+        r"""
+        Release the views on the binary data held by this reader, so that the
+        underlying buffer (e.g., a memory map) can be closed.  The reader can
+        no longer be used afterwards.
+        """
+        views = [ self.strings_end_offsets, self.strings_buffer, self.floats,
+                  self.tokens, *self.resource_offsets.values() ]
+        for view in views:
+            if isinstance(view, memoryview):
+                view.release()
+
+    def get_string(self, j):
+        s = self.strings[j]
+        if s is None:
+            start = self.strings_end_offsets[j-1] if j > 0 else 0
+            s = str(self.strings_buffer[start:self.strings_end_offsets[j]], 'utf-8')
+            self.strings[j] = s
+        return s
+
+    def get_dump_info(self):
+        if self.dump_info_offset == _no_offset:
+            return None
+        return self.decode_at(self.dump_info_offset)
+
+    def get_dump_keys(self):
+        return list(self.dump_offsets.keys())
+
+    def get_dump_data(self, key):
+        return self.decode_at(self.dump_offsets[key])
+
+    def get_resource_data(self, restype, reskey):
+        if restype not in self.resource_offsets:
+            raise ValueError(f"Invalid internal resource reference type {restype}")
+        offsets = self.resource_offsets[restype]
+        j = int(reskey) if reskey.isdigit() else -1
+        if j < 0 or j >= len(offsets):
+            raise ValueError(f"Invalid internal resource reference key {restype}/{reskey}")
+        return self.decode_at(offsets[j])
+
+    def decode_at(self, offset):
+
+        tokens = self.tokens
+        strings = self.strings
+        get_string = self.get_string
+        shapes = self.shapes
+        floats = self.floats
+
+        pos = offset
+
+        def _decode():
+            nonlocal pos
+            token = tokens[pos]
+            pos += 1
+            tag = token & _tag_mask
+            payload = token >> _tag_bits
+            if tag == _TAG_STR:
+                s = strings[payload]
+                if s is None:
+                    s = get_string(payload)
+                return s
+            if tag == _TAG_DICT:
+                result = {}
+                for key in shapes[payload]:
+                    result[key] = _decode()
+                return result
+            if tag == _TAG_LIST:
+                return [ _decode() for _ in range(payload) ]
+            if tag == _TAG_MAP:
+                result = {}
+                for _ in range(payload):
+                    key = _decode()
+                    result[key] = _decode()
+                return result
+            if tag == _TAG_INT:
+                return (payload >> 1) if not (payload & 1) else -((payload + 1) >> 1)
+            if tag == _TAG_NONE:
+                return None
+            if tag == _TAG_TRUE:
+                return True
+            if tag == _TAG_FALSE:
+                return False
+            if tag == _TAG_FLOAT:
+                return floats[payload]
+            if tag == _TAG_BIGINT:
+                return int(get_string(payload))
+            raise ValueError(f"Invalid binary FLM dump (unknown value tag {tag})")
+
+        return _decode()
+
+
+def dump_binary(data, *, compress=False):
+    r"""
+    Encode the given dump data in the compact binary format.
+
+    :param data: The dump data, as returned by
+        :py:meth:`flm.flmdump.FLMDataDumper.get_data()`.
+    :param compress: If ``True``, additionally compress the encoded data with
+        ``zlib``.
+    :returns: A :class:`bytes` object.
+    """
+    encoder = _BinaryDumpEncoder()
+    encoder.encode_data(data)
+    return encoder.get_binary(compress=compress)
+
+
+def load_binary(binary_data):
+    r"""
+    Decode data that was encoded with :py:func:`dump_binary`.
+
+    :param binary_data: A :class:`bytes`-like object.
+    :returns: The dump data, which can be passed on to
+        :py:class:`flm.flmdump.FLMDataLoader`.  Resource keys are renumbered
+        with respect to the original dump data.
+    :raises ValueError: If `binary_data` is not a valid binary FLM dump.
+    """
+    return _BinaryDumpReader(binary_data).decode_at(0)
+
+
+class FLMBinaryDataLoader(FLMDataLoader):
+    r"""
+    A :py:class:`~flm.flmdump.FLMDataLoader` that reads binary dump data (see
+    :py:func:`dump_binary`) lazily.
+
+    Only the index of the dump is read when the loader is created.  The data of
+    a dumped object, as well as that of any resources (nodes, latex walkers,
+    parsing states, ...) it refers to, is decoded only when the object is
+    requested via :py:meth:`get_object_dump()`.  Objects that are never
+    requested are never decoded.
+
+    Call :py:meth:`close()` (or use the loader as a context manager) when you
+    no longer need to load objects, to release the binary data (and close the
+    file, for a loader created with :py:meth:`from_file()`).  Objects that were
+    already loaded remain valid.
+
+    Compressed dumps (see the `compress` argument of :py:func:`dump_binary`)
+    are decompressed in full into memory when the loader is created.  Only the
+    decoding of the objects is then done lazily; use an uncompressed dump to
+    avoid reading the full file.
+
+    :param binary_data: A :class:`bytes`-like object (e.g., a :class:`mmap.mmap`
+        instance) containing the binary dump data.  It should not be modified
+        for the lifetime of the loader.
+    :param environment: The :class:`~flm.flmenvironment.FLMEnvironment`
+        instance used to reconstruct the objects.
+    """
+    def __init__(self, binary_data, *, environment):
+        self.binary_dump_reader = _BinaryDumpReader(binary_data)
+        # memory map to close along with the loader, see from_file()
+        self._mmap = None
+        super().__init__(
+            {
+                '_dump': self.binary_dump_reader.get_dump_info(),
+                'dumps': {},
+                'resources': {
+                    restype: {}
+                    for restype in self.binary_dump_reader.resource_offsets
+                },
+            },
+            environment=environment,
+        )
+
+    @classmethod
+    def from_file(cls, filename, *, environment):
+        r"""
+        Create a loader that reads the binary dump stored in the file
+        `filename` via a read-only memory map.  Only those parts of the file
+        that are needed to load the requested objects are read.
+        """
+        with open(filename, 'rb') as f:
+            binary_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            loader = cls(binary_data, environment=environment)
+        except Exception:
+            binary_data.close()
+            raise
+        loader._mmap = binary_data
+        return loader
+
+    def close(self):
+        r"""
+        Release the binary data, and close the file if the loader was created
+        with :py:meth:`from_file()`.  No further objects can be loaded
+        afterwards.  Calling this method again has no effect.
+        """
+        if self.binary_dump_reader is None:
+            return
+        self.binary_dump_reader.release()
+        self.binary_dump_reader = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_reader(self):
+        if self.binary_dump_reader is None:
+            raise ValueError("Can't load objects, the loader was closed")
+        return self.binary_dump_reader
+
+    def get_keys(self):
+        return self._get_reader().get_dump_keys()
+
+    def _get_dump_data(self, key):
+        return self._get_reader().get_dump_data(key)
+
+    def _get_resource_data(self, restype, reskey):
+        return self._get_reader().get_resource_data(restype, reskey)
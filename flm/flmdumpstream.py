@@ -0,0 +1,343 @@
+r"""
+Write FLM dump data incrementally to a file, and read it back with random
+access by key.
+
+The :py:class:`flm.flmdump.FLMDataDumper` keeps all dumped objects and
+resources in memory until :py:meth:`~flm.flmdump.FLMDataDumper.get_data()` is
+called.  When dumping a large number of fragments, use
+:py:class:`FLMDataStreamDumper` instead, which writes each dumped object,
+along with any new resources that it refers to, to a file as soon as it is
+added::
+
+    with FLMDataStreamDumper('dump.flmdumpl', environment=environment) as dumper:
+        for key, fragment in ...:
+            dumper.add_object_dump(key, fragment)
+
+The dump file is a `JSON lines <https://jsonlines.org/>`_ file.  The first
+line contains the dump information (``{"_dump": {...}}``); each following
+line is one of:
+
+- ``["resource", <restype>, <reskey>, <resource data>]``
+
+- ``["dump", <key>, <object data>]``
+
+Each resource is written as soon as it has been dumped, so the data of a
+dumped object follows that of the resources it refers to.  When the dumper is
+closed, an index file (by default, the dump file name with ``.index.json``
+appended) is written with the byte offset of each line of the dump file and
+the size of the dump file.
+
+Use :py:class:`FLMDataStreamLoader` to load objects from the dump file.  Only
+the data of the requested objects and of the resources they refer to is read
+and decoded::
+
+    with FLMDataStreamLoader('dump.flmdumpl', environment=environment) as loader:
+        fragment = loader.get_object_dump('my-fragment')
+
+This module is not available in the JavaScript version of FLM.
+"""
+
+import os.path
+import json
+import mmap
+import weakref
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .flmdump import FLMDataDumper, FLMDataLoader, _dump_version
+
+
+def _default_index_filename(filename):
+    return filename + '.index.json'
+
+
+class FLMDataStreamDumper(FLMDataDumper):
+    r"""
+    A :py:class:`~flm.flmdump.FLMDataDumper` that writes the dumped objects and
+    their resources to a file as they are added, instead of keeping them in
+    memory.
+
+    The dumper only remembers which objects it has already written as
+    resources, so that further references to them produce
+    ``$restype``/``$reskey`` pointers.  It does not keep these objects alive;
+    once an object is garbage-collected, it is forgotten by the dumper.
+
+    Call :py:meth:`close()` (or use the dumper as a context manager) when you
+    are done adding objects, to write the index file.  The data is written to
+    the dump file after each call to :py:meth:`add_object_dump()`.
+
+    :param filename: The name of the dump file to write.  An existing file
+        with that name is overwritten.
+    :param environment: The :class:`~flm.flmenvironment.FLMEnvironment`
+        instance, as for :py:class:`~flm.flmdump.FLMDataDumper`.
+    :param index_filename: The name of the index file to write.  By default,
+        ``filename`` with ``.index.json`` appended.
+    """
+
+    def __init__(self, filename, *, environment, index_filename=None):
+        self.filename = filename
+        if index_filename is None:
+            index_filename = _default_index_filename(filename)
+        self.index_filename = index_filename
+        self._stream = None
+        super().__init__(environment=environment)
+
+    def clear(self):
+        r"""
+        Start over with an empty dump file, discarding all previously written
+        object dumps and resources.
+        """
+        super().clear()
+        if self._stream is not None:
+            self._stream.close()
+        # An index file left over from an earlier dump would not match the
+        # new dump file.  It is written again when the dumper is closed.
+        try:
+            os.remove(self.index_filename)
+        except FileNotFoundError:
+            pass
+        self._stream = open(self.filename, 'wb')
+        self._offset = 0
+        self._index = {
+            '_dump': self.data['_dump'],
+            'dumps': {},
+            'resources': {},
+        }
+        # restype -> { object id -> (reskey, weak reference to object) }
+        self._resource_objects = {}
+        self._resource_counter = 0
+        self._write_line({ '_dump': self.data['_dump'] })
+
+    def get_data(self):
+        raise RuntimeError(
+            "FLMDataStreamDumper writes its data to a file, use "
+            "FLMDataStreamLoader to read it back"
+        )
+
+    def add_object_dump(self, key, obj):
+        if self._stream is None:
+            raise ValueError("Can't add object dumps, the dumper was closed")
+        super().add_object_dump(key, obj)
+        self._stream.flush()
+
+    def close(self):
+        r"""
+        Finish writing the dump file and write the index file.  Calling this
+        method again has no effect.
+        """
+        if self._stream is None:
+            return
+        self._stream.close()
+        self._stream = None
+        self._resource_objects = {}
+        self._index['size'] = self._offset
+        with open(self.index_filename, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ---
+
+    def _write_line(self, linedata):
+        line = json.dumps(linedata, ensure_ascii=False).encode('utf-8') + b'\n'
+        offset = self._offset
+        self._stream.write(line)
+        self._offset += len(line)
+        return offset
+
+    def _store_object_dump(self, key, dump):
+        self._index['dumps'][key] = self._write_line(['dump', key, dump])
+
+    def _find_resource_key(self, restype, y):
+        if restype not in self._resource_objects:
+            return None
+        entry = self._resource_objects[restype].get(id(y), None)
+        if entry is None:
+            return None
+        reskey, yref = entry
+        if yref() is not y:
+            # stale entry for a different object that was garbage-collected
+            return None
+        return reskey
+
+    def _register_resource(self, restype, y, reskey=None):
+        if restype not in self._resource_objects:
+            self._resource_objects[restype] = {}
+        restype_objects = self._resource_objects[restype]
+
+        if reskey is None:
+            # Resource keys can't be the object's id(), because ids are reused
+            # once an object is garbage-collected.
+            reskey = str(self._resource_counter)
+            self._resource_counter += 1
+
+        yid = id(y)
+        def _forget(yref):
+            entry = restype_objects.get(yid, None)
+            if entry is not None and entry[1] is yref:
+                del restype_objects[yid]
+        try:
+            yref = weakref.ref(y, _forget)
+        except TypeError:
+            # object can't be weakly referenced, keep it alive instead
+            yref = lambda: y
+        restype_objects[yid] = (reskey, yref)
+        return reskey
+
+    def _store_resource(self, restype, reskey, resdata):
+        if restype not in self._index['resources']:
+            self._index['resources'][restype] = {}
+        self._index['resources'][restype][reskey] = \
+            self._write_line(['resource', restype, reskey, resdata])
+
+
+def _scan_dump_stream_index(data):
+    # Reconstruct the index by reading the full dump file.
+    index = {
+        '_dump': None,
+        'dumps': {},
+        'resources': {},
+    }
+    offset = 0
+    while offset < len(data):
+        end = data.find(b'\n', offset)
+        if end == -1:
+            end = len(data)
+        line = data[offset:end]
+        if line.strip():
+            linedata = json.loads(line)
+            if isinstance(linedata, dict):
+                index['_dump'] = linedata['_dump']
+            elif linedata[0] == 'dump':
+                index['dumps'][linedata[1]] = offset
+            elif linedata[0] == 'resource':
+                restype = linedata[1]
+                if restype not in index['resources']:
+                    index['resources'][restype] = {}
+                index['resources'][restype][linedata[2]] = offset
+            else:
+                raise ValueError(f"Invalid FLM dump stream line at offset {offset}")
+        offset = end + 1
+    if index['_dump'] is None:
+        raise ValueError("Invalid FLM dump stream (missing dump information)")
+    index['size'] = len(data)
+    return index
+
+
+class FLMDataStreamLoader(FLMDataLoader):
+    r"""
+    A :py:class:`~flm.flmdump.FLMDataLoader` that reads objects from a dump
+    file written by :py:class:`FLMDataStreamDumper`.
+
+    The dump file is memory-mapped and only the lines holding the requested
+    objects, and the resources they refer to, are read and decoded.
+
+    :param filename: The name of the dump file.
+    :param environment: The :class:`~flm.flmenvironment.FLMEnvironment`
+        instance used to reconstruct the objects.
+    :param index_filename: The name of the index file written by the dumper.
+        By default, ``filename`` with ``.index.json`` appended.  If the index
+        file does not exist (e.g., if the dumper was not closed properly) or
+        if it does not match the size of the dump file, the index is
+        reconstructed by reading through the full dump file.  An empty dump
+        file (e.g., one that a dumper has created but not yet written to)
+        has no objects.
+
+    Call :py:meth:`close()` when done loading objects to release the memory
+    map, or use the loader as a context manager.
+    """
+
+    def __init__(self, filename, *, environment, index_filename=None):
+        if index_filename is None:
+            index_filename = _default_index_filename(filename)
+
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # can't mmap an empty file
+                self.stream_data = b''
+            else:
+                self.stream_data = \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self.stream_index = self._load_stream_index(filename, index_filename)
+        except Exception:
+            self.close()
+            raise
+
+        super().__init__(
+            {
+                '_dump': self.stream_index['_dump'],
+                'dumps': {},
+                'resources': {
+                    restype: {}
+                    for restype in self.stream_index['resources']
+                },
+            },
+            environment=environment,
+        )
+
+    def _load_stream_index(self, filename, index_filename):
+        if not len(self.stream_data):
+            return {
+                '_dump': { 'version': _dump_version },
+                'dumps': {},
+                'resources': {},
+                'size': 0,
+            }
+        stream_index = None
+        if os.path.exists(index_filename):
+            with open(index_filename, 'r', encoding='utf-8') as f:
+                stream_index = json.load(f)
+            if stream_index.get('size', None) != len(self.stream_data):
+                logger.debug("Index file %r does not match the dump file %r",
+                             index_filename, filename)
+                stream_index = None
+        if stream_index is None:
+            logger.debug("Scanning dump file %r to build its index", filename)
+            stream_index = _scan_dump_stream_index(self.stream_data)
+        return stream_index
+
+    def close(self):
+        r"""
+        Release the memory map of the dump file.  No further objects can be
+        loaded afterwards.  Calling this method again has no effect.
+        """
+        if self.stream_data is None:
+            return
+        if isinstance(self.stream_data, mmap.mmap):
+            self.stream_data.close()
+        self.stream_data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_keys(self):
+        return list(self.stream_index['dumps'].keys())
+
+    def _read_line_at(self, offset):
+        if self.stream_data is None:
+            raise ValueError("Can't load objects, the loader was closed")
+        end = self.stream_data.find(b'\n', offset)
+        if end == -1:
+            end = len(self.stream_data)
+        return json.loads(self.stream_data[offset:end])
+
+    def _get_dump_data(self, key):
+        return self._read_line_at(self.stream_index['dumps'][key])[2]
+
+    def _get_resource_data(self, restype, reskey):
+        resources_index = self.stream_index['resources']
+        if restype not in resources_index:
+            raise ValueError(f"Invalid internal resource reference type {restype}")
+        if reskey not in resources_index[restype]:
+            raise ValueError(f"Invalid internal resource reference key {restype}/{reskey}")
+        return self._read_line_at(resources_index[restype][reskey])[3]
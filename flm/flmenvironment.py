@@ -237,21 +237,18 @@ class BlocksBuilder:
         char_nodes = []
         for j, node in enumerate(paragraph_nodes):
 
-            # careful, Transcrypt doesn't allow getattr() with third "default" arg.
+            # careful, Transcrypt ignores getattr()'s third "default" arg and
+            # gives `undefined` for a missing attribute.  That's fine as long
+            # as we only test the value's truthiness.
 
             if len(char_nodes) == 0 and first_node is not None \
                and not seen_content_after_heading \
-               and (#getattr(first_node, 'flm_is_block_heading', False):
-                   hasattr(first_node, 'flm_is_block_heading')
-                   and getattr(first_node, 'flm_is_block_heading')
-               ):
+               and getattr(first_node, 'flm_is_block_heading', False):
                 # second item, but the first one was actually the paragraph
                 # run-in header -- this still counts as head
                 is_head = True
 
-            #if getattr(node, 'flm_strip_preceding_whitespace', False):
-            if hasattr(node, 'flm_strip_preceding_whitespace') \
-               and getattr(node, 'flm_strip_preceding_whitespace'):
+            if getattr(node, 'flm_strip_preceding_whitespace', False):
                 if tail_char_node_info is not None:
                     tail_char_node_info['is_tail'] = True
 
@@ -271,9 +268,7 @@ class BlocksBuilder:
                 tail_char_node_info = None
 
             next_node_should_strip_leading_whitespace = False
-            #if getattr(node, 'flm_strip_following_whitespace', False):
-            if hasattr(node, 'flm_strip_following_whitespace') \
-               and getattr(node, 'flm_strip_following_whitespace'):
+            if getattr(node, 'flm_strip_following_whitespace', False):
                 next_node_should_strip_leading_whitespace = True
 
         # find last char_node and mark it is_tail:
@@ -287,15 +282,17 @@ class BlocksBuilder:
             # FLMFragment().truncate_to() produces a new list that contains
             # existing node instances.  ---> Whenever we'd like to add/change a
             # node attribute, create a new instance.
-            chars = (char_node.flm_chars_value
-                     if hasattr(char_node, 'flm_chars_value')
+            old_flm_chars_value = getattr(char_node, 'flm_chars_value', None)
+            # `==`/`!=` rather than `is`, to also match Transcrypt's `undefined`
+            chars = (old_flm_chars_value
+                     if old_flm_chars_value != None
                      else char_node.chars)
             new_flm_chars_value = self.simplify_whitespace_chars(
                 chars,
                 is_head=info['is_head'],
                 is_tail=info['is_tail'],
             )
-            if (getattr(char_node, 'flm_chars_value', None) != new_flm_chars_value):
+            if (old_flm_chars_value != new_flm_chars_value):
                 # avoid cloning object if flm_chars_value already happens to be
                 # correct
                 new_char_node = _clone_flm_node(char_node)
@@ -323,24 +320,15 @@ class BlocksBuilder:
         assert( len(self.blocks) == 0 )
 
         for n in latexnodelist:
-            # careful, Transcrypt doesn't allow getattr() with third "default" arg.
-            n_is_block_level = (
-                getattr(n, 'flm_is_block_level') 
-                if hasattr(n, 'flm_is_block_level')
-                else None
-            )
-            n_is_block_heading = (
-                getattr(n, 'flm_is_block_heading')
-                if hasattr(n, 'flm_is_block_heading')
-                else False
-            )
+            # careful, Transcrypt ignores getattr()'s third "default" arg (see
+            # above); only test these values' truthiness.
+            n_is_block_level = getattr(n, 'flm_is_block_level', None)
+            n_is_block_heading = getattr(n, 'flm_is_block_heading', False)
             if n_is_block_level:
                 # new block-level item -- causes paragraph break
                 self.flush_paragraph()
 
-                #if getattr(n, 'flm_is_paragraph_break_marker', False):
-                if hasattr(n, 'flm_is_paragraph_break_marker') \
-                   and getattr(n, 'flm_is_paragraph_break_marker'):
+                if getattr(n, 'flm_is_paragraph_break_marker', False):
                     # it's only a paragraph break marker '\n\n' -- don't include
                     # it as a block
                     continue
@@ -361,9 +349,7 @@ class BlocksBuilder:
             if not self.pending_paragraph_nodes:
                 paragraph_started_yet = False
             if len(self.pending_paragraph_nodes) == 1:
-                #if getattr(self.pending_paragraph_nodes[0], 'flm_is_block_heading', False):
-                if hasattr(self.pending_paragraph_nodes[0], 'flm_is_block_heading') \
-                   and getattr(self.pending_paragraph_nodes[0], 'flm_is_block_heading'):
+                if getattr(self.pending_paragraph_nodes[0], 'flm_is_block_heading', False):
                     # we've only seen it's a block lead-in heading so far
                     paragraph_started_yet = False
 
@@ -570,12 +556,9 @@ class NodesFinalizer:
 
     def infer_is_block_level_nodelist(self, latexnodelist):
         for n in latexnodelist:
-            #n_is_block_level = getattr(n, 'flm_is_block_level', None)
-            n_is_block_level = (
-                getattr(n, 'flm_is_block_level')
-                if hasattr(n, 'flm_is_block_level')
-                else None
-            )
+            # (Transcrypt gives `undefined` rather than the default value for
+            # a missing attribute, which is falsy as well)
+            n_is_block_level = getattr(n, 'flm_is_block_level', None)
             # note that it suffices to check for flm_is_block_level to tell if
             # the node is block-level; the properties flm_is_block_heading and
             # flm_is_paragraph_break_marker can only be set if
@@ -906,6 +889,33 @@ def features_sorted_by_dependencies(features):
 # ------------------------------------------------------------------------------
 
 
+### BEGINPATCH_LATEX_CONTEXT_FINGERPRINT
+def _get_latex_context_fingerprint(features_definitions):
+    # `features_definitions` is a list of `(feature, definitions)` pairs, where
+    # `definitions` is the return value of add_latex_context_definitions().
+    # Spec objects are compared by class and `_fields` values.  Other objects
+    # (e.g., spec objects that don't declare their `_fields`) only compare
+    # equal to themselves.
+    return [
+        (f.feature_name, f.__class__, _get_definitions_fingerprint(definitions))
+        for (f, definitions) in features_definitions
+    ]
+
+def _get_definitions_fingerprint(x):
+    if isinstance(x, (list, tuple)):
+        return [ _get_definitions_fingerprint(y) for y in x ]
+    if isinstance(x, dict):
+        return { k: _get_definitions_fingerprint(v) for k, v in x.items() }
+    if hasattr(x, '_fields'):
+        return (
+            x.__class__,
+            [ (fieldname, _get_definitions_fingerprint(getattr(x, fieldname)))
+              for fieldname in x._fields ],
+        )
+    return x
+### ENDPATCH_LATEX_CONTEXT_FINGERPRINT
+
+
 class FLMEnvironment:
     r"""
     The central class that collects feature definitions and parsing
@@ -923,6 +933,14 @@ class FLMEnvironment:
     Typically, use :py:func:`make_standard_environment` instead of
     constructing this class directly.
 
+    Once it is set up, an environment can be shared by several threads that
+    concurrently parse fragments and render documents.  The environment, its
+    features, and its spec objects are not modified by parsing or rendering;
+    all per-document state lives in the :py:class:`~flm.flmdocument.FLMDocument`
+    and in its render context.  Configuration methods such as
+    :py:meth:`define_parsing_mode` should be called before the environment is
+    shared.
+
     :param features: A list of :py:class:`~flm.feature.Feature` instances.
         Features are automatically sorted by dependency order.
     :param parsing_state: A :py:class:`FLMParsingState` instance to serve
@@ -932,7 +950,16 @@ class FLMEnvironment:
     :param latex_context: A
         :py:class:`pylatexenc.macrospec.LatexContextDb` instance.  If
         ``None`` is given to :py:func:`make_standard_environment`, a new
-        empty context database is created automatically.
+        empty context database is created automatically.  The features'
+        definitions are added to this context database, which is then
+        frozen.  If the given context database is already frozen, it is
+        used as is and the features' definitions are not added again.  This
+        way, environments with the same features can share the
+        ``latex_context`` of an existing environment instead of rebuilding
+        it.  A ``ValueError`` is raised if the frozen context was not built
+        by an environment with the same features, i.e., features with the
+        same names and classes that provide the same definitions (spec
+        objects are compared by class and `_fields` values).
     :param tolerant_parsing: If ``True``, parsing errors are handled
         more leniently.
     :param parsing_mode_deltas: A dictionary mapping parsing mode names
@@ -973,14 +1000,24 @@ class FLMEnvironment:
             text_processing_options=text_processing_options
         )
 
-        if self.parsing_state.latex_context is None:
+        if self.parsing_state.latex_context is None and self.latex_context.frozen:
+
+            # reuse a latex context that was already built for the same
+            # features, e.g., the latex_context of another environment.  A
+            # frozen context can't be modified, so it is safe to share it.
+            self._check_prebuilt_latex_context()
+
+            self.parsing_state.latex_context = self.latex_context
+
+        elif self.parsing_state.latex_context is None:
 
             # set the parsing_state's latex_context appropriately.
+            features_definitions = []
             for f in self.features:
                 moredefs = f.add_latex_context_definitions()
-                logger.debug(
-                    f"add_latex_context_definitions of “{f.feature_name}” -> {repr(moredefs)}"
-                )
+                features_definitions.append( (f, moredefs) )
+                logger.debug("add_latex_context_definitions of “%s” -> %r",
+                             f.feature_name, moredefs)
                 if moredefs is not None:
                     moredefs = dict(moredefs)
                     if len(moredefs):
@@ -991,8 +1028,11 @@ class FLMEnvironment:
                             **moredefs
                         )
 
-            # prevent further changes to latex context
+            # prevent further changes to latex context; remember which
+            # features it was built with in case it is reused
             self.latex_context.freeze()
+            self.latex_context.flm_features_fingerprint = \
+                _get_latex_context_fingerprint(features_definitions)
 
             # set the parsing state's latex_context
             self.parsing_state.latex_context = self.latex_context
@@ -1006,6 +1046,25 @@ class FLMEnvironment:
 
 
 
+    def _check_prebuilt_latex_context(self):
+        if not hasattr(self.latex_context, 'flm_features_fingerprint'):
+            raise ValueError(
+                "The given latex_context is frozen but it was not built by an "
+                "FLMEnvironment.  A frozen latex_context can only be reused "
+                "with the same features that it was built with."
+            )
+        fingerprint = _get_latex_context_fingerprint([
+            (f, f.add_latex_context_definitions())
+            for f in self.features
+        ])
+        if fingerprint != self.latex_context.flm_features_fingerprint:
+            raise ValueError(
+                "The given latex_context was built with other features, or "
+                "with another configuration of the features, than those of "
+                "this environment.  A frozen latex_context can only be reused "
+                "with the same features that it was built with."
+            )
+
     def supports_feature(self, feature_name):
         r"""
         Return ``True`` if a feature with the given name is registered in
@@ -1071,7 +1130,12 @@ class FLMEnvironment:
     def define_parsing_mode(self, parsing_mode, parsing_mode_delta):
         if parsing_mode in self.parsing_mode_deltas:
             raise ValueError(f"Parsing mode ‘{parsing_mode}’ already defined!")
-        self.parsing_mode_deltas[parsing_mode] = parsing_mode_delta
+        # replace the dictionary instead of updating it in place, so that
+        # threads that are concurrently creating latex walkers never see a
+        # partially updated dictionary
+        parsing_mode_deltas = dict(self.parsing_mode_deltas)
+        parsing_mode_deltas[parsing_mode] = parsing_mode_delta
+        self.parsing_mode_deltas = parsing_mode_deltas
 
     def make_parsing_state(self, is_block_level, parsing_mode=None):
         # subclasses might do something interesting with parsing_mode, we ignore
@@ -1452,7 +1516,10 @@ def make_standard_environment(features, parsing_state=None, latex_context=None,
         If ``None``, one is created via :py:func:`standard_parsing_state`.
     :param latex_context: An optional
         :py:class:`pylatexenc.macrospec.LatexContextDb` instance.  If
-        ``None``, a new empty context is created.
+        ``None``, a new empty context is created.  You can specify the
+        (frozen) ``latex_context`` of an existing environment that has the
+        same features with the same configuration, to avoid rebuilding the
+        latex context; see :py:class:`FLMEnvironment`.
     :param flm_environment_options: Additional keyword arguments passed to
         the :py:class:`FLMEnvironment` constructor (e.g.,
         ``tolerant_parsing``, ``text_processing_options``).
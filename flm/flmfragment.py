@@ -121,6 +121,11 @@ class FLMFragment:
         self.silent = silent
         self.parsing_mode = parsing_mode
 
+        # see get_first_paragraph() and truncate_to()
+        self._first_paragraph = None
+        self._truncation_index = None
+        self._truncated_fragments = {}
+
         if isinstance(flm_text, latexnodes_nodes.LatexNodeList):
             # We want to initialize a fragment with already-parsed node lists.
             # This is for internal use only!
@@ -333,7 +338,15 @@ class FLMFragment:
         r"""
         Returns a new :py:class:`FLMFragment` object that contains all material
         comprising the first paragraph in the present fragment.
+
+        The first paragraph is determined only once; further calls return the
+        same fragment object.
         """
+        if self._first_paragraph is None:
+            self._first_paragraph = self._make_first_paragraph()
+        return self._first_paragraph
+
+    def _make_first_paragraph(self):
         nodelists_paragraphs = self.nodes.split_at_node(
             lambda n: (n.isNodeType(latexnodes_nodes.LatexSpecialsNode)
                        and n.specials_chars == '\n\n'),
@@ -373,17 +386,35 @@ class FLMFragment:
         :param truncation_marker: String appended at the truncation point
             (default: ``' …'``).
         :returns: A new :py:class:`FLMFragment` with truncated content.
+
+        The estimated character counts of the fragment's top-level nodes are
+        computed once, the first time this method is called, so that the
+        truncation only needs to inspect the node at which the fragment is cut.
+        Truncated fragments are remembered, so calling this method again with
+        the same arguments returns the same fragment object.
         """
 
+        memo_key = f"{chars}:{min_chars}:{truncation_marker}"
+        if memo_key in self._truncated_fragments:
+            return self._truncated_fragments[memo_key]
+
+        if self._truncation_index is None:
+            self._truncation_index = _NodeListTruncationIndex(self.nodes)
+
         trunc = _NodeListTruncator(chars=chars, min_chars=min_chars,
                                    truncation_marker=truncation_marker)
 
-        newnodes = trunc.truncate_node_list(self.nodes)
+        newnodes = trunc.truncate_node_list(
+            self.nodes,
+            truncation_index=self._truncation_index
+        )
 
-        return self.environment.make_fragment(
+        new_fragment = self.environment.make_fragment(
             flm_text=newnodes,
             **self._attributes(what=f"{self.what}:tr-{chars}")
         )
+        self._truncated_fragments[memo_key] = new_fragment
+        return new_fragment
 
 
 
@@ -392,24 +423,87 @@ class FLMFragment:
 
 
 
+class _NodeListTruncationIndex:
+    r"""
+    Estimated character counts of the top-level nodes of a node list, used to
+    locate the node at which :py:class:`_NodeListTruncator` cuts the node list.
+
+    `count_before[j]` is the estimated number of characters of the nodes
+    preceding the `j`-th node.  The truncator can only stop at a node in which
+    it compares a node's length with the remaining room; `checked_nodes` lists
+    the indices of those nodes and `checked_counts` the estimated number of
+    characters up to and including each of them.
+    """
+    def __init__(self, nodes):
+        super().__init__()
+
+        # a truncator without any character limit only counts characters
+        counter = _NodeListTruncator(chars=None)
+
+        self.count_before = []
+        self.checked_nodes = []
+        self.checked_counts = []
+        for j in range(len(nodes)):
+            self.count_before.append(counter.count)
+            num_checks = counter.num_checks
+            counter.collect_node(nodes[j])
+            if counter.num_checks > num_checks:
+                self.checked_nodes.append(j)
+                self.checked_counts.append(counter.count)
+
+    def find_first_node_exceeding(self, chars):
+        r"""
+        Return the index of the first top-level node at which a truncator with
+        the given `chars` limit does not have enough room left, or `None` if
+        the whole node list fits.
+        """
+        # checked_counts is nondecreasing -- binary search for the first entry
+        # that is >= chars
+        lo = 0
+        hi = len(self.checked_counts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.checked_counts[mid] < chars:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo >= len(self.checked_nodes):
+            return None
+        return self.checked_nodes[lo]
+
+
 class _NodeListTruncator:
     def __init__(self, chars, min_chars=None, truncation_marker=None):
         super().__init__()
-        self.chars = chars
+        self.chars = chars  # `None` to only count characters
         self.min_chars = min_chars
         self.truncation_marker = truncation_marker
 
         self.count = 0
+        # number of times we compared a node's length with the remaining room
+        self.num_checks = 0
 
-    def truncate_node_list(self, nodes):
+    def truncate_node_list(self, nodes, truncation_index=None):
         self.count = 0
-        newnodes = self.collect_nodes(nodes)
+        start_j = 0
+        if truncation_index is not None:
+            # all nodes before this one fit, no need to look at them
+            start_j = truncation_index.find_first_node_exceeding(self.chars)
+            if start_j is None:
+                return nodes # no truncation was necessary
+            self.count = truncation_index.count_before[start_j]
+        newnodes = self.collect_nodes(nodes, start_j)
         if newnodes is None:
             return nodes # no truncation was necessary
         return newnodes
 
-    def collect_nodes(self, nodes):
-        for j, node in enumerate(nodes):
+    def _has_room_for(self, length):
+        self.num_checks += 1
+        return self.chars is None or length < (self.chars - self.count)
+
+    def collect_nodes(self, nodes, start_j=0):
+        for j in range(start_j, len(nodes)):
+            node = nodes[j]
             newnode = self.collect_node(node)
             if newnode is not None:
                 newnodes = nodes[:j]
@@ -519,7 +613,7 @@ class _NodeListTruncator:
         # no idea how to deal with this in general---let's simply inspect the
         # entire source code for this specials including arguments
         my_length = len(node.latex_verbatim())
-        if my_length < (self.chars - self.count):
+        if self._has_room_for(my_length):
             # enough room remaining -- keep going
             self.count += my_length
             return None
@@ -530,7 +624,7 @@ class _NodeListTruncator:
 
         estimated_length = self.estimate_simple_node_char_count(node)
 
-        if estimated_length < (self.chars - self.count):
+        if self._has_room_for(estimated_length):
             # enough room remaining -- keep going
             self.count += estimated_length
             return None
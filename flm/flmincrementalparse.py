@@ -0,0 +1,368 @@
+r"""
+Re-parse only the part of a fragment that is affected by an edit of its source
+text.
+
+When a long document is edited (e.g., in a live-preview editor), usually only
+one or two paragraphs change between two successive versions of the text.
+Instead of parsing the full new text again, :py:func:`reparse_fragment_edit`
+re-parses only the top-level paragraphs (the blocks delimited by paragraph
+breaks, see :py:class:`~flm.flmenvironment.BlocksBuilder`) that the edit
+touches, and splices the resulting nodes into the existing node tree::
+
+    fragment = environment.make_fragment(flm_text, what='document')
+    ...
+    fragment = reparse_fragment_text(fragment, new_flm_text)
+
+The nodes that follow the edited region are reused as they are, with their
+``pos`` and ``pos_end`` offsets shifted by the change in length of the text.
+The result is the same as parsing the new text from scratch.  If the edited
+region cannot be delimited (e.g., the edit opens a group or an environment that
+is only closed much later in the text), or if re-parsing the region fails, the
+full new text is parsed instead, so that any error is reported exactly as it
+would be with :py:meth:`~flm.flmenvironment.FLMEnvironment.make_fragment`.
+
+.. warning::
+
+   The nodes of the previous fragment are updated in place and are shared
+   with the new fragment.  Do not use the previous fragment anymore after
+   calling these functions.
+
+This module is not available in the JavaScript version of FLM.
+"""
+
+import bisect
+
+import logging
+logger = logging.getLogger(__name__)
+
+import pylatexenc.latexnodes.nodes as latexnodes_nodes
+import pylatexenc.latexnodes.parsers as latexnodes_parsers
+from pylatexenc.latexnodes import LatexWalkerError, ParsedArguments
+
+
+def find_text_edit(old_text, new_text):
+    r"""
+    Determine a single edit that transforms `old_text` into `new_text`.
+
+    Returns a tuple ``(offset, removed_length, inserted_text)``: the text
+    ``old_text[offset:offset+removed_length]`` was replaced by
+    `inserted_text`.  The edit is delimited by the longest common prefix and
+    suffix of the two strings.  Returns `None` if both strings are equal.
+    """
+    if old_text == new_text:
+        return None
+
+    max_common = min(len(old_text), len(new_text))
+
+    # compare slices rather than single characters, by bisection
+    prefix_len, hi = 0, max_common
+    while prefix_len < hi:
+        mid = (prefix_len + hi + 1) // 2
+        if old_text[prefix_len:mid] == new_text[prefix_len:mid]:
+            prefix_len = mid
+        else:
+            hi = mid - 1
+
+    len_old, len_new = len(old_text), len(new_text)
+    suffix_len, hi = 0, max_common - prefix_len
+    while suffix_len < hi:
+        mid = (suffix_len + hi + 1) // 2
+        if old_text[len_old-mid:len_old-suffix_len] \
+           == new_text[len_new-mid:len_new-suffix_len]:
+            suffix_len = mid
+        else:
+            hi = mid - 1
+
+    return (
+        prefix_len,
+        len_old - prefix_len - suffix_len,
+        new_text[prefix_len:len_new-suffix_len],
+    )
+
+
+def reparse_fragment_text(fragment, new_flm_text):
+    r"""
+    Return a new :py:class:`~flm.flmfragment.FLMFragment` for the source text
+    `new_flm_text`, which is an edited version of the source text of
+    `fragment`.  The edit is determined with :py:func:`find_text_edit` and
+    only the affected paragraphs are re-parsed, see
+    :py:func:`reparse_fragment_edit`.
+    """
+    edit = find_text_edit(fragment.flm_text, new_flm_text)
+    if edit is None:
+        return fragment
+    offset, removed_length, inserted_text = edit
+    return reparse_fragment_edit(fragment, offset, removed_length, inserted_text)
+
+
+def reparse_fragment_edit(fragment, offset, removed_length, inserted_text):
+    r"""
+    Return a new :py:class:`~flm.flmfragment.FLMFragment` for the source text of
+    `fragment` in which the `removed_length` characters starting at `offset`
+    are replaced by `inserted_text`.
+
+    Only the top-level paragraphs that overlap with the edit are re-parsed.
+    The fragment's other nodes are reused in the new fragment (see the warning
+    in the module documentation).
+
+    :param fragment: The :py:class:`~flm.flmfragment.FLMFragment` to update.
+        It must have been parsed from its `flm_text`.
+    :param offset: The position in the old source text at which the edit
+        starts.
+    :param removed_length: The number of characters of the old source text
+        that are removed.
+    :param inserted_text: The text that is inserted at `offset`.
+    :returns: A new :py:class:`~flm.flmfragment.FLMFragment` instance.
+    """
+    old_text = fragment.flm_text
+    if offset < 0 or removed_length < 0 or offset + removed_length > len(old_text):
+        raise ValueError(
+            f"Invalid edit (offset={offset}, removed_length={removed_length}) for "
+            f"a fragment source text of length {len(old_text)}"
+        )
+
+    new_text = old_text[:offset] + inserted_text + old_text[offset+removed_length:]
+
+    reparser = _FragmentEditReparser(fragment, offset, removed_length, inserted_text,
+                                     new_text)
+    new_fragment = reparser.reparse()
+    if new_fragment is not None:
+        return new_fragment
+
+    logger.debug("Could not reparse edit in %r incrementally, parsing full text",
+                 fragment)
+    return fragment.environment.make_fragment(
+        new_text,
+        tolerant_parsing=fragment.tolerant_parsing,
+        **fragment._attributes()
+    )
+
+
+
+class _FragmentEditReparser:
+    def __init__(self, fragment, offset, removed_length, inserted_text, new_text):
+        super().__init__()
+        self.fragment = fragment
+        self.old_text = fragment.flm_text
+        self.new_text = new_text
+        self.offset = offset
+        # end of the edited region, in the old and in the new text
+        self.old_edit_end = offset + removed_length
+        self.new_edit_end = offset + len(inserted_text)
+        self.pos_delta = len(inserted_text) - removed_length
+
+    def reparse(self):
+        # Returns the new fragment, or None if the full text needs to be parsed.
+
+        fragment = self.fragment
+        old_walker = fragment.latex_walker
+        old_nodes = fragment.nodes
+
+        if old_walker is None or old_walker.s != self.old_text:
+            # fragment was not parsed from its flm_text (e.g., it was created
+            # from a node list)
+            return None
+        if any( (n is None or n.pos is None) for n in old_nodes ):
+            return None
+
+        # Start re-parsing right after the last paragraph break that is
+        # followed by some non-whitespace text before the edit.  (A paragraph
+        # break also absorbs blank lines that follow it, so the extent of a
+        # paragraph break that is only followed by whitespace up to the edit
+        # might change.)
+        text_end = self.offset
+        while text_end > 0 and self.old_text[text_end-1] in ' \t\r\n':
+            text_end -= 1
+        j_start = 0
+        for j, n in enumerate(old_nodes):
+            if n.pos_end >= text_end:
+                break
+            if getattr(n, 'flm_is_paragraph_break_marker', False):
+                j_start = j + 1
+        region_pos = old_nodes[j_start].pos if j_start < len(old_nodes) \
+            else len(self.old_text)
+
+        # Positions of the top-level nodes after the edit that start a new
+        # paragraph, at which we can resume using the existing nodes.
+        old_node_positions = [ n.pos for n in old_nodes ] + [ len(self.old_text) ]
+        j_resume_min = bisect.bisect_left(old_node_positions, self.old_edit_end)
+        self.old_resume_positions = {
+            old_node_positions[j]: j
+            for j in range(j_resume_min, len(old_node_positions))
+            if j == 0
+               or getattr(old_nodes[j-1], 'flm_is_paragraph_break_marker', False)
+        }
+
+        latex_walker = fragment.environment.make_latex_walker(
+            self.new_text,
+            standalone_mode=fragment.standalone_mode,
+            is_block_level=fragment.is_block_level,
+            parsing_mode=fragment.parsing_mode,
+            resource_info=fragment.resource_info,
+            tolerant_parsing=fragment.tolerant_parsing,
+            what=fragment.what,
+            input_lineno_colno_offsets=old_walker.input_lineno_colno_offsets,
+        )
+
+        try:
+            region_nodes, _ = latex_walker.parse_content(
+                latexnodes_parsers.LatexGeneralNodesParser(
+                    stop_nodelist_condition=self._region_stop_condition,
+                    require_stop_condition_met=False,
+                ),
+                token_reader=latex_walker.make_token_reader(pos=region_pos),
+            )
+        except LatexWalkerError as e:
+            logger.debug("Error while reparsing edited region: %s", e)
+            return None
+
+        if len(region_nodes) and self._region_stop_condition(region_nodes):
+            j_resume = self.old_resume_positions[region_nodes[-1].pos_end - self.pos_delta]
+        else:
+            # reached the end of the text
+            j_resume = len(old_nodes)
+
+        logger.debug("Reparsed edited region, replacing top-level nodes [%d:%d] by %d "
+                     "new nodes", j_start, j_resume, len(region_nodes))
+
+        prefix_nodes = list(old_nodes[:j_start])
+        suffix_nodes = list(old_nodes[j_resume:])
+        all_nodes = prefix_nodes + list(region_nodes) + suffix_nodes
+
+        # Reuse the blocks (paragraphs) of the existing node list before and
+        # after the edited region, if the node list is still block-level.
+        # Blocks never extend across a paragraph break, so they are the same
+        # as those that a full decomposition of the new node list would give.
+        old_blocks = getattr(old_nodes, 'flm_blocks', None)
+        is_block_level = old_nodes.parsing_state.is_block_level
+        if is_block_level is None:
+            is_block_level = any(
+                getattr(n, 'flm_is_block_level', None) for n in all_nodes
+            )
+        if is_block_level and old_blocks is not None:
+            region_blocks = getattr(region_nodes, 'flm_blocks', None)
+            if region_blocks is None:
+                region_blocks = fragment.environment.nodes_finalizer \
+                    .make_blocks_builder(region_nodes).build_blocks()
+            suffix_pos = old_node_positions[j_resume]
+            prefix_blocks = [ b for b in old_blocks if b.pos < region_pos ]
+            suffix_blocks = [ b for b in old_blocks if b.pos >= suffix_pos ]
+        else:
+            region_blocks, prefix_blocks, suffix_blocks = [], [], []
+            old_blocks = None
+
+        # Keep using the fragment's latex walker (which the nodes before and
+        # after the edited region refer to), updated with the new text.
+        _relocate_nodes(list(region_nodes) + region_blocks, from_walker=latex_walker,
+                        to_walker=old_walker, pos_delta=0)
+        if self.pos_delta:
+            _relocate_nodes(suffix_nodes + suffix_blocks, from_walker=old_walker,
+                            to_walker=old_walker, pos_delta=self.pos_delta,
+                            min_pos=self.old_edit_end)
+        old_walker.s = self.new_text
+        old_walker._line_no_calc = None # recomputed when needed, for the new text
+
+        if old_blocks is not None:
+            new_nodes = latexnodes_nodes.LatexNodeList(
+                all_nodes,
+                parsing_state=old_nodes.parsing_state,
+                latex_walker=old_walker,
+            )
+            new_nodes.flm_nodelist_finalized = True
+            new_nodes.flm_is_block_level = True
+            new_nodes.flm_blocks = prefix_blocks + region_blocks + suffix_blocks
+        else:
+            new_nodes = old_walker.make_nodelist(
+                all_nodes,
+                parsing_state=old_nodes.parsing_state,
+            )
+
+        return fragment.environment.make_fragment(
+            new_nodes,
+            tolerant_parsing=fragment.tolerant_parsing,
+            _flm_text_if_loading_nodes=self.new_text,
+            **fragment._attributes()
+        )
+
+    def _region_stop_condition(self, nodelist):
+        # Stop after a paragraph break that lies after the edit and after
+        # which the old text had a top-level node (or its end).  The remaining
+        # text is unchanged, so parsing it again would give the same nodes.
+        n = nodelist[-1]
+        return (
+            n is not None
+            and getattr(n, 'flm_is_paragraph_break_marker', False)
+            and n.pos_end >= self.new_edit_end
+            and (n.pos_end - self.pos_delta) in self.old_resume_positions
+        )
+
+
+
+_relocate_skip_fields = ('latex_walker', 'parsing_state', 'spec')
+
+_relocate_container_types = (
+    latexnodes_nodes.LatexNode,
+    latexnodes_nodes.LatexNodeList,
+    ParsedArguments,
+    list,
+    tuple,
+    dict,
+)
+
+def _relocate_nodes(nodes, *, from_walker, to_walker, pos_delta, min_pos=0):
+    # Point all nodes (and node lists) parsed by `from_walker` that can be
+    # reached from `nodes` to `to_walker`, shifting the positions of those at
+    # or after `min_pos` by `pos_delta`.  Besides the node lists and arguments,
+    # this also covers the nodes stored in the nodes' flm_* annotations (e.g.
+    # the blocks of node lists, whose chars nodes might be copies of the
+    # original ones).  Nodes that were parsed by another walker (e.g.
+    # substitution macro contents) are left alone.
+    visited = set()
+    stack = list(nodes)
+    while stack:
+        x = stack.pop()
+        if x is None:
+            continue
+        if isinstance(x, (list, tuple)):
+            stack.extend(x)
+            continue
+        if isinstance(x, dict):
+            stack.extend(x.values())
+            continue
+        if not isinstance(x, _relocate_container_types):
+            continue
+        if id(x) in visited:
+            continue
+        visited.add(id(x))
+
+        x_latex_walker = getattr(x, 'latex_walker', None)
+        if x_latex_walker is from_walker:
+            x.latex_walker = to_walker
+            _shift_pos(x, pos_delta, min_pos)
+        elif x_latex_walker is None and isinstance(x, latexnodes_nodes.LatexNodeList) \
+             and _nodelist_parsed_by(x, (from_walker, to_walker)):
+            # node list assembled by a feature from parsed nodes (e.g., a
+            # heading's content); its position is that of its nodes
+            _shift_pos(x, pos_delta, min_pos)
+
+        for fieldname, value in x.__dict__.items():
+            # (skip private attributes, such as _fields or cached values)
+            if fieldname[0] == '_' or fieldname in _relocate_skip_fields:
+                continue
+            if isinstance(value, _relocate_container_types):
+                stack.append(value)
+
+
+def _shift_pos(x, pos_delta, min_pos):
+    if not pos_delta or x.pos is None or x.pos < min_pos:
+        return
+    x.pos += pos_delta
+    if x.pos_end is not None:
+        x.pos_end += pos_delta
+
+
+def _nodelist_parsed_by(nodelist, latex_walkers):
+    for n in nodelist.nodelist:
+        if n is not None:
+            return any( (n.latex_walker is w) for w in latex_walkers )
+    return False
@@ -28,6 +28,30 @@ from ..flmrendercontext import FLMRenderContext
 from ..flmrecomposer import FLMNodesFlmRecomposer
 
 
+# The recomposer doesn't keep any state between calls, so a single instance
+# can be shared
+_flm_text_recomposer = FLMNodesFlmRecomposer()
+
+
+### BEGINPATCH_NODE_CLASS_DISPATCH_KEY
+def _node_class_dispatch_key(node):
+    return node.__class__
+### ENDPATCH_NODE_CLASS_DISPATCH_KEY
+
+
+# Order in which node types are tested to determine which render_node_*()
+# method handles a given node class (see FragmentRenderer.render_node()).
+_render_node_method_names_by_node_type = [
+    (nodes.LatexCharsNode, 'render_node_chars'),
+    (nodes.LatexCommentNode, 'render_node_comment'),
+    (nodes.LatexGroupNode, 'render_node_group'),
+    (nodes.LatexMacroNode, 'render_node_macro'),
+    (nodes.LatexEnvironmentNode, 'render_node_environment'),
+    (nodes.LatexSpecialsNode, 'render_node_specials'),
+    (nodes.LatexMathNode, 'render_node_math'),
+]
+
+
 
 class FragmentRenderer:
     r"""
@@ -64,6 +88,9 @@ class FragmentRenderer:
             for k,v in config.items():
                 setattr(self, k, v)
 
+        # node class -> bound render_node_*() method; see render_node()
+        self._render_node_handlers = {}
+
 
     def document_render_start(self, render_context):
         r"""Called by :py:meth:`FLMDocument.render()
@@ -186,6 +213,10 @@ class FragmentRenderer:
         an ``flm_replace_by_node`` attribute, that replacement node is
         rendered instead.
 
+        The node type is determined only once per node class; the
+        corresponding bound ``render_node_*`` method is then cached on the
+        renderer instance.
+
         :param node: A pylatexenc node.
         :param render_context: The current render context.
         :returns: The rendered output string for this node.
@@ -200,22 +231,13 @@ class FragmentRenderer:
                 # custom macros, etc.
                 return self.render_node(node.flm_replace_by_node, render_context)
 
-            if node.isNodeType(nodes.LatexCharsNode):
-                return self.render_node_chars(node, render_context)
-            if node.isNodeType(nodes.LatexCommentNode):
-                return self.render_node_comment(node, render_context)
-            if node.isNodeType(nodes.LatexGroupNode):
-                return self.render_node_group(node, render_context)
-            if node.isNodeType(nodes.LatexMacroNode):
-                return self.render_node_macro(node, render_context)
-            if node.isNodeType(nodes.LatexEnvironmentNode):
-                return self.render_node_environment(node, render_context)
-            if node.isNodeType(nodes.LatexSpecialsNode):
-                return self.render_node_specials(node, render_context)
-            if node.isNodeType(nodes.LatexMathNode):
-                return self.render_node_math(node, render_context)
-
-            raise ValueError(f"Invalid node type: {node!r}")
+            key = _node_class_dispatch_key(node)
+            handler = self._render_node_handlers.get(key)
+            if handler is None:
+                handler = self._get_render_node_handler(node)
+                self._render_node_handlers[key] = handler
+
+            return handler(node, render_context)
 
         except LatexWalkerLocatedError as e:
             # add open LaTeX context!
@@ -228,12 +250,19 @@ class FragmentRenderer:
             raise err
         
 
+    def _get_render_node_handler(self, node):
+        # The node type tests are only performed the first time a given node
+        # class is encountered; render_node() caches the resulting handler.
+        for (node_type, method_name) in _render_node_method_names_by_node_type:
+            if node.isNodeType(node_type):
+                return getattr(self, method_name)
+        raise ValueError(f"Invalid node type: {node!r}")
+
     def render_node_chars(self, node, render_context):
-        if hasattr(node, 'flm_chars_value'): # transcrypt doesn't like getattr with default arg
-            chars_value = node.flm_chars_value
-        else:
-            chars_value = None
-        if chars_value is None:
+        chars_value = getattr(node, 'flm_chars_value', None)
+        # Transcrypt ignores getattr()'s default arg and gives `undefined` for a
+        # missing attribute; use `==` because `is None` wouldn't match it.
+        if chars_value == None:
             # might happen if the chars is not specifically in a node list
             chars_value = node.chars
         return self.render_value( chars_value, render_context )
@@ -355,11 +384,34 @@ class FragmentRenderer:
 
         Used internally when rendering math content verbatim.
 
+        The recomposed text is cached on the node (or nodelist) object, so that
+        recomposing the same node again, e.g., in the second pass of a
+        two-pass render or when rendering the same fragment in another
+        output format, does not walk the node tree again.  A nodelist that
+        isn't cached is recomposed from the (cached) recomposed text of its
+        nodes; this way, a new nodelist built from existing nodes, such as the
+        contents of a math environment with inserted equation tags, is cheap
+        to recompose, too.
+
         :param node: A pylatexenc node or nodelist.
         :returns: The reconstructed FLM source string.
         """
-        flm = FLMNodesFlmRecomposer().recompose_flm_text(node)
-        logger.debug("recomposed flm ‘%s’ for node: %r", flm, node)
+        if hasattr(node, '_flm_recomposed_flm_text'):
+            return node._flm_recomposed_flm_text
+
+        if isinstance(node, nodes.LatexNodeList):
+            flm = "".join([
+                self.recompose_latex(n)
+                for n in node.nodelist
+                if n is not None
+            ])
+        else:
+            flm = _flm_text_recomposer.recompose_flm_text(node)
+            if flm is None:
+                flm = ''
+            logger.debug("recomposed flm ‘%s’ for node: %r", flm, node)
+
+        node._flm_recomposed_flm_text = flm
         return flm
 
 
@@ -739,7 +791,11 @@ class FragmentRenderer:
 
         :param cells_model: A cells model object with ``cells_data`` (list
             of cell objects, each having ``content_nodes``, ``styles``, and
-            ``placement``) and ``cells_size``.
+            ``placement``) and ``cells_size``.  Use its ``get_row_items()``
+            method to iterate over the cells of each row of the grid.  A
+            cell whose ``content_nodes`` is ``None`` holds a plain-text
+            ``content_value`` that should be rendered via
+            :py:meth:`render_value`.
         :param render_context: The current render context.
         :param target_id: Optional anchor ID for the table element.
         :returns: The rendered table/cells string.
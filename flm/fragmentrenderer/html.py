@@ -20,6 +20,40 @@ TypeHeadingTagsByLevelDict = Mapping[int|str, str]
 _rx_html_entity = re.compile(r'[&]([a-zA-Z]+|[#][0-9]+|[#]x[0-9a-fA-F]+);')
 
 
+_htmlescape_unicode_spaces = {
+    '\u00a0': '&nbsp;', # NON-BREAKING SPACE
+    '\u200a': '&hairsp;', # HAIR SPACE
+    '\u2009': '&thinsp;', # THIN SPACE
+    '\u2008': '&puncsp;', # PUNCTUATION SPACE
+    '\u2002': '&ensp;', # EN SPACE
+    '\u2003': '&emsp;', # EM SPACE
+    '\u2007': '&numsp;', # FIGURE SPACE
+}
+
+_rx_htmlescape_unicode_spaces = re.compile(
+    '[\u00a0\u200a\u2009\u2008\u2002\u2003\u2007]'
+)
+
+def _htmlescape_unicode_space(m):
+    return _htmlescape_unicode_spaces[m.group()]
+
+### BEGINPATCH_HTMLESCAPE_CHARS
+def _htmlescape_chars(value):
+    esc = html.escape(value)
+    # pure ASCII strings (the vast majority) can't contain any of the special
+    # unicode spaces, skip looking for them
+    if esc.isascii() or _rx_htmlescape_unicode_spaces.search(esc) is None:
+        return esc
+    return _rx_htmlescape_unicode_spaces.sub(_htmlescape_unicode_space, esc)
+### ENDPATCH_HTMLESCAPE_CHARS
+
+# memoize escaped values of short strings (words, punctuation, etc.), which
+# tend to repeat a lot in documents
+_htmlescape_memo = {}
+_htmlescape_memo_max_len = 64
+_htmlescape_memo_max_entries = 8192
+
+
 class HtmlFragmentRenderer(FragmentRenderer):
     r"""Fragment renderer that produces HTML output.
 
@@ -109,6 +143,24 @@ class HtmlFragmentRenderer(FragmentRenderer):
 
     use_standard_math_delimiters : bool = True
 
+    prerender_math_fn : None|Callable[...,None|str] = None
+    r"""
+    If non-None, math content is converted to HTML code (e.g., MathML or SVG)
+    at render time by calling this function, instead of being output as LaTeX
+    code for MathJax to typeset in the browser.
+
+    The callable is called with the recomposed LaTeX math code (without
+    delimiters) as first positional argument, and with the keyword arguments
+    `displaytype` (``'inline'`` or ``'display'``) and `environmentname` (the
+    math environment name, or `None`).  Please accept `**kwargs`, too.  It
+    should return the HTML code for the math, or `None` to output the LaTeX
+    code as usual.  Prerendered math is marked with the additional CSS class
+    ``prerendered-math`` and is not processed by MathJax.
+
+    See :py:class:`flm.main.mathprerender.MathPrerenderer` for a callable that
+    you can use here.
+    """
+
 
     include_node_data_attrs_fn : None|Callable[[Any],dict] = None
     r"""
@@ -170,21 +222,21 @@ class HtmlFragmentRenderer(FragmentRenderer):
 
         Escapes ``<``, ``>``, ``&``, and ``"`` via :py:func:`html.escape`,
         then replaces several Unicode space characters with their named
-        HTML entities (e.g., non-breaking space, thin space, em space).
+        HTML entities (e.g., non-breaking space, thin space, em space) in a
+        single pass; this pass is skipped entirely for pure ASCII strings.
+        Results for short strings are memoized.
 
         :param value: The raw text string.
         :returns: The HTML-escaped string.
         """
-        esc = html.escape(value)
-        esc = (
-            esc.replace(' ', '&nbsp;') # NON-BREAKING SPACE
-            .replace(' ', '&hairsp;') # HAIR SPACE
-            .replace(' ', '&thinsp;') # THIN SPACE
-            .replace(' ', '&puncsp;') # PUNCTUATION SPACE
-            .replace(' ', '&ensp;') # EN SPACE
-            .replace(' ', '&emsp;') # EM SPACE
-            .replace(' ', '&numsp;') # FIGURE SPACE
-        )
+        if len(value) > _htmlescape_memo_max_len:
+            return _htmlescape_chars(value)
+        esc = _htmlescape_memo.get(value)
+        if esc is None:
+            esc = _htmlescape_chars(value)
+            if len(_htmlescape_memo) >= _htmlescape_memo_max_entries:
+                _htmlescape_memo.clear()
+            _htmlescape_memo[value] = esc
         return esc
 
     def htmlescape_double_quoted_attribute_value(self, value):
@@ -393,7 +445,17 @@ class HtmlFragmentRenderer(FragmentRenderer):
                             environmentname=None,
                             target_id=None):
 
-        if not self.use_mathjax:
+        latex = self.recompose_latex(nodelist)
+
+        prerendered_html = None
+        if self.prerender_math_fn is not None:
+            prerendered_html = self.prerender_math_fn(
+                latex,
+                displaytype=displaytype,
+                environmentname=environmentname,
+            )
+
+        if prerendered_html is None and not self.use_mathjax:
             logger.warning(
                 "called HtmlFragmentRenderer.render_math_content() but "
                 "self.use_mathjax is not set. Your math "
@@ -419,9 +481,13 @@ class HtmlFragmentRenderer(FragmentRenderer):
         if environmentname is not None:
             class_names.append(f"env-{environmentname.replace('*','-star')}")
 
-        content_html = (
-            self.htmlescape( use_delims[0] + self.recompose_latex(nodelist) + use_delims[1] )
-        )
+        if prerendered_html is not None:
+            class_names.append('prerendered-math')
+            content_html = prerendered_html
+        else:
+            content_html = (
+                self.htmlescape( use_delims[0] + latex + use_delims[1] )
+            )
 
         attrs = {}
         if target_id is not None:
@@ -940,82 +1006,80 @@ class HtmlFragmentRenderer(FragmentRenderer):
 
     def render_cells(self, cells_model, render_context, target_id=None):
 
-        tabheight, tabwidth = len(cells_model.grid_data), len(cells_model.grid_data[0])
+        tabheight, tabwidth = cells_model.get_grid_size()
 
         data_items = []
-        row_j = 0
-        while row_j < len(cells_model.grid_data):
+        for row_j in range(tabheight):
             row_items = []
-            col_j = 0
-            while col_j < len(cells_model.grid_data[row_j]):
+            for (item_type, col_start, col_end, cell) \
+                    in cells_model.get_row_items(row_j):
 
-                grid_cell_data = cells_model.grid_data[row_j][col_j]
-
-                if grid_cell_data is None or grid_cell_data['cell'] is None:
-                    # no contents here, still need to render an empty cell for
+                if item_type == 'empty':
+                    # no contents here, still need to render empty cells for
                     # the HTML layout
-                    clsnames = []
-                    if row_j == 0:
-                        clsnames.append('celltbledge-top')
-                    if col_j == 0:
-                        clsnames.append('celltbledge-left')
-                    if row_j == tabheight - 1:
-                        clsnames.append('celltbledge-bottom')
-                    if col_j == tabwidth - 1:
-                        clsnames.append('celltbledge-right')
-                    row_items.append(self.wrap_in_tag(
-                        'td',
-                        '',
-                        class_names=['cell-empty'] + clsnames
-                    ))
-                    col_j += 1
+                    for col_j in range(col_start, col_end):
+                        clsnames = []
+                        if row_j == 0:
+                            clsnames.append('celltbledge-top')
+                        if col_j == 0:
+                            clsnames.append('celltbledge-left')
+                        if row_j == tabheight - 1:
+                            clsnames.append('celltbledge-bottom')
+                        if col_j == tabwidth - 1:
+                            clsnames.append('celltbledge-right')
+                        row_items.append(self.wrap_in_tag(
+                            'td',
+                            '',
+                            class_names=['cell-empty'] + clsnames
+                        ))
                     continue
 
-                if grid_cell_data['is_topleft']:
+                if item_type == 'covered':
+                    # no need to render a <td> item because the spot is
+                    # occupied by a cell with a nontrivial rowspan.
+                    continue
 
-                    cell = grid_cell_data['cell']
+                if cell.content_nodes is not None:
                     rendered_cell_contents = self.render_nodelist(
                         cell.content_nodes,
                         render_context=render_context,
                     )
-                    clsnames = ['cell'] + [ f"cellstyle-{sty}" for sty in cell.styles ]
-                    if row_j == 0:
-                        clsnames.append('celltbledge-top')
-                    if col_j == 0:
-                        clsnames.append('celltbledge-left')
-                    if cell.placement.row_range.end == tabheight:
-                        clsnames.append('celltbledge-bottom')
-                    if cell.placement.col_range.end == tabwidth:
-                        clsnames.append('celltbledge-right')
-                    tagname = 'td'
-                    if 'H' in cell.styles or 'rH' in cell.styles:
-                        tagname = 'th'
-                    attrs = {}
-                    cplc = cell.placement
-                    if cplc.col_range.end != cplc.col_range.start + 1:
-                        # nontrivial column span
-                        attrs['colspan'] = \
-                            str(cplc.col_range.end - cplc.col_range.start)
-                    if cplc.row_range.end != cplc.row_range.start + 1:
-                        # nontrivial row span
-                        attrs['rowspan'] = str(cplc.row_range.end - cplc.row_range.start)
-                    row_items.append(
-                        self.wrap_in_tag(
-                            tagname,
-                            rendered_cell_contents,
-                            attrs=attrs,
-                            class_names=clsnames,
-                        )
+                else:
+                    rendered_cell_contents = self.render_value(
+                        cell.content_value,
+                        render_context,
                     )
-                    col_j = cplc.col_range.end
-                    continue
-
-                # no need to render a <td> item because the spot is occupied by
-                # a cell with a nontrivial rowspan or colspan.
-                col_j += 1
+                clsnames = ['cell'] + [ f"cellstyle-{sty}" for sty in cell.styles ]
+                if row_j == 0:
+                    clsnames.append('celltbledge-top')
+                if col_start == 0:
+                    clsnames.append('celltbledge-left')
+                if cell.placement.row_range.end == tabheight:
+                    clsnames.append('celltbledge-bottom')
+                if cell.placement.col_range.end == tabwidth:
+                    clsnames.append('celltbledge-right')
+                tagname = 'td'
+                if 'H' in cell.styles or 'rH' in cell.styles:
+                    tagname = 'th'
+                attrs = {}
+                cplc = cell.placement
+                if cplc.col_range.end != cplc.col_range.start + 1:
+                    # nontrivial column span
+                    attrs['colspan'] = \
+                        str(cplc.col_range.end - cplc.col_range.start)
+                if cplc.row_range.end != cplc.row_range.start + 1:
+                    # nontrivial row span
+                    attrs['rowspan'] = str(cplc.row_range.end - cplc.row_range.start)
+                row_items.append(
+                    self.wrap_in_tag(
+                        tagname,
+                        rendered_cell_contents,
+                        attrs=attrs,
+                        class_names=clsnames,
+                    )
+                )
 
             data_items.append( row_items )
-            row_j += 1
 
         table_attrs = {}
         if target_id is not None:
@@ -1448,7 +1512,9 @@ MathJax = {
 };
 function typesetPageMathPromise()
 {
-    var elements = document.querySelectorAll('.display-math, .inline-math');
+    var elements = document.querySelectorAll(
+        '.display-math:not(.prerendered-math), .inline-math:not(.prerendered-math)'
+    );
     return MathJax.typesetPromise(elements);
 }
 """
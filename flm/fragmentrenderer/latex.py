@@ -50,6 +50,77 @@ _default_float_placement_policy : TypeFloatPlacementPolicyDict = {
 }
 
 
+_latex_ascii_letters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+class _LatexInlineJoiner:
+    r"""
+    Join rendered LaTeX pieces with the same separators as repeated calls to
+    `LatexFragmentRenderer._latex_join()` would, but in linear time.
+
+    Only the trailing state of the content joined so far is tracked: whether
+    its last line contains a '%' (in which case the next piece must start on a
+    new line) and whether it ends with a named macro (in which case a space
+    must be inserted).  The latter is determined by a normalized "tail" string
+    made of the character preceding the trailing run of letters, a single
+    letter standing for that run (if any), and a trailing newline (if any).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pieces = []
+        self.last_line_has_percent = False
+        self.tail = ''
+
+    def append(self, s):
+        if self.last_line_has_percent:
+            t = '\n' + s
+        elif self._tail_is_named_macro():
+            t = ' ' + s
+        else:
+            t = s
+        if not len(t):
+            return
+        self.pieces.append(t)
+
+        # last line of the new content
+        i = t.rfind('\n')
+        if i >= 0:
+            self.last_line_has_percent = ('%' in t[i+1:])
+        else:
+            # we know that self.last_line_has_percent was False, otherwise t
+            # would have started with a newline
+            self.last_line_has_percent = ('%' in t)
+
+        # trailing run of letters of the new content
+        t_tail = self._make_tail(t)
+        if t_tail.startswith('a') or t_tail.startswith('\n'):
+            # the piece is made only of letters (with possibly a trailing
+            # newline) -- the letter run extends into the previous content
+            self.tail = self._make_tail(self.tail + t_tail)
+        else:
+            self.tail = t_tail
+
+    def _make_tail(self, x):
+        if x.endswith('\n'):
+            body = x[:len(x)-1]
+            nl = '\n'
+        else:
+            body = x
+            nl = ''
+        stripped = body.rstrip(_latex_ascii_letters)
+        letters = 'a' if len(stripped) < len(body) else ''
+        pre = stripped[len(stripped)-1:]
+        return pre + letters + nl
+
+    def _tail_is_named_macro(self):
+        return self.tail.startswith('\\a')
+
+    def get_result(self):
+        return ''.join(self.pieces)
+
+
+
 class LatexFragmentRenderer(FragmentRenderer):
     r"""
     Fragment renderer that produces LaTeX output.
@@ -290,10 +361,10 @@ class LatexFragmentRenderer(FragmentRenderer):
 
         # '\n' in case one of the items ends with a comment
         #return "\n".join([ str(s).strip() for s in content_list ])
-        result = ''
+        joiner = _LatexInlineJoiner()
         for s in content_list:
-            result = self._latex_join(result, str(s))
-        return result
+            joiner.append(str(s))
+        return joiner.get_result()
 
     def _latex_join(self, a, b):
         if '\n' in a:
@@ -849,20 +920,25 @@ class LatexFragmentRenderer(FragmentRenderer):
         cell_hlines = []
         cell_vlines = []
 
-        tabheight, tabwidth = len(cells_model.grid_data), len(cells_model.grid_data[0])
+        tabheight, tabwidth = cells_model.get_grid_size()
 
-        for row in cells_model.grid_data:
+        for row_j in range(tabheight):
             stab_rowitems = []
             # row_has_any_non_header_element = False
-            for cellinfo in row:
-                if (cellinfo is not None and cellinfo['cell'] is not None
-                    and cellinfo['is_topleft']):
+            for (item_type, col_start, col_end, cell) \
+                    in cells_model.get_row_items(row_j):
+                if item_type == 'cell':
                     #
-                    cell = cellinfo['cell']
-                    cell_content = render_cell_nodelist_contents_fn(
-                        cell.content_nodes,
-                        render_context=render_context,
-                    )
+                    if cell.content_nodes is not None:
+                        cell_content = render_cell_nodelist_contents_fn(
+                            cell.content_nodes,
+                            render_context=render_context,
+                        )
+                    else:
+                        cell_content = self.render_value(
+                            cell.content_value,
+                            render_context,
+                        )
 
                     # if we're spanning multiple rows/columns, we need a
                     # cell={...} specifier...
@@ -931,10 +1007,14 @@ class LatexFragmentRenderer(FragmentRenderer):
                             + thiscellstyles
                             + r'}'
                         )
+                    stab_rowitems.append(cell_content)
+                    # remaining columns are part of the multicell
+                    for _ in range(col_start + 1, col_end):
+                        stab_rowitems.append('')
                 else:
-                    cell_content = '' # part of multicell
-
-                stab_rowitems.append(cell_content)
+                    # empty or part of multicell
+                    for _ in range(col_start, col_end):
+                        stab_rowitems.append('')
 
             stab_contents += '&'.join(stab_rowitems) + '\\\\' + '\n'
 
@@ -281,10 +281,16 @@ class TextFragmentRenderer(FragmentRenderer):
         rendered_cells = []
         for cell in cells_model.cells_data:
 
-            rendered_cell_contents = self.render_nodelist(
-                cell.content_nodes,
-                render_context=render_context,
-            )
+            if cell.content_nodes is not None:
+                rendered_cell_contents = self.render_nodelist(
+                    cell.content_nodes,
+                    render_context=render_context,
+                )
+            else:
+                rendered_cell_contents = self.render_value(
+                    cell.content_value,
+                    render_context,
+                )
 
             rendered_cell_contents_lines = rendered_cell_contents.split('\n')
 
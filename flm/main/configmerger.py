@@ -1,5 +1,7 @@
 import importlib
 import os.path
+import threading
+import contextlib
 
 from collections.abc import Mapping
 
@@ -13,6 +15,33 @@ logger = logging.getLogger(__name__)
 
 
 
+# Callbacks installed by recording_imported_files(), per thread.
+_imported_files_recorders = threading.local()
+
+
+@contextlib.contextmanager
+def recording_imported_files(record_fn):
+    r"""
+    Context manager within which `record_fn(fname)` is called with the name of
+    each local file that is read by an ``$import`` directive in the current
+    thread.  This lets a run record which configuration files it depends on.
+    """
+    recorders = getattr(_imported_files_recorders, 'stack', None)
+    if recorders is None:
+        recorders = _imported_files_recorders.stack = []
+    recorders.append(record_fn)
+    try:
+        yield
+    finally:
+        recorders.pop()
+
+
+def _record_imported_file(fname):
+    for record_fn in getattr(_imported_files_recorders, 'stack', ()):
+        record_fn(fname)
+
+
+
 # marker
 class ListProperty:
     r"""
@@ -158,6 +187,7 @@ class PresetImport:
         if not u.scheme or u.scheme == 'file':
             fname = os.path.join(cwd, u.path)
             logger.debug('$import: opening file %r', fname)
+            _record_imported_file(fname)
             with open(fname, encoding='utf-8') as f:
                 return yaml.safe_load(f)
 
@@ -1,2 +1,2 @@
-(()=>{var e,t,o="u"<typeof document?void 0:document,r=!!o&&"content"in o.createElement("template"),n=!!o&&o.createRange&&"createContextualFragment"in o.createRange();function a(e,t){var o,r,n=e.nodeName,a=t.nodeName;return n===a||((o=n.charCodeAt(0),r=a.charCodeAt(0),o<=90&&r>=97)?n===a.toUpperCase():r<=90&&o>=97&&a===n.toUpperCase())}function i(e,t,o){e[o]!==t[o]&&(e[o]=t[o],e[o]?e.setAttribute(o,""):e.removeAttribute(o))}var l={OPTION:function(e,t){var o=e.parentNode;if(o){var r=o.nodeName.toUpperCase();"OPTGROUP"===r&&(r=(o=o.parentNode)&&o.nodeName.toUpperCase()),"SELECT"!==r||o.hasAttribute("multiple")||(e.hasAttribute("selected")&&!t.selected&&(e.setAttribute("selected","selected"),e.removeAttribute("selected")),o.selectedIndex=-1)}i(e,t,"selected")},INPUT:function(e,t){i(e,t,"checked"),i(e,t,"disabled"),e.value!==t.value&&(e.value=t.value),t.hasAttribute("value")||e.removeAttribute("value")},TEXTAREA:function(e,t){var o=t.value;e.value!==o&&(e.value=o);var r=e.firstChild;if(r){var n=r.nodeValue;if(n==o||!o&&n==e.placeholder)return;r.nodeValue=o}},SELECT:function(e,t){if(!t.hasAttribute("multiple")){for(var o,r,n=-1,a=0,i=e.firstChild;i;)if("OPTGROUP"===(r=i.nodeName&&i.nodeName.toUpperCase()))(i=(o=i).firstChild)||(i=o.nextSibling,o=null);else{if("OPTION"===r){if(i.hasAttribute("selected")){n=a;break}a++}(i=i.nextSibling)||!o||(i=o.nextSibling,o=null)}e.selectedIndex=n}}};function s(){}function d(e){if(e)return e.getAttribute&&e.getAttribute("id")||e.id}var c=(t=function(e,t){var o,r,n,a,i=t.attributes;if(11!==t.nodeType&&11!==e.nodeType){for(var l=i.length-1;l>=0;l--)r=(o=i[l]).name,n=o.namespaceURI,a=o.value,n?(r=o.localName||r,e.getAttributeNS(n,r)!==a&&("xmlns"===o.prefix&&(r=o.name),e.setAttributeNS(n,r,a))):e.getAttribute(r)!==a&&e.setAttribute(r,a);for(var s=e.attributes,d=s.length-1;d>=0;d--)r=(o=s[d]).name,(n=o.namespaceURI)?(r=o.localName||r,t.hasAttributeNS(n,r)||e.removeAttributeNS(n,r)):t.hasAttribute(r)||e.removeAttribute(r)}},function(i,c,p){if(p||(p={}),"string"==typeof c)if("#document"===i.nodeName||"HTML"===i.nodeName){var m,u,f,h,b,g,v,y,E=c;(c=o.createElement("html")).innerHTML=E}else if("BODY"===i.nodeName){var w=c;(c=o.createElement("html")).innerHTML=w;var C=c.querySelector("body");C&&(c=C)}else{m=(m=c).trim(),c=r?(u=m,(f=o.createElement("template")).innerHTML=u,f.content.childNodes[0]):n?(h=m,e||(e=o.createRange()).selectNode(o.body),e.createContextualFragment(h).childNodes[0]):(b=m,(g=o.createElement("body")).innerHTML=b,g.childNodes[0])}else 11===c.nodeType&&(c=c.firstElementChild);var x=p.getNodeKey||d,S=p.onBeforeNodeAdded||s,N=p.onNodeAdded||s,L=p.onBeforeElUpdated||s,k=p.onElUpdated||s,A=p.onBeforeNodeDiscarded||s,O=p.onNodeDiscarded||s,T=p.onBeforeElChildrenUpdated||s,R=p.skipFromChildren||s,D=p.addChild||function(e,t){return e.appendChild(t)},M=!0===p.childrenOnly,F=Object.create(null),P=[];function _(e){P.push(e)}function U(e,t,o){!1!==A(e)&&(t&&t.removeChild(e),O(e),function e(t,o){if(1===t.nodeType)for(var r=t.firstChild;r;){var n=void 0;o&&(n=x(r))?_(n):(O(r),r.firstChild&&e(r,o)),r=r.nextSibling}}(e,o))}function z(e){if(1===e.nodeType||11===e.nodeType)for(var t=e.firstChild;t;){var o=x(t);o&&(F[o]=t),z(t),t=t.nextSibling}}z(i);var B=i,W=B.nodeType,I=c.nodeType;if(!M){if(1===W)1===I?a(i,c)||(O(i),B=function(e,t){for(var o=e.firstChild;o;){var r=o.nextSibling;t.appendChild(o),o=r}return t}(i,(v=c.nodeName,(y=c.namespaceURI)&&"http://www.w3.org/1999/xhtml"!==y?o.createElementNS(y,v):o.createElement(v)))):B=c;else if(3===W||8===W)if(I===W)return B.nodeValue!==c.nodeValue&&(B.nodeValue=c.nodeValue),B;else B=c}if(B===c)O(i);else{if(c.isSameNode&&c.isSameNode(B))return;if(function e(r,n,i){var s=x(n);if(s&&delete F[s],!i){var d=L(r,n);if(!1===d)return;if(d instanceof HTMLElement&&z(r=d),t(r,n),k(r),!1===T(r,n))return}"TEXTAREA"!==r.nodeName?function(t,r){var n,i,s,d,c,p=R(t,r),m=r.firstChild,u=t.firstChild;e:for(;m;){for(d=m.nextSibling,n=x(m);!p&&u;){if(s=u.nextSibling,m.isSameNode&&m.isSameNode(u)){m=d,u=s;continue e}i=x(u);var f=u.nodeType,h=void 0;if(f===m.nodeType&&(1===f?(n?n!==i&&((c=F[n])?s===c?h=!1:(t.insertBefore(c,u),i?_(i):U(u,t,!0),i=x(u=c)):h=!1):i&&(h=!1),(h=!1!==h&&a(u,m))&&e(u,m)):(3===f||8==f)&&(h=!0,u.nodeValue!==m.nodeValue&&(u.nodeValue=m.nodeValue))),h){m=d,u=s;continue e}i?_(i):U(u,t,!0),u=s}if(n&&(c=F[n])&&a(c,m))p||D(t,c),e(c,m);else{var b=S(m);!1!==b&&(b&&(m=b),m.actualize&&(m=m.actualize(t.ownerDocument||o)),D(t,m),function t(o){N(o);for(var r=o.firstChild;r;){var n=r.nextSibling,i=x(r);if(i){var l=F[i];l&&a(r,l)?(r.parentNode.replaceChild(l,r),e(l,r)):t(r)}else t(r);r=n}}(m))}m=d,u=s}for(var g=u,v=i;g;){var y=g.nextSibling;(v=x(g))?_(v):U(g,t,!0),g=y}var E=l[t.nodeName];E&&E(t,r)}(r,n):l.TEXTAREA(r,n)}(B,c,M),P)for(var H=0,V=P.length;H<V;H++){var J=F[P[H]];J&&U(J,J.parentNode,!1)}}return!M&&B!==i&&i.parentNode&&(B.actualize&&(B=B.actualize(i.ownerDocument||o)),i.parentNode.replaceChild(B,i)),B}),p={};p='#ErrorOverlay{z-index:9999;-webkit-backdrop-filter:blur(3px);box-sizing:border-box;background:#1a0a0aee;border-top:3px solid #e03030;max-height:50vh;animation:.2s cubic-bezier(.16,1,.3,1) errorPanelSlideUp;display:none;position:fixed;bottom:0;left:0;right:0;box-shadow:0 -4px 32px #b4141473,0 -1px 4px #0009}#ErrorOverlay.error-overlay-shown{grid-template-rows:auto 1fr;grid-template-columns:auto 1fr;display:grid}#ErrorOverlay.error-overlay-collapsed{display:none!important}@keyframes errorPanelSlideUp{0%{opacity:0;transform:translateY(100%)}to{opacity:1;transform:translateY(0)}}#ErrorOverlay .error-panel-header{display:contents}#ErrorOverlay .error-panel-collapse-btn{color:#ff6b6b;cursor:pointer;background:0 0;border:1px solid #5a1a1a;border-radius:4px;grid-area:1/1;align-self:center;margin-left:.75rem;padding:.1rem .55rem;font-family:inherit;font-size:.95rem;transition:background .15s,border-color .15s}#ErrorOverlay .error-panel-collapse-btn:hover{background:#3a1010;border-color:#e03030}#ErrorOverlay .error-panel-title{color:#e03030;letter-spacing:.15em;border-bottom:1px solid #3a1010;grid-area:1/2;padding:.5rem 1rem .5rem .5rem;font-family:Cascadia Code,Fira Code,JetBrains Mono,ui-monospace,SFMono-Regular,Menlo,Consolas,monospace;font-size:.9rem;font-weight:700}#ErrorOverlay .error-panel-body{grid-area:2/2;min-height:0;overflow:auto}@media (width<=480px){#ErrorOverlay .error-panel-title{grid-area:2/1}#ErrorOverlay .error-panel-body{grid-area:3/1}}#ErrorOverlay pre{box-sizing:border-box;color:#ff6b6b;width:100%;max-width:100%;box-shadow:none;white-space:pre-wrap;word-break:break-word;overflow-wrap:break-word;background:0 0;border:none;border-radius:0;margin:0;padding:1rem 1.5rem 1.5rem .5rem;font-family:Cascadia Code,Fira Code,JetBrains Mono,ui-monospace,SFMono-Regular,Menlo,Consolas,monospace;font-size:.82rem;line-height:1.65}#ErrorCollapsedBadge{z-index:9999;color:#fff;text-align:center;cursor:pointer;-webkit-user-select:none;user-select:none;background:#e03030;border-radius:8px;width:40px;height:40px;font-size:1.3rem;line-height:40px;animation:2s ease-in-out infinite badgePulse;display:none;position:fixed;bottom:16px;left:16px;box-shadow:0 2px 10px #b4141499}#ErrorCollapsedBadge.badge-shown{display:block}@keyframes badgePulse{0%,to{box-shadow:0 2px 10px #b4141499}50%{box-shadow:0 2px 18px #e03030e6}}#CompilingStateWidget{z-index:9998;width:18px;height:18px;display:none;position:fixed;top:10px;left:10px}#CompilingStateWidget.idle{display:none}#CompilingStateWidget.compiling{display:block}#CompilingStateWidget.compiling:after{content:"";border:3px solid #5358ba66;border-top-color:#5358ba1f;border-radius:50%;width:32px;height:32px;animation:.75s linear infinite compilingSpinnerRotate;display:block}@keyframes compilingSpinnerRotate{to{transform:rotate(360deg)}}.flm-copied-to-clipboard{animation:.7s ease-out forwards flmCopiedFlash}@keyframes flmCopiedFlash{0%{background-color:#0000;outline:3px solid #3cc86400}15%{background-color:#3cc8642e;outline:3px solid #3cc864e6}to{background-color:#0000;outline:3px solid #3cc86400}}.flm-source-flash{animation:.7s ease-out forwards flmSourceFlash}@keyframes flmSourceFlash{0%{background-color:#0000;outline:3px solid #ff50b600}15%{background-color:#ff50b62e;outline:3px solid #ff50b6e6}to{background-color:#0000;outline:3px solid #ff50b600}}';let m=window.document,u=["compiling","idle"];function f(e){let t=e.textContent.trim();e.dataset.mathLatexSource=t}class h{constructor(){const e=m.createElement("div");e.setAttribute("id","ErrorOverlay");const t=m.createElement("div");t.className="error-panel-header";const o=m.createElement("span");o.className="error-panel-title",o.textContent="💥 ERROR";const r=m.createElement("button");r.className="error-panel-collapse-btn",r.textContent="‹",r.addEventListener("click",()=>this.collapse()),t.appendChild(r),t.appendChild(o),e.appendChild(t);const n=m.createElement("div");n.className="error-panel-body",e.appendChild(n),m.body.appendChild(e),this.panelDiv=e,this.bodyDiv=n;const a=m.createElement("div");a.setAttribute("id","ErrorCollapsedBadge"),a.textContent="💥",a.title="Show error panel",a.addEventListener("click",()=>this.expand()),m.body.appendChild(a),this.badgeDiv=a}clear(){this.panelDiv.classList.remove("error-overlay-shown","error-overlay-collapsed"),this.badgeDiv.classList.remove("badge-shown")}show(e){this.panelDiv.classList.remove("error-overlay-collapsed"),this.panelDiv.classList.add("error-overlay-shown"),this.badgeDiv.classList.remove("badge-shown"),this.bodyDiv.innerHTML=e}collapse(){this.panelDiv.classList.add("error-overlay-collapsed"),this.badgeDiv.classList.add("badge-shown")}expand(){this.panelDiv.classList.remove("error-overlay-collapsed"),this.badgeDiv.classList.remove("badge-shown")}}class b{constructor(e,t){this.mainContainer=t,this.ws=new WebSocket(e),this.ws.addEventListener("message",e=>this._onMessage(e)),this.ws.addEventListener("open",()=>console.log("websocket open")),this.ws.addEventListener("close",()=>console.log("websocket closed")),this.ws.addEventListener("error",e=>console.warn("websocket error",e)),console.log("Started websocket and listening for update messages."),this.errorPanel=new h;const o=m.createElement("div");o.setAttribute("id","CompilingStateWidget"),m.body.appendChild(o),this.compilingWidgetDiv=o}_onMessage(e){try{this._processMessage(e)}catch(e){console.error("Error while processing server message!",e)}}_processMessage(e){console.log("Message!",e);let t=JSON.parse(e.data);if("update-main-content"===t.action){this.errorPanel.clear(),this.setCompilingState("idle");try{var o,r=this.mainContainer,n=t;if("update-main-content"===n.action){let e;if(null==n.content_html)throw Error("No main element!’");o=n.content_html,e=e=>"SPAN"!==e.tagName?null:e.classList.contains("display-math")?"display-math":e.classList.contains("inline-math")?"inline-math":null,console.log("About to call morphdom():",{mainContainer:r,html:o}),c(r,"<article>"+o+"</article>",{childrenOnly:!0,getNodeKey(e){if(e.nodeType!==Node.ELEMENT_NODE)return;let t=e.id;if(t)return`id:${t}`},onBeforeElUpdated(t,o){let r=e(o);return null==r||(f(o),e(t)!=r)||t.dataset.mathLatexSource!==o.dataset.mathLatexSource&&(t.parentNode.replaceChild(o.cloneNode(!0),t),!1)}}),console.log("morphdom finished :)"),window.flmSetup&&window.flmSetup()}}catch(e){window.location.reload()}}else"error-display"===t.action?(this.errorPanel.show(t.content_html),this.setCompilingState("idle")):"set-compiling-state"===t.action?this.setCompilingState(t.state):console.error("Invalid update info action!",t)}setCompilingState(e){this.compilingWidgetDiv.classList.remove(...u.filter(t=>t!=e)),this.compilingWidgetDiv.classList.add(e)}sendCommand(e,t={}){this.ws.readyState!==WebSocket.OPEN?console.warn("HotReloadClient.sendCommand: websocket not open, dropping message",e,t):this.ws.send(JSON.stringify({action:e,...t}))}openEditor(e,t,o,r){let n={source_path:e};null!=t&&(n.line=t),null!=o&&(n.col=o),null!=r&&(n.prefer_editor=r),this.sendCommand("open-editor",n)}findElementSourceLocation(e){let t=(e,t)=>{if(null==e)return null;try{let[t,o,r]=JSON.parse(e);return[t,o,r]}catch(o){return console.error("findElementSourceLocation: invalid data-sourcepath JSON",e,t,o),null}},o=e;for(;null!==o&&o!==this.mainContainer;){let e=t(o.dataset.sourcepath,o);if(null!=e)return e;let r=o.previousElementSibling;for(;null!==r;){let e=t(r.dataset.sourcepath,r);if(null!=e)return e;r=r.previousElementSibling}o=o.parentElement}return console.warn("findElementSourceLocation: no data-sourcepath found for element",e),null}onElementLocationOpenEditor(e){let t=this.findElementSourceLocation(e);if(null==t)return void console.warn("No location availble for element",e);let[o,r,n]=t;this.openEditor(o,r,n),e.classList.remove("flm-source-flash"),e.offsetWidth,e.classList.add("flm-source-flash"),e.addEventListener("animationend",()=>e.classList.remove("flm-source-flash"),{once:!0})}}window.addEventListener("DOMContentLoaded",()=>{var e;let t=m.createElement("style");t.textContent=(e=p)&&e.__esModule?e.default:e,m.head.appendChild(t);let o=m.getElementById("Main");!function(e,t=null){for(let o of null!=t?t:e.querySelectorAll("span.inline-math, span.display-math"))o.children.length>0&&console.warn("Math element",o,"is already typeset, cannot store source!"),f(o)}(o);let r=new b(`ws://${wsHost}:${wsPort}/`,o);window.flmHotReload=r,o.addEventListener("mousedown",e=>{(e.metaKey||e.ctrlKey)&&e.shiftKey&&(e.preventDefault(),e.stopPropagation(),r.onElementLocationOpenEditor(e.target))}),o.addEventListener("mousedown",e=>{(e.metaKey||e.ctrlKey)&&!e.shiftKey&&(e.preventDefault(),e.stopPropagation(),function(e,t){let o=null,r=t;for(;null!==r&&r!==e;){if(r.id){o=r.id;break}r=r.parentElement}if(null==o)return console.warn("copyElementFlmRefCode: no element with id found for element",t);let n=r,a=function(){let e=m.getElementById("FlmRefsData");if(null==e)return console.warn('copyElementFlmRefCode: no <script id="FlmRefsData"> tag found'),null;try{return JSON.parse(e.textContent??"{}")}catch(e){return console.error("copyElementFlmRefCode: failed to parse FlmRefsData JSON",e),null}}();if(null==a)return;let i="#"+o,l=a.targets.find(e=>null!=e.ref_label&&e.target_href===i);if(null==l)return console.log("copyElementFlmRefCode: no ref entry found for id",o);let s=l.ref_type,d=l.ref_label;console.log("copyElementFlmRefCode: found ref",{ref_type:s,ref_label:d,refEntry:l});let c=null;c="defterm"===s?"\\term{"+d+"}":`\\ref{${s}:${d}}`,navigator.clipboard.writeText(c).then(()=>{console.log("copyElementFlmRefCode: copied to clipboard:",c)}).catch(e=>{console.error("copyElementFlmRefCode: clipboard write failed",e)}),n.classList.remove("flm-copied-to-clipboard"),n.offsetWidth,n.classList.add("flm-copied-to-clipboard"),n.addEventListener("animationend",()=>n.classList.remove("flm-copied-to-clipboard"),{once:!0})}(o,e.target))})})})();
+(()=>{var e,t,o="u"<typeof document?void 0:document,r=!!o&&"content"in o.createElement("template"),n=!!o&&o.createRange&&"createContextualFragment"in o.createRange();function a(e,t){var o,r,n=e.nodeName,a=t.nodeName;return n===a||((o=n.charCodeAt(0),r=a.charCodeAt(0),o<=90&&r>=97)?n===a.toUpperCase():r<=90&&o>=97&&a===n.toUpperCase())}function i(e,t,o){e[o]!==t[o]&&(e[o]=t[o],e[o]?e.setAttribute(o,""):e.removeAttribute(o))}var l={OPTION:function(e,t){var o=e.parentNode;if(o){var r=o.nodeName.toUpperCase();"OPTGROUP"===r&&(r=(o=o.parentNode)&&o.nodeName.toUpperCase()),"SELECT"!==r||o.hasAttribute("multiple")||(e.hasAttribute("selected")&&!t.selected&&(e.setAttribute("selected","selected"),e.removeAttribute("selected")),o.selectedIndex=-1)}i(e,t,"selected")},INPUT:function(e,t){i(e,t,"checked"),i(e,t,"disabled"),e.value!==t.value&&(e.value=t.value),t.hasAttribute("value")||e.removeAttribute("value")},TEXTAREA:function(e,t){var o=t.value;e.value!==o&&(e.value=o);var r=e.firstChild;if(r){var n=r.nodeValue;if(n==o||!o&&n==e.placeholder)return;r.nodeValue=o}},SELECT:function(e,t){if(!t.hasAttribute("multiple")){for(var o,r,n=-1,a=0,i=e.firstChild;i;)if("OPTGROUP"===(r=i.nodeName&&i.nodeName.toUpperCase()))(i=(o=i).firstChild)||(i=o.nextSibling,o=null);else{if("OPTION"===r){if(i.hasAttribute("selected")){n=a;break}a++}(i=i.nextSibling)||!o||(i=o.nextSibling,o=null)}e.selectedIndex=n}}};function s(){}function d(e){if(e)return e.getAttribute&&e.getAttribute("id")||e.id}var c=(t=function(e,t){var o,r,n,a,i=t.attributes;if(11!==t.nodeType&&11!==e.nodeType){for(var l=i.length-1;l>=0;l--)r=(o=i[l]).name,n=o.namespaceURI,a=o.value,n?(r=o.localName||r,e.getAttributeNS(n,r)!==a&&("xmlns"===o.prefix&&(r=o.name),e.setAttributeNS(n,r,a))):e.getAttribute(r)!==a&&e.setAttribute(r,a);for(var s=e.attributes,d=s.length-1;d>=0;d--)r=(o=s[d]).name,(n=o.namespaceURI)?(r=o.localName||r,t.hasAttributeNS(n,r)||e.removeAttributeNS(n,r)):t.hasAttribute(r)||e.removeAttribute(r)}},function(i,c,p){if(p||(p={}),"string"==typeof c)if("#document"===i.nodeName||"HTML"===i.nodeName){var m,u,f,h,b,g,v,y,E=c;(c=o.createElement("html")).innerHTML=E}else if("BODY"===i.nodeName){var w=c;(c=o.createElement("html")).innerHTML=w;var C=c.querySelector("body");C&&(c=C)}else{m=(m=c).trim(),c=r?(u=m,(f=o.createElement("template")).innerHTML=u,f.content.childNodes[0]):n?(h=m,e||(e=o.createRange()).selectNode(o.body),e.createContextualFragment(h).childNodes[0]):(b=m,(g=o.createElement("body")).innerHTML=b,g.childNodes[0])}else 11===c.nodeType&&(c=c.firstElementChild);var x=p.getNodeKey||d,S=p.onBeforeNodeAdded||s,N=p.onNodeAdded||s,L=p.onBeforeElUpdated||s,k=p.onElUpdated||s,A=p.onBeforeNodeDiscarded||s,O=p.onNodeDiscarded||s,T=p.onBeforeElChildrenUpdated||s,R=p.skipFromChildren||s,D=p.addChild||function(e,t){return e.appendChild(t)},M=!0===p.childrenOnly,F=Object.create(null),P=[];function _(e){P.push(e)}function U(e,t,o){!1!==A(e)&&(t&&t.removeChild(e),O(e),function e(t,o){if(1===t.nodeType)for(var r=t.firstChild;r;){var n=void 0;o&&(n=x(r))?_(n):(O(r),r.firstChild&&e(r,o)),r=r.nextSibling}}(e,o))}function z(e){if(1===e.nodeType||11===e.nodeType)for(var t=e.firstChild;t;){var o=x(t);o&&(F[o]=t),z(t),t=t.nextSibling}}z(i);var B=i,W=B.nodeType,I=c.nodeType;if(!M){if(1===W)1===I?a(i,c)||(O(i),B=function(e,t){for(var o=e.firstChild;o;){var r=o.nextSibling;t.appendChild(o),o=r}return t}(i,(v=c.nodeName,(y=c.namespaceURI)&&"http://www.w3.org/1999/xhtml"!==y?o.createElementNS(y,v):o.createElement(v)))):B=c;else if(3===W||8===W)if(I===W)return B.nodeValue!==c.nodeValue&&(B.nodeValue=c.nodeValue),B;else B=c}if(B===c)O(i);else{if(c.isSameNode&&c.isSameNode(B))return;if(function e(r,n,i){var s=x(n);if(s&&delete F[s],!i){var d=L(r,n);if(!1===d)return;if(d instanceof HTMLElement&&z(r=d),t(r,n),k(r),!1===T(r,n))return}"TEXTAREA"!==r.nodeName?function(t,r){var n,i,s,d,c,p=R(t,r),m=r.firstChild,u=t.firstChild;e:for(;m;){for(d=m.nextSibling,n=x(m);!p&&u;){if(s=u.nextSibling,m.isSameNode&&m.isSameNode(u)){m=d,u=s;continue e}i=x(u);var f=u.nodeType,h=void 0;if(f===m.nodeType&&(1===f?(n?n!==i&&((c=F[n])?s===c?h=!1:(t.insertBefore(c,u),i?_(i):U(u,t,!0),i=x(u=c)):h=!1):i&&(h=!1),(h=!1!==h&&a(u,m))&&e(u,m)):(3===f||8==f)&&(h=!0,u.nodeValue!==m.nodeValue&&(u.nodeValue=m.nodeValue))),h){m=d,u=s;continue e}i?_(i):U(u,t,!0),u=s}if(n&&(c=F[n])&&a(c,m))p||D(t,c),e(c,m);else{var b=S(m);!1!==b&&(b&&(m=b),m.actualize&&(m=m.actualize(t.ownerDocument||o)),D(t,m),function t(o){N(o);for(var r=o.firstChild;r;){var n=r.nextSibling,i=x(r);if(i){var l=F[i];l&&a(r,l)?(r.parentNode.replaceChild(l,r),e(l,r)):t(r)}else t(r);r=n}}(m))}m=d,u=s}for(var g=u,v=i;g;){var y=g.nextSibling;(v=x(g))?_(v):U(g,t,!0),g=y}var E=l[t.nodeName];E&&E(t,r)}(r,n):l.TEXTAREA(r,n)}(B,c,M),P)for(var H=0,V=P.length;H<V;H++){var J=F[P[H]];J&&U(J,J.parentNode,!1)}}return!M&&B!==i&&i.parentNode&&(B.actualize&&(B=B.actualize(i.ownerDocument||o)),i.parentNode.replaceChild(B,i)),B}),p={};p='#ErrorOverlay{z-index:9999;-webkit-backdrop-filter:blur(3px);box-sizing:border-box;background:#1a0a0aee;border-top:3px solid #e03030;max-height:50vh;animation:.2s cubic-bezier(.16,1,.3,1) errorPanelSlideUp;display:none;position:fixed;bottom:0;left:0;right:0;box-shadow:0 -4px 32px #b4141473,0 -1px 4px #0009}#ErrorOverlay.error-overlay-shown{grid-template-rows:auto 1fr;grid-template-columns:auto 1fr;display:grid}#ErrorOverlay.error-overlay-collapsed{display:none!important}@keyframes errorPanelSlideUp{0%{opacity:0;transform:translateY(100%)}to{opacity:1;transform:translateY(0)}}#ErrorOverlay .error-panel-header{display:contents}#ErrorOverlay .error-panel-collapse-btn{color:#ff6b6b;cursor:pointer;background:0 0;border:1px solid #5a1a1a;border-radius:4px;grid-area:1/1;align-self:center;margin-left:.75rem;padding:.1rem .55rem;font-family:inherit;font-size:.95rem;transition:background .15s,border-color .15s}#ErrorOverlay .error-panel-collapse-btn:hover{background:#3a1010;border-color:#e03030}#ErrorOverlay .error-panel-title{color:#e03030;letter-spacing:.15em;border-bottom:1px solid #3a1010;grid-area:1/2;padding:.5rem 1rem .5rem .5rem;font-family:Cascadia Code,Fira Code,JetBrains Mono,ui-monospace,SFMono-Regular,Menlo,Consolas,monospace;font-size:.9rem;font-weight:700}#ErrorOverlay .error-panel-body{grid-area:2/2;min-height:0;overflow:auto}@media (width<=480px){#ErrorOverlay .error-panel-title{grid-area:2/1}#ErrorOverlay .error-panel-body{grid-area:3/1}}#ErrorOverlay pre{box-sizing:border-box;color:#ff6b6b;width:100%;max-width:100%;box-shadow:none;white-space:pre-wrap;word-break:break-word;overflow-wrap:break-word;background:0 0;border:none;border-radius:0;margin:0;padding:1rem 1.5rem 1.5rem .5rem;font-family:Cascadia Code,Fira Code,JetBrains Mono,ui-monospace,SFMono-Regular,Menlo,Consolas,monospace;font-size:.82rem;line-height:1.65}#ErrorCollapsedBadge{z-index:9999;color:#fff;text-align:center;cursor:pointer;-webkit-user-select:none;user-select:none;background:#e03030;border-radius:8px;width:40px;height:40px;font-size:1.3rem;line-height:40px;animation:2s ease-in-out infinite badgePulse;display:none;position:fixed;bottom:16px;left:16px;box-shadow:0 2px 10px #b4141499}#ErrorCollapsedBadge.badge-shown{display:block}@keyframes badgePulse{0%,to{box-shadow:0 2px 10px #b4141499}50%{box-shadow:0 2px 18px #e03030e6}}#CompilingStateWidget{z-index:9998;width:18px;height:18px;display:none;position:fixed;top:10px;left:10px}#CompilingStateWidget.idle{display:none}#CompilingStateWidget.compiling{display:block}#CompilingStateWidget.compiling:after{content:"";border:3px solid #5358ba66;border-top-color:#5358ba1f;border-radius:50%;width:32px;height:32px;animation:.75s linear infinite compilingSpinnerRotate;display:block}@keyframes compilingSpinnerRotate{to{transform:rotate(360deg)}}.flm-copied-to-clipboard{animation:.7s ease-out forwards flmCopiedFlash}@keyframes flmCopiedFlash{0%{background-color:#0000;outline:3px solid #3cc86400}15%{background-color:#3cc8642e;outline:3px solid #3cc864e6}to{background-color:#0000;outline:3px solid #3cc86400}}.flm-source-flash{animation:.7s ease-out forwards flmSourceFlash}@keyframes flmSourceFlash{0%{background-color:#0000;outline:3px solid #ff50b600}15%{background-color:#ff50b62e;outline:3px solid #ff50b6e6}to{background-color:#0000;outline:3px solid #ff50b600}}';let m=window.document,u=["compiling","idle"];function f(e){let t=e.textContent.trim();e.dataset.mathLatexSource=t}class h{constructor(){const e=m.createElement("div");e.setAttribute("id","ErrorOverlay");const t=m.createElement("div");t.className="error-panel-header";const o=m.createElement("span");o.className="error-panel-title",o.textContent="💥 ERROR";const r=m.createElement("button");r.className="error-panel-collapse-btn",r.textContent="‹",r.addEventListener("click",()=>this.collapse()),t.appendChild(r),t.appendChild(o),e.appendChild(t);const n=m.createElement("div");n.className="error-panel-body",e.appendChild(n),m.body.appendChild(e),this.panelDiv=e,this.bodyDiv=n;const a=m.createElement("div");a.setAttribute("id","ErrorCollapsedBadge"),a.textContent="💥",a.title="Show error panel",a.addEventListener("click",()=>this.expand()),m.body.appendChild(a),this.badgeDiv=a}clear(){this.panelDiv.classList.remove("error-overlay-shown","error-overlay-collapsed"),this.badgeDiv.classList.remove("badge-shown")}show(e){this.panelDiv.classList.remove("error-overlay-collapsed"),this.panelDiv.classList.add("error-overlay-shown"),this.badgeDiv.classList.remove("badge-shown"),this.bodyDiv.innerHTML=e}collapse(){this.panelDiv.classList.add("error-overlay-collapsed"),this.badgeDiv.classList.add("badge-shown")}expand(){this.panelDiv.classList.remove("error-overlay-collapsed"),this.badgeDiv.classList.remove("badge-shown")}}const flmMathSpanType=e=>"SPAN"!==e.tagName?null:e.classList.contains("display-math")?"display-math":e.classList.contains("inline-math")?"inline-math":null,flmMorphOptions={getNodeKey(e){if(e.nodeType!==Node.ELEMENT_NODE)return;let t=e.id;if(t)return`id:${t}`},onBeforeElUpdated(e,t){let o=flmMathSpanType(t);return null==o||(f(t),flmMathSpanType(e)!=o)||e.dataset.mathLatexSource!==t.dataset.mathLatexSource&&(e.parentNode.replaceChild(t.cloneNode(!0),e),!1)}};function flmPatchMainContent(e,t){if("patch-main-content"!==t.action)return;let o=Array.from(e.children);if(o.length!==t.num_blocks_before)throw Error("Mismatching number of blocks, cannot apply patches");for(let r=t.patches.length-1;r>=0;--r){let n=t.patches[r];if("sourcepaths"in n){let e=o[n.index],t=[e,...Array.from(e.querySelectorAll("[data-sourcepath]"))].filter(e=>e.hasAttribute("data-sourcepath"));if(t.length!==n.sourcepaths.length)throw Error("Mismatching data-sourcepath attributes, cannot apply patch");t.forEach((e,t)=>{e.dataset.sourcepath=n.sourcepaths[t]});continue}let a=o.slice(n.index,n.index+n.remove),i=m.createElement("template");i.innerHTML=n.html;let l=Array.from(i.content.children);if(a.length===l.length){a.forEach((e,t)=>c(e,l[t],flmMorphOptions));continue}let s=n.index+n.remove<o.length?o[n.index+n.remove]:null;for(let t of l){for(let e of t.querySelectorAll("span.inline-math, span.display-math"))f(e);e.insertBefore(t,s)}for(let e of a)e.remove()}console.log(`Applied ${t.patches.length} patch(es) to main content`),window.flmSetup&&window.flmSetup()}class b{constructor(e,t,n){this.mainContainer=t,this.contentVersion=n,this.ws=new WebSocket(e),this.ws.addEventListener("message",e=>this._onMessage(e)),this.ws.addEventListener("open",()=>console.log("websocket open")),this.ws.addEventListener("close",()=>console.log("websocket closed")),this.ws.addEventListener("error",e=>console.warn("websocket error",e)),console.log("Started websocket and listening for update messages."),this.errorPanel=new h;const o=m.createElement("div");o.setAttribute("id","CompilingStateWidget"),m.body.appendChild(o),this.compilingWidgetDiv=o}_onMessage(e){try{this._processMessage(e)}catch(e){console.error("Error while processing server message!",e)}}_processMessage(e){console.log("Message!",e);let t=JSON.parse(e.data);if("update-main-content"===t.action){this.errorPanel.clear(),this.setCompilingState("idle");try{if(null==t.content_html)throw Error("No main element!’");console.log("About to call morphdom():",{mainContainer:this.mainContainer,html:t.content_html}),c(this.mainContainer,"<article>"+t.content_html+"</article>",{childrenOnly:!0,...flmMorphOptions}),console.log("morphdom finished :)"),window.flmSetup&&window.flmSetup(),this.contentVersion=t.version??null}catch(e){window.location.reload()}}else if("patch-main-content"===t.action){this.errorPanel.clear(),this.setCompilingState("idle");try{if(null==this.contentVersion||this.contentVersion!==t.base_version)throw Error("Patches do not apply to our content version");flmPatchMainContent(this.mainContainer,t),this.contentVersion=t.version}catch(e){console.warn("Could not apply patches, reloading page",e),window.location.reload()}}else"error-display"===t.action?(this.errorPanel.show(t.content_html),this.setCompilingState("idle")):"set-compiling-state"===t.action?this.setCompilingState(t.state):console.error("Invalid update info action!",t)}setCompilingState(e){this.compilingWidgetDiv.classList.remove(...u.filter(t=>t!=e)),this.compilingWidgetDiv.classList.add(e)}sendCommand(e,t={}){this.ws.readyState!==WebSocket.OPEN?console.warn("HotReloadClient.sendCommand: websocket not open, dropping message",e,t):this.ws.send(JSON.stringify({action:e,...t}))}openEditor(e,t,o,r){let n={source_path:e};null!=t&&(n.line=t),null!=o&&(n.col=o),null!=r&&(n.prefer_editor=r),this.sendCommand("open-editor",n)}findElementSourceLocation(e){let t=(e,t)=>{if(null==e)return null;try{let[t,o,r]=JSON.parse(e);return[t,o,r]}catch(o){return console.error("findElementSourceLocation: invalid data-sourcepath JSON",e,t,o),null}},o=e;for(;null!==o&&o!==this.mainContainer;){let e=t(o.dataset.sourcepath,o);if(null!=e)return e;let r=o.previousElementSibling;for(;null!==r;){let e=t(r.dataset.sourcepath,r);if(null!=e)return e;r=r.previousElementSibling}o=o.parentElement}return console.warn("findElementSourceLocation: no data-sourcepath found for element",e),null}onElementLocationOpenEditor(e){let t=this.findElementSourceLocation(e);if(null==t)return void console.warn("No location availble for element",e);let[o,r,n]=t;this.openEditor(o,r,n),e.classList.remove("flm-source-flash"),e.offsetWidth,e.classList.add("flm-source-flash"),e.addEventListener("animationend",()=>e.classList.remove("flm-source-flash"),{once:!0})}}window.addEventListener("DOMContentLoaded",()=>{var e;let t=m.createElement("style");t.textContent=(e=p)&&e.__esModule?e.default:e,m.head.appendChild(t);let o=m.getElementById("Main");!function(e,t=null){for(let o of null!=t?t:e.querySelectorAll("span.inline-math, span.display-math"))o.children.length>0&&console.warn("Math element",o,"is already typeset, cannot store source!"),f(o)}(o);let r=new b(`ws://${wsHost}:${wsPort}/`,o,contentVersion);window.flmHotReload=r,o.addEventListener("mousedown",e=>{(e.metaKey||e.ctrlKey)&&e.shiftKey&&(e.preventDefault(),e.stopPropagation(),r.onElementLocationOpenEditor(e.target))}),o.addEventListener("mousedown",e=>{(e.metaKey||e.ctrlKey)&&!e.shiftKey&&(e.preventDefault(),e.stopPropagation(),function(e,t){let o=null,r=t;for(;null!==r&&r!==e;){if(r.id){o=r.id;break}r=r.parentElement}if(null==o)return console.warn("copyElementFlmRefCode: no element with id found for element",t);let n=r,a=function(){let e=m.getElementById("FlmRefsData");if(null==e)return console.warn('copyElementFlmRefCode: no <script id="FlmRefsData"> tag found'),null;try{return JSON.parse(e.textContent??"{}")}catch(e){return console.error("copyElementFlmRefCode: failed to parse FlmRefsData JSON",e),null}}();if(null==a)return;let i="#"+o,l=a.targets.find(e=>null!=e.ref_label&&e.target_href===i);if(null==l)return console.log("copyElementFlmRefCode: no ref entry found for id",o);let s=l.ref_type,d=l.ref_label;console.log("copyElementFlmRefCode: found ref",{ref_type:s,ref_label:d,refEntry:l});let c=null;c="defterm"===s?"\\term{"+d+"}":`\\ref{${s}:${d}}`,navigator.clipboard.writeText(c).then(()=>{console.log("copyElementFlmRefCode: copied to clipboard:",c)}).catch(e=>{console.error("copyElementFlmRefCode: clipboard write failed",e)}),n.classList.remove("flm-copied-to-clipboard"),n.offsetWidth,n.classList.add("flm-copied-to-clipboard"),n.addEventListener("animationend",()=>n.classList.remove("flm-copied-to-clipboard"),{once:!0})}(o,e.target))})})})();
 //# sourceMappingURL=watch_hotreload_inject.js.map
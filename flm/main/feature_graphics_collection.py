@@ -17,6 +17,7 @@ import json
 import hashlib
 import tempfile
 import mimetypes
+import threading
 
 from typing import Literal, TypedDict, Sequence, Mapping, Any, Union
 
@@ -634,6 +635,106 @@ _graphics_converters = [
 
 
 
+# ------------------------------------------------------------------------------
+
+
+def get_default_shared_graphics_store_dir():
+    r"""
+    Return the default location of the shared converted-graphics store.
+
+    This is ``$XDG_CACHE_HOME/flm/graphics`` if the ``XDG_CACHE_HOME``
+    environment variable is set, and ``~/.cache/flm/graphics`` otherwise.
+
+    :rtype: str
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME', None)
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'flm', 'graphics')
+
+
+class SharedGraphicsStore:
+    r"""
+    Content-addressed store of converted graphics files, shared across output
+    folders, output formats and FLM runs.
+
+    Each converted file is stored under a name of the form
+    ``<sha256>-<converter>-<options-hash><ext>``, where ``<sha256>`` is the
+    hash of the input file contents.  When a graphics file needs to be
+    converted again with the same converter and options (e.g. because another
+    document, or another output format of the same document, uses the same
+    figure), the converted file is hardlinked (or copied, if hardlinking is
+    not possible) from the store instead of invoking the converter again.
+
+    :param store_dir: The folder in which converted files are stored.  It is
+        created on first use.
+    :type store_dir: str
+    """
+
+    def __init__(self, store_dir):
+        super().__init__()
+        self.store_dir = store_dir
+
+    def get_store_path(self, input_hash, converter_name, options, target_ext):
+        r"""
+        Return the path in the store of the file obtained by converting the
+        input with hash `input_hash` with the converter named `converter_name`
+        and with the given converter `options`, to the format `target_ext`.
+        """
+        options_key = hashlib.sha256(
+            json.dumps(options, sort_keys=True, default=repr).encode('utf-8')
+        ).hexdigest()[:12]
+        return os.path.join(
+            self.store_dir,
+            f"{input_hash}-{converter_name}-{options_key}{target_ext}"
+        )
+
+    def fetch(self, store_path, target_path):
+        r"""
+        Place the stored file `store_path` at `target_path`, by hardlinking it
+        if possible and by copying it otherwise.  Returns `False` if the store
+        does not contain `store_path`, and `True` otherwise.
+        """
+        if not os.path.exists(store_path):
+            return False
+        _remove_file_if_exists(target_path)
+        try:
+            os.link(store_path, target_path)
+        except OSError:
+            shutil.copyfile(store_path, target_path)
+        return True
+
+    def store(self, source_path, store_path):
+        r"""
+        Add the freshly converted file `source_path` to the store as
+        `store_path`.  The file is first written to a temporary name and then
+        moved in place, so that concurrent FLM runs never see partial files.
+        Failures are logged and otherwise ignored.
+        """
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.store_dir, prefix='.tmp-', suffix=os.path.splitext(store_path)[1]
+            )
+            os.close(fd)
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, store_path)
+        except OSError as e:
+            logger.warning("Failed to add ‘%s’ to the shared graphics store ‘%s’: %s",
+                           source_path, self.store_dir, e)
+
+
+def _remove_file_if_exists(path):
+    # Converters and copies open their target file for writing, which would
+    # truncate the shared inode if the target is a hardlink into the shared
+    # graphics store.  Always start from a fresh file.
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+
 default_rules_by_format = {
     'html': [
         {
@@ -660,6 +761,11 @@ default_rules_by_format = {
 # ------------------------------------------------------------------------------
 
 
+# Information obtained by inspecting local graphics files, shared by all
+# documents processed in this process (e.g., when rendering a document to
+# several output formats, or when rebuilding it in watch mode).  Maps (feature
+# class, resolved file name) -> (file stamp, info).
+_graphics_file_info_cache = {}
 
 
 class FeatureGraphicsCollection(Feature):
@@ -823,15 +929,9 @@ class FeatureGraphicsCollection(Feature):
 
                 file_path, file_name, full_file_path = source_resolved
 
-                with self.resource_accessor.open_file_object_context(
-                        fpath=file_path, fname=file_name,
-                        ftype='graphics',
-                        flm_run_info=self.flm_run_info, binary=True
-                ) as fp:
-                    info = self.feature.inspect_graphics_file(
-                        full_file_path,
-                        fp
-                    )
+                info = self.inspect_graphics_file_cached(
+                    file_path, file_name, full_file_path
+                )
                 if info is None:
                     info = {}
 
@@ -863,6 +963,52 @@ class FeatureGraphicsCollection(Feature):
                     "Unknown resource source type: " + repr(source_type)
                 )
 
+        def inspect_graphics_file_cached(self, file_path, file_name, full_file_path):
+            r"""
+            Return the information obtained by
+            :py:meth:`FeatureGraphicsCollection.inspect_graphics_file` for the
+            given local file.  The information is cached across documents
+            and reused as long as the file's stamp is unchanged (see
+            :py:meth:`flm.main.run.ResourceAccessorBase.get_file_cache_stamp`).
+            """
+            resource_accessor = self.resource_accessor
+
+            key = None
+            cache_info = None
+            get_file_cache_stamp = getattr(resource_accessor, 'get_file_cache_stamp', None)
+            if get_file_cache_stamp is not None:
+                cache_info = get_file_cache_stamp(file_path, file_name, 'graphics',
+                                                  self.flm_run_info)
+            if cache_info is not None and cache_info[1] is not None:
+                resolved_name, stamp = cache_info
+                key = (type(self.feature), resolved_name)
+                entry = _graphics_file_info_cache.get(key, None)
+                if entry is not None and entry[0] == stamp:
+                    logger.debug("Reusing inspected info for graphics ‘%s’", resolved_name)
+                    # the run still depends on this file, even if we don't
+                    # read it again
+                    record_dependency = getattr(resource_accessor, 'record_dependency', None)
+                    if record_dependency is not None:
+                        record_dependency(file_path, file_name, 'graphics',
+                                          self.flm_run_info)
+                    return dict(entry[1]) if entry[1] is not None else None
+
+            with resource_accessor.open_file_object_context(
+                    fpath=file_path, fname=file_name,
+                    ftype='graphics',
+                    flm_run_info=self.flm_run_info, binary=True
+            ) as fp:
+                info = self.feature.inspect_graphics_file(
+                    full_file_path,
+                    fp
+                )
+
+            if key is not None:
+                _graphics_file_info_cache[key] = (stamp, info)
+                if info is not None:
+                    info = dict(info)
+            return info
+
         def add_graphics(self, source_key, source_info, graphics_resource,
                          url_entry=None):
             if source_key in self.graphics_collection:
@@ -919,6 +1065,7 @@ class FeatureGraphicsCollection(Feature):
                 collect_graphics_filename_template : None|str = None,
                 collect_format_conversion_rules : None|Sequence[TypeGraphicsFormatConversionRule] = None,
                 use_graphics_cache_file : bool = True,
+                shared_graphics_store : None|bool|str = None,
         ):
             r"""
             Set up the render manager for a specific rendering pass.
@@ -956,6 +1103,11 @@ class FeatureGraphicsCollection(Feature):
                 file to skip re-converting unchanged graphics.  Automatically
                 disabled when collection is turned off.
             :type use_graphics_cache_file: bool
+            :param shared_graphics_store: Whether to use a shared
+                :class:`SharedGraphicsStore` of converted graphics; see the
+                corresponding feature-level argument.  ``None`` defers to the
+                feature-level setting.
+            :type shared_graphics_store: None | bool | str
             """
             # self.src_url_resolver_fn = src_url_resolver_fn
 
@@ -1025,6 +1177,16 @@ class FeatureGraphicsCollection(Feature):
             if not self.collect_graphics_to_output_folder:
                 self.use_graphics_cache_file = False
 
+            if shared_graphics_store is None:
+                shared_graphics_store = self.feature.shared_graphics_store
+            if shared_graphics_store is True:
+                shared_graphics_store = get_default_shared_graphics_store_dir()
+            self.shared_graphics_store = None
+            if shared_graphics_store and self.collect_graphics_to_output_folder:
+                self.shared_graphics_store = SharedGraphicsStore(
+                    os.path.expanduser(shared_graphics_store)
+                )
+
             # reference folder for input relative paths
             self.reference_input_dir = self.feature_document_manager.reference_input_dir
 
@@ -1207,10 +1369,25 @@ class FeatureGraphicsCollection(Feature):
             if input_hash is not None:
                 cache_info[target_path] = { 'input_hash': input_hash }
 
+            _remove_file_if_exists(target_path)
+
             if converter is not None:
 
                 converter_options = converter_info['options']
 
+                store_path = None
+                if self.shared_graphics_store is not None and input_hash is not None:
+                    store_path = self.shared_graphics_store.get_store_path(
+                        input_hash,
+                        converter.name,
+                        converter_options,
+                        converter_info['target_ext'],
+                    )
+                    if self.shared_graphics_store.fetch(store_path, target_path):
+                        logger.info("  ... reusing converted file ‘%s’ from shared "
+                                    "graphics store.", store_path)
+                        return
+
                 converter.convert(
                     read_source_type,
                     read_src_url,
@@ -1219,6 +1396,9 @@ class FeatureGraphicsCollection(Feature):
                     options=converter_options,
                 )
 
+                if store_path is not None and os.path.exists(target_path):
+                    self.shared_graphics_store.store(target_path, store_path)
+
             else:
 
                 if read_source_type == 'file':
@@ -1396,6 +1576,7 @@ class FeatureGraphicsCollection(Feature):
             collect_graphics_filename_template : None|str = "gr${counter}${ext}",
             collect_format_conversion_rules : None|Sequence[TypeGraphicsFormatConversionRule] = None,
             graphics_search_path : None|Sequence[str] = None,
+            shared_graphics_store : None|bool|str = None,
     ):
         r"""
         If `collect_graphics_to_output_folder` is set to a string, then
@@ -1458,6 +1639,16 @@ class FeatureGraphicsCollection(Feature):
             relative graphics paths.  All paths are relative to the root
             document's directory.  Defaults to ``['.']``.
         :type graphics_search_path: None | Sequence[str]
+        :param shared_graphics_store: If set, converted graphics are also
+            kept in a content-addressed :class:`SharedGraphicsStore` that is
+            shared across output folders, output formats and runs; graphics
+            that were already converted with the same converter and options
+            are then hardlinked or copied from the store instead of being
+            converted again.  A string value specifies the store folder;
+            ``True`` uses the default folder given by
+            :func:`get_default_shared_graphics_store_dir`.  ``None`` or
+            ``False`` disables the shared store.
+        :type shared_graphics_store: None | bool | str
         """
         super().__init__()
 
@@ -1475,6 +1666,8 @@ class FeatureGraphicsCollection(Feature):
         else:
             self.graphics_search_path = list(graphics_search_path)
 
+        self.shared_graphics_store = shared_graphics_store
+
         # URL download cache, scoped to this Feature instance (see PLAN).  Keyed
         # by the URL string; value is a dict with keys 'temp_file_path',
         # 'mimetype', 'detected_ext', 'info', 'input_hash' (or a failure marker
@@ -1485,6 +1678,12 @@ class FeatureGraphicsCollection(Feature):
         self._url_tempdir = None
         # Monotonic counter to name temp files uniquely within the shared dir.
         self._url_download_counter = 0
+        # Documents may be rendered concurrently from different threads.  This
+        # lock protects the URL cache and the temp file naming; the per-URL
+        # locks ensure each URL is downloaded only once without serializing
+        # downloads of different URLs.
+        self._url_cache_lock = threading.Lock()
+        self._url_download_locks = {}
 
 
     # Map mimetypes to file extensions where mimetypes.guess_extension() is
@@ -1510,9 +1709,23 @@ class FeatureGraphicsCollection(Feature):
         ``temp_file_path=None``) is cached so the bad URL is not retried.
         """
 
-        if source_url in self._url_cache:
-            return self._url_cache[source_url]
-
+        with self._url_cache_lock:
+            if source_url in self._url_cache:
+                return self._url_cache[source_url]
+            url_lock = self._url_download_locks.setdefault(source_url, threading.Lock())
+
+        with url_lock:
+            with self._url_cache_lock:
+                if source_url in self._url_cache:
+                    # another thread downloaded it while we were waiting
+                    return self._url_cache[source_url]
+            entry = self._download_inspect_url(source_url)
+            with self._url_cache_lock:
+                self._url_cache[source_url] = entry
+                del self._url_download_locks[source_url]
+            return entry
+
+    def _download_inspect_url(self, source_url):
         try:
             with urllib.request.urlopen(source_url) as r:
                 content = r.read()
@@ -1522,13 +1735,14 @@ class FeatureGraphicsCollection(Feature):
             if detected_ext is None:
                 detected_ext = mimetypes.guess_extension(mimetype) or ''
 
-            if self._url_tempdir is None:
-                self._url_tempdir = tempfile.TemporaryDirectory()
-            self._url_download_counter += 1
-            tmp_path = os.path.join(
-                self._url_tempdir.name,
-                f"inline{self._url_download_counter}{detected_ext}"
-            )
+            with self._url_cache_lock:
+                if self._url_tempdir is None:
+                    self._url_tempdir = tempfile.TemporaryDirectory()
+                self._url_download_counter += 1
+                tmp_path = os.path.join(
+                    self._url_tempdir.name,
+                    f"inline{self._url_download_counter}{detected_ext}"
+                )
             with open(tmp_path, 'wb') as fw:
                 fw.write(content)
 
@@ -1556,7 +1770,6 @@ class FeatureGraphicsCollection(Feature):
                 'input_hash': None,
             }
 
-        self._url_cache[source_url] = entry
         return entry
 
 
@@ -34,6 +34,14 @@ class ResourceAccessor(run.ResourceAccessorBase):
         fullpath = self.get_full_path(fpath, fname, ftype, flm_run_info)
         return os.path.exists(fullpath) and os.path.isdir(fullpath)
 
+    def get_file_cache_stamp(self, fpath, fname, ftype, flm_run_info):
+        fullpath = os.path.abspath(self.get_full_path(fpath, fname, ftype, flm_run_info))
+        try:
+            st = os.stat(fullpath)
+        except OSError:
+            return (fullpath, None)
+        return (fullpath, (st.st_mtime_ns, st.st_size))
+
     def _open_r(self, fullpath, binary):
         if binary:
             return open(fullpath, 'rb')
@@ -41,14 +49,21 @@ class ResourceAccessor(run.ResourceAccessorBase):
         
     def read_file(self, fpath, fname, ftype, flm_run_info, binary=False):
         fullpath = self.get_full_path(fpath, fname, ftype, flm_run_info)
+        self.record_dependency(fpath, fname, ftype, flm_run_info)
         with self._open_r(fullpath, binary) as f:
             content = f.read()
         return content
 
     def open_file_object_context(self, fpath, fname, ftype, flm_run_info, binary=False):
         fullpath = self.get_full_path(fpath, fname, ftype, flm_run_info)
+        self.record_dependency(fpath, fname, ftype, flm_run_info)
         return self._open_r(fullpath, binary)
 
+    def record_dependency(self, fpath, fname, ftype, flm_run_info):
+        dependencies = (flm_run_info or {}).get('dependencies', None)
+        if dependencies is not None:
+            dependencies.add(self.get_full_path(fpath, fname, ftype, flm_run_info), ftype)
+
     def get_full_path(self, fpath, fname, ftype, flm_run_info):
         if not fpath:
             return fname
@@ -61,7 +76,8 @@ class ResourceAccessor(run.ResourceAccessorBase):
 
 
 
-def load_external_configs(dirname, *, arg_config=None, arg_format=None, arg_workflow=None):
+def load_external_configs(dirname, *, arg_config=None, arg_format=None, arg_workflow=None,
+                          dependencies=None):
 
     load_config_files = []
 
@@ -105,6 +121,8 @@ def load_external_configs(dirname, *, arg_config=None, arg_format=None, arg_work
         if isinstance(config_file, dict):
             data = config_file
         else:
+            if dependencies is not None:
+                dependencies.add(config_file, 'config')
             with open(config_file, encoding='utf-8') as f:
                 logger.info(f"Loading flm config from {config_file}")
                 data = yaml.safe_load(f)
@@ -188,6 +206,9 @@ class Main:
 
         # Get the FLM content
 
+        # the files that this run reads
+        dependencies = run.RunDependencies()
+
         input_content = ''
         dirname = None
         basename = None
@@ -222,6 +243,9 @@ class Main:
                                "FLM content lines.")
             for line in fileinput.input(files=arg_files, encoding='utf-8'):
                 input_content += line
+            for fname in arg_files:
+                if fname != '-':
+                    dependencies.add(fname, 'input')
 
         output_dirname = dirname
         output_basename = None
@@ -242,6 +266,7 @@ class Main:
             arg_config=arg_config,
             arg_format=arg_format,
             arg_workflow=arg_workflow,
+            dependencies=dependencies,
         )
         if arg_inline_default_configs is not None:
             orig_configs = [
@@ -302,10 +327,12 @@ class Main:
                 'line_number_offset': line_number_offset,
             },
             'metadata': doc_metadata,
+            'dependencies': dependencies,
         }
 
         self.run_config = run_config
         self.resource_accessor = resource_accessor
+        self.dependencies = dependencies
         self.flm_run_info = flm_run_info
 
 
@@ -368,6 +395,18 @@ class Main:
         finally:
             run_object.cleanup()
 
+        return self.write_output(result, result_info)
+
+    def write_output(self, result, result_info):
+        r"""
+        Write the `result` of a run to the output specified by the `output`
+        argument (a file name, a file-like object, or standard output) and
+        return a dictionary with information about the run.
+        """
+
+        arg_output = self.arg_output
+        arg_suppress_final_newline = self.arg_suppress_final_newline
+
         binary_output = result_info['binary_output']
 
         #
@@ -410,7 +449,190 @@ class Main:
 
 
 
+# File name extensions of the output files written in multi-format mode, see
+# MultiFormatMain.  Other formats use '.' + format name.
+output_file_extensions_by_format = {
+    'html': '.html',
+    'latex': '.tex',
+    'markdown': '.md',
+    'text': '.txt',
+    'pdf': '.pdf',
+}
+
+
+def split_output_formats(arg_format):
+    r"""
+    Return the list of output formats specified in the comma-separated
+    `arg_format` (e.g. ``'html,latex,markdown'``), without duplicates.  Returns
+    `None` if `arg_format` is `None`.
+    """
+    if arg_format is None:
+        return None
+    formats = []
+    for fmt in arg_format.split(','):
+        fmt = fmt.strip()
+        if fmt and fmt not in formats:
+            formats.append(fmt)
+    return formats
+
+
+class MultiFormatMain:
+    r"""
+    Render the same FLM input to several output formats (e.g., ``flm -f
+    html,latex,markdown``), parsing it only once whenever possible.
+
+    The configuration is loaded for each format, as it would be for a single
+    format, so that format-specific configuration is honored.  The input is
+    parsed once with an environment set up independently of the output
+    format (see :py:func:`flm.main.run.load_parsing_environment`), and the
+    resulting fragments are rendered by each format's workflow.  If a format's
+    configuration changes the parsing setup, i.e., the parsing options or the
+    macro, environment and specials definitions that the features provide
+    (compared by spec class and `_fields` values), then the input is parsed
+    separately for that format, and the result is shared with any further
+    formats that have the same parsing setup.  Feature settings that are
+    only used for rendering (such as the endnote counter formatters) do not
+    require a separate parse.  Spec objects that do not declare their
+    `_fields` cannot be compared and always require a separate parse.
+
+    Each format is written to a separate file, whose name is formed by adding
+    the format's file extension (see
+    :py:data:`output_file_extensions_by_format`) to the `output` argument
+    (with any extension corresponding to an output format removed).  If no
+    `output` is specified, the name of the first input file (without its
+    extension) is used.
+
+    Other arguments are the same as for :py:class:`Main`.
+    """
+    def __init__(self, **kwargs):
+        super().__init__()
+
+        self.kwargs = kwargs
+
+        self.formats = split_output_formats(kwargs.get('format', None))
+        if not self.formats:
+            raise ValueError("No output formats specified")
+
+        arg_output = kwargs.get('output', None)
+        arg_files = kwargs.get('files', None)
+        if hasattr(arg_output, 'write'):
+            raise ValueError("Cannot write multiple output formats to a single stream")
+        if not arg_output or arg_output == '-':
+            if not arg_files or arg_files[0] == '-':
+                raise ValueError(
+                    "Please specify the base name of the output files (-o/--output) "
+                    "when rendering to multiple output formats."
+                )
+            # name the output files after the input file
+            output_base, _ = os.path.splitext(arg_files[0])
+        else:
+            output_base, output_ext = os.path.splitext(arg_output)
+            if output_ext not in output_file_extensions_by_format.values():
+                output_base = arg_output
+
+        self.outputs = {}
+        input_fullpaths = [ os.path.abspath(fname) for fname in (arg_files or []) ]
+        for fmt in self.formats:
+            output = output_base + output_file_extensions_by_format.get(fmt, '.' + fmt)
+            if os.path.abspath(output) in input_fullpaths:
+                raise ValueError(f"Output file ‘{output}’ would overwrite the input file")
+            self.outputs[fmt] = output
+
+        self.mains = {
+            fmt: Main(**dict(kwargs, format=fmt, output=self.outputs[fmt]))
+            for fmt in self.formats
+        }
+
+    def make_parsing_environment(self):
+        r"""
+        Return a :py:class:`~flm.main.run.WorkflowEnvironmentInformation` with
+        the environment used to parse the input for all formats.
+        """
+        neutral_main = Main(**dict(self.kwargs, format=None, output=None))
+        run_config = neutral_main.run_config
+        if neutral_main.arg_inline_configs:
+            run_config = configmerger.recursive_assign_defaults([
+                *[ c for c in neutral_main.arg_inline_configs if c is not None ],
+                run_config,
+            ])
+        return run.load_parsing_environment(
+            flm_run_info=neutral_main.flm_run_info,
+            run_config=run_config,
+            default_configs=neutral_main.orig_configs,
+        )
+
+    def run(self):
+        r"""
+        Render the input to all output formats and write the output files.
+        Returns a dictionary mapping each format to the information
+        returned by :py:meth:`Main.write_output`.
+        """
+
+        # Formats with the same parsing setup share the parsed fragments.
+        # Each entry is [wenv, parsed fragments key, parsed fragments].  The
+        # format-neutral parsing environment is tried first.
+        parse_groups = [ [ self.make_parsing_environment(), None, None ] ]
+
+        main_run_infos = {}
+        for fmt in self.formats:
+            main_object = self.mains[fmt]
+            run_object = main_object.make_run_object()
+            try:
+                key = _get_parsed_fragments_key(run_object)
+                for group in parse_groups:
+                    if _is_parsing_compatible(run_object.wenv, group[0]):
+                        break
+                else:
+                    logger.info("The parsing setup for format ‘%s’ differs, parsing "
+                                "the input separately for this format", fmt)
+                    group = [ run_object.wenv, None, None ]
+                    parse_groups.append(group)
+
+                group_wenv, group_key, parsed_fragments = group
+                if parsed_fragments is None or group_key != key:
+                    parsed_fragments = \
+                        run_object.parse_fragments(environment=group_wenv.environment)
+                    group[1:] = [ key, parsed_fragments ]
+
+                logger.info("Rendering format ‘%s’", fmt)
+                result, result_info = run_object.run(parsed_fragments=parsed_fragments)
+
+            finally:
+                run_object.cleanup()
+
+            main_run_infos[fmt] = main_object.write_output(result, result_info)
+
+        return main_run_infos
+
+
+def _get_parsed_fragments_key(run_object):
+    # fragments can be shared between runs that parse the same content
+    return (
+        run_object.flm_content,
+        tuple(
+            (cpinfo['input_source'], cpinfo['flm_content'])
+            for cpinfo in run_object.content_parts_infos['parts']
+        ),
+    )
+
+
+def _is_parsing_compatible(wenv, parsing_wenv):
+    # Parsing only depends on the parsing options and on the latex context
+    # that the features set up; other feature settings (e.g., the endnote
+    # counter formatters) are only used when rendering.
+    return (
+        wenv.config['flm'].get('parsing', {}) == parsing_wenv.config['flm'].get('parsing', {})
+        and wenv.environment.latex_context.flm_features_fingerprint
+            == parsing_wenv.environment.latex_context.flm_features_fingerprint
+    )
+
+
 def main(**kwargs):
+    formats = split_output_formats(kwargs.get('format', None))
+    if formats is not None and len(formats) > 1:
+        return MultiFormatMain(**kwargs).run()
+    if formats:
+        kwargs = dict(kwargs, format=formats[0])
     a = Main(**kwargs)
     return a.run()
 
@@ -0,0 +1,401 @@
+r"""
+Convert math to MathML (or SVG) at render time, instead of leaving the LaTeX
+source in the HTML output for MathJax to typeset in the browser.
+
+A :py:class:`MathPrerenderer` instance is meant to be set as the
+`prerender_math_fn` attribute of a
+:py:class:`~flm.fragmentrenderer.html.HtmlFragmentRenderer`.  It converts the
+recomposed LaTeX code of each equation with a math conversion engine:
+
+- ``latex2mathml`` --- the pure-Python `latex2mathml
+  <https://pypi.org/project/latex2mathml/>`_ package (must be installed
+  separately with ``pip install latex2mathml``);
+
+- ``command`` --- any locally installed program that reads the LaTeX math code
+  on its standard input and writes the corresponding HTML code (MathML or SVG)
+  on its standard output, e.g., a small node script using MathJax.  In the
+  command arguments, ``{displaytype}`` is replaced by ``inline`` or
+  ``display``.
+
+Results are cached by (LaTeX code, display type, environment, macros, engine).
+If a `cache_file` is given, the cache is stored in that file and reused in
+further runs.  Documents with many equations tend to repeat the same
+expressions many times, so only a small fraction of them need to be converted.
+
+With the ``flm`` command, use the ``math_prerender`` configuration key:
+
+.. code-block:: yaml
+
+    flm:
+      math_prerender:
+        engine: 'latex2mathml'
+        cache_file: '_flm_math_cache.jsonl'
+        macros:
+          R: '\mathbb{R}'
+          ket: ['\left|#1\right\rangle', 1]
+
+The ``command`` engine and the `cache_file` run a program and write to a file
+of your choice, so they can only be configured on the command line or in a
+``flmconfig.yaml`` file, and not in a document's front matter.
+
+This module is not available in the JavaScript version of FLM.
+"""
+
+import os.path
+import re
+import json
+import hashlib
+import subprocess
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+def _wrap_in_environment(latex, environmentname):
+    # FLM inserts equation tags (\tag*{...}) itself, so use the unnumbered
+    # version of the environment to avoid the engine numbering equations again
+    if not environmentname:
+        return latex
+    if not environmentname.endswith('*'):
+        environmentname += '*'
+    return f"\\begin{{{environmentname}}}" + latex + f"\\end{{{environmentname}}}"
+
+
+class MathPrerenderEngineBase:
+    r"""
+    Base class for math conversion engines used by
+    :py:class:`MathPrerenderer`.
+    """
+
+    def get_engine_id(self):
+        r"""
+        Return a string identifying this engine and any options that affect its
+        output.  The engine ID is part of the cache key.
+        """
+        raise RuntimeError("Must be reimplemented by subclasses!")
+
+    def convert(self, latex, *, displaytype, environmentname=None):
+        r"""
+        Convert the LaTeX math code `latex` (without delimiters) to HTML code.
+        The `environmentname` is the name of the math environment (e.g.,
+        ``align*``) for display math that should be wrapped in one, or `None`.
+
+        Raise an exception if the math cannot be converted.
+        """
+        raise RuntimeError("Must be reimplemented by subclasses!")
+
+
+class Latex2MathMLEngine(MathPrerenderEngineBase):
+    r"""
+    Convert math to MathML using the `latex2mathml` package.
+    """
+
+    def __init__(self):
+        super().__init__()
+        try:
+            from latex2mathml.converter import convert as latex2mathml_convert
+        except ImportError as e:
+            raise ValueError(
+                "The ‘latex2mathml’ math prerender engine requires the "
+                "‘latex2mathml’ package (pip install latex2mathml)"
+            ) from e
+        self._convert = latex2mathml_convert
+
+        from importlib.metadata import version
+        self.engine_id = f"latex2mathml-{version('latex2mathml')}"
+
+    def get_engine_id(self):
+        return self.engine_id
+
+    def convert(self, latex, *, displaytype, environmentname=None):
+        # latex2mathml doesn't know the equation environment
+        if environmentname and environmentname.rstrip('*') != 'equation':
+            latex = _wrap_in_environment(latex, environmentname)
+        return self._convert(
+            latex,
+            display=('block' if displaytype == 'display' else 'inline'),
+        )
+
+
+class CommandEngine(MathPrerenderEngineBase):
+    r"""
+    Convert math by running an external program.  The LaTeX math code is
+    given on the program's standard input, and the program writes the HTML
+    code on its standard output.  Display math environments are given as
+    ``\begin{align*}...\end{align*}``, always using the unnumbered (starred)
+    environment, as FLM inserts equation tags itself.  The string
+    ``{displaytype}`` in any command argument is replaced by ``inline`` or
+    ``display``.
+    """
+
+    def __init__(self, command):
+        super().__init__()
+        if not command:
+            raise ValueError("The ‘command’ math prerender engine requires a command")
+        if isinstance(command, str):
+            command = [ command ]
+        self.command = list(command)
+
+    def get_engine_id(self):
+        return 'command-' + json.dumps(self.command)
+
+    def convert(self, latex, *, displaytype, environmentname=None):
+        latex = _wrap_in_environment(latex, environmentname)
+        args = [ arg.replace('{displaytype}', displaytype) for arg in self.command ]
+        result = subprocess.run(
+            args,
+            input=latex,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            check=True,
+        )
+        return result.stdout.strip()
+
+
+math_prerender_engines = {
+    'latex2mathml': Latex2MathMLEngine,
+    'command': CommandEngine,
+}
+
+
+
+# ------------------------------------------------------------------------------
+
+
+_rx_macro_or_escape = re.compile(r'\\([A-Za-z]+|.)', flags=re.DOTALL)
+
+_rx_ends_with_macro_name = re.compile(r'\\[A-Za-z]+$')
+
+def _read_macro_argument(latex, pos):
+    # Returns (argument, end position) for the macro argument starting at or
+    # after `pos`, or None if there isn't any.
+    while pos < len(latex) and latex[pos] in ' \t\n':
+        pos += 1
+    if pos >= len(latex):
+        return None
+    c = latex[pos]
+    if c == '{':
+        depth = 0
+        j = pos
+        while j < len(latex):
+            if latex[j] == '\\':
+                j += 2
+                continue
+            if latex[j] == '{':
+                depth += 1
+            elif latex[j] == '}':
+                depth -= 1
+                if depth == 0:
+                    return latex[pos+1:j], j+1
+            j += 1
+        return None
+    if c == '\\':
+        m = _rx_macro_or_escape.match(latex, pos)
+        return m.group(), m.end()
+    if c == '}':
+        return None
+    return c, pos+1
+
+
+def expand_math_macros(latex, macros, *, max_depth=16):
+    r"""
+    Expand the given `macros` in the LaTeX math code `latex`.
+
+    The `macros` are specified as in MathJax's configuration: a dictionary
+    mapping a macro name (without the backslash) either to its replacement
+    string, or to a list ``[replacement, num_args]`` for macros that accept
+    arguments (``#1``, ``#2``, ... in the replacement string).  Macros used
+    in replacement strings are expanded, too, up to `max_depth` levels.
+    """
+    if not macros:
+        return latex
+
+    for _ in range(max_depth):
+        parts = []
+        pos = 0
+        expanded_any = False
+        for m in _rx_macro_or_escape.finditer(latex):
+            if m.start() < pos:
+                # inside an argument of a macro we've already expanded
+                continue
+            name = m.group(1)
+            if name not in macros:
+                continue
+            macro_def = macros[name]
+            if isinstance(macro_def, str):
+                replacement, nargs = macro_def, 0
+            else:
+                replacement, nargs = macro_def[0], int(macro_def[1])
+            end = m.end()
+            args = []
+            for _j in range(nargs):
+                arg_end = _read_macro_argument(latex, end)
+                if arg_end is None:
+                    raise ValueError(
+                        f"Missing argument for macro \\{name} in ‘{latex}’"
+                    )
+                arg, end = arg_end
+                args.append(arg)
+            for j, arg in enumerate(args):
+                replacement = replacement.replace(f'#{j+1}', arg)
+            if end < len(latex) and latex[end].isalpha() \
+               and _rx_ends_with_macro_name.search(replacement) is not None:
+                # don't glue a following letter onto a replacement that ends
+                # with a macro name
+                replacement += ' '
+            parts.append(latex[pos:m.start()])
+            parts.append(replacement)
+            pos = end
+            expanded_any = True
+        if not expanded_any:
+            return latex
+        parts.append(latex[pos:])
+        latex = ''.join(parts)
+
+    raise ValueError(f"Too many levels of macro expansion in ‘{latex}’")
+
+
+
+# ------------------------------------------------------------------------------
+
+
+class MathPrerenderer:
+    r"""
+    Convert math to HTML code with a math conversion engine, caching the
+    results.  Instances are callables that can be used as the
+    `prerender_math_fn` of an
+    :py:class:`~flm.fragmentrenderer.html.HtmlFragmentRenderer`.
+
+    :param engine: The name of the math conversion engine (see
+        :py:data:`math_prerender_engines`), or a
+        :py:class:`MathPrerenderEngineBase` instance.
+    :param command: The command to run, for the ``command`` engine.
+    :param macros: Math macros to expand before converting math, in the
+        format of MathJax's ``tex.macros`` configuration (see
+        :py:func:`expand_math_macros`).
+    :param cache_file: If non-`None`, the name of a file in which to keep
+        converted math across runs.  The file is created if it does not
+        exist, and new entries are appended to it as they are converted.
+
+    A `MathPrerenderer` instance can be shared between threads.
+    """
+
+    def __init__(self, engine='latex2mathml', *, command=None, macros=None,
+                 cache_file=None):
+        super().__init__()
+
+        if isinstance(engine, str):
+            if engine not in math_prerender_engines:
+                raise ValueError(
+                    f"Invalid math prerender engine ‘{engine}’, expected one of "
+                    + ", ".join(math_prerender_engines.keys())
+                )
+            EngineClass = math_prerender_engines[engine]
+            if engine == 'command':
+                engine = EngineClass(command)
+            else:
+                engine = EngineClass()
+        self.engine = engine
+        self.macros = dict(macros) if macros else {}
+        self.cache_file = cache_file
+
+        self._cache_key_prefix = json.dumps(
+            [ self.engine.get_engine_id(), self.macros ],
+            sort_keys=True
+        )
+
+        self._lock = threading.Lock()
+        self._cache = {}
+        # keys of math that could not be converted; these are not saved in the
+        # cache file
+        self._failed = set()
+
+        if self.cache_file is not None:
+            self._load_cache_file()
+
+    def _load_cache_file(self):
+        if not os.path.exists(self.cache_file):
+            return
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    key, html = json.loads(line)
+                except ValueError:
+                    # e.g., incomplete last line if a previous run was
+                    # interrupted
+                    continue
+                self._cache[key] = html
+        logger.debug("Loaded %d prerendered math entries from %s",
+                     len(self._cache), self.cache_file)
+
+    def _save_cache_entry(self, key, html):
+        # called with self._lock held
+        with open(self.cache_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps([key, html], ensure_ascii=False) + '\n')
+
+    def get_cache_key(self, latex, displaytype, environmentname):
+        return hashlib.sha256(
+            json.dumps(
+                [ self._cache_key_prefix, latex, displaytype, environmentname ]
+            ).encode('utf-8')
+        ).hexdigest()
+
+    def __call__(self, latex, *, displaytype, environmentname=None, **kwargs):
+        r"""
+        Return the HTML code for the given LaTeX math code, or `None` if it
+        could not be converted.  The arguments are those documented for
+        :py:attr:`~flm.fragmentrenderer.html.HtmlFragmentRenderer.prerender_math_fn`.
+        """
+        key = self.get_cache_key(latex, displaytype, environmentname)
+
+        if key in self._cache:
+            return self._cache[key]
+        if key in self._failed:
+            return None
+
+        try:
+            html = self.engine.convert(
+                expand_math_macros(latex, self.macros),
+                displaytype=displaytype,
+                environmentname=environmentname,
+            )
+        except Exception as e:
+            logger.warning("Could not prerender math ‘%s’: %s", latex, e)
+            with self._lock:
+                self._failed.add(key)
+            return None
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = html
+                if self.cache_file is not None:
+                    self._save_cache_entry(key, html)
+        return html
+
+
+# ------------------------------------------------------------------------------
+
+_shared_prerenderers = {}
+_shared_prerenderers_lock = threading.Lock()
+
+def get_shared_math_prerenderer(*, engine='latex2mathml', command=None, macros=None,
+                                cache_file=None):
+    r"""
+    Return a :py:class:`MathPrerenderer` instance with the given options,
+    reusing the instance created by a previous call with the same options.
+    This way, the in-memory cache is kept across runs in the same process
+    (e.g., in watch mode).  The `cache_file` should be an absolute path.
+    """
+    key = json.dumps([engine, command, macros, cache_file], sort_keys=True)
+    with _shared_prerenderers_lock:
+        if key not in _shared_prerenderers:
+            _shared_prerenderers[key] = MathPrerenderer(
+                engine,
+                command=command,
+                macros=macros,
+                cache_file=cache_file,
+            )
+        return _shared_prerenderers[key]
@@ -3,6 +3,7 @@ import os # os.pathsep
 import os.path
 import re
 import copy
+import contextlib
 import logging
 logger = logging.getLogger(__name__)
 
@@ -16,11 +17,14 @@ import frontmatter
 import yaml
 import jsonschema
 
-from .configmerger import ConfigMerger
+from .configmerger import ConfigMerger, recording_imported_files
 configmerger = ConfigMerger()
 
 from ._util import abbrev_value_str
 
+from . import mathprerender
+from .workflow._base import RenderWorkflow
+
 from flm import flmenvironment
 
 from ._flm_args_schema import (
@@ -31,6 +35,12 @@ from ._flm_args_schema import (
 
 # ---
 
+# Template files that were found not to exist, see
+# ResourceAccessorBase.get_template_info_file_name().  Maps
+# (accessor type, ftype, resolved folder name, file name) -> folder stamp.
+_missing_files_cache = {}
+
+
 class FLMMainRunError(Exception):
     r"""
     Exception raised by the FLM main run pipeline when a user-facing error
@@ -75,6 +85,9 @@ class ResourceAccessorBase:
 
         cwd = flm_run_info.get('cwd', None)
 
+        # cache stamps of the folders we look into, see _is_known_missing()
+        folder_stamps = {}
+
         for tpath in self.template_path:
 
             if tpath is None:
@@ -82,14 +95,56 @@ class ResourceAccessorBase:
 
             for t_ext in self.template_exts:
                 tfullname = os.path.join(template_prefix, f"{template_name}{t_ext}")
+                if self._is_known_missing(tpath, tfullname, 'template_info',
+                                          flm_run_info, folder_stamps):
+                    continue
                 if self.file_exists(tpath, tfullname, 'template_info', flm_run_info):
                     return tpath, tfullname
+                self._set_known_missing(tpath, tfullname, 'template_info',
+                                        flm_run_info, folder_stamps)
 
         raise FLMMainRunError(
             f"Template not found: ‘{template_name}’.  "
             f"Template path is = {repr(self.template_path)}"
         )
 
+    def _get_missing_file_cache_key(self, fpath, fname, ftype, flm_run_info,
+                                    folder_stamps):
+        # Returns (cache key, stamp of the containing folder), or None if we
+        # can't cache the result of probing for this file.  The folder's stamp
+        # changes whenever a file is created in it.
+        fdir, fbase = os.path.split(fname)
+        if (fpath, fdir) not in folder_stamps:
+            folder_stamps[(fpath, fdir)] = self.get_file_cache_stamp(
+                fpath, fdir, ftype+'_folder', flm_run_info
+            )
+        folder_cache_info = folder_stamps[(fpath, fdir)]
+        if folder_cache_info is None:
+            return None
+        resolved_folder, folder_stamp = folder_cache_info
+        return (type(self), ftype, resolved_folder, fbase), folder_stamp
+
+    def _is_known_missing(self, fpath, fname, ftype, flm_run_info, folder_stamps):
+        key_stamp = self._get_missing_file_cache_key(
+            fpath, fname, ftype, flm_run_info, folder_stamps
+        )
+        if key_stamp is None:
+            return False
+        key, folder_stamp = key_stamp
+        return (
+            key in _missing_files_cache
+            and _missing_files_cache[key] == folder_stamp
+        )
+
+    def _set_known_missing(self, fpath, fname, ftype, flm_run_info, folder_stamps):
+        key_stamp = self._get_missing_file_cache_key(
+            fpath, fname, ftype, flm_run_info, folder_stamps
+        )
+        if key_stamp is None:
+            return
+        key, folder_stamp = key_stamp
+        _missing_files_cache[key] = folder_stamp
+
     @classmethod
     def get_cwd_for_resource_info(cls, resource_info, flm_run_info):
         cwd = flm_run_info.get('cwd', '.')
@@ -192,7 +247,156 @@ class ResourceAccessorBase:
         :returns: ``True`` if the directory exists, ``False`` otherwise.
         """
         raise RuntimeError("Must be reimplemented by subclasses!")
-        
+
+    def get_file_cache_stamp(self, fpath, fname, ftype, flm_run_info) -> Optional[tuple]:
+        r"""
+        Return information used to cache data derived from a file or directory
+        across runs in the same process (e.g., parsed templates).
+
+        :param fpath: Directory path.
+        :param fname: File or directory name (joined with *fpath*).
+        :param ftype: Descriptive file-type string.
+        :param flm_run_info: The run-info dictionary.
+        :returns: A ``(resolved_name, stamp)`` tuple, where ``resolved_name``
+            uniquely identifies the file (e.g., its absolute path) and
+            ``stamp`` is a value that changes whenever the file is modified,
+            created or removed (``None`` if the file does not exist).  Returns
+            ``None`` if data derived from this file should not be cached.  The
+            default implementation returns ``None``.
+        """
+        return None
+
+    def record_dependency(self, fpath, fname, ftype, flm_run_info) -> None:
+        r"""
+        Record that the current run depends on the given file, in the
+        :py:class:`RunDependencies` instance ``flm_run_info['dependencies']``
+        (if there is one).  Subclasses should call this method whenever they
+        read a file on behalf of a run.
+
+        :param fpath: Directory path.
+        :param fname: Filename (joined with *fpath*).
+        :param ftype: Descriptive file-type string.
+        :param flm_run_info: The run-info dictionary.
+
+        The default implementation does nothing.
+        """
+        return
+
+
+
+# ------------------
+
+
+run_stages = ('load', 'render', 'postprocess')
+r"""
+The stages of the document processing pipeline of a :py:class:`Run`, in order:
+``'load'`` reads the input and configuration, sets up the environment and
+parses the FLM content; ``'render'`` builds the document from the parsed
+fragments and renders it (this is also where graphics are collected); and
+``'postprocess'`` applies the workflow's post-processing to the rendered
+content (e.g., placing it in the document template).  Redoing a stage requires
+redoing all later stages.
+"""
+
+dependency_ftype_stages = {
+    'graphics': 'render',
+    'template_info': 'postprocess',
+    'template_content': 'postprocess',
+}
+r"""
+The first pipeline stage (see :py:data:`run_stages`) that needs to be redone
+when a file of the given type changes.  Changes to files of any other type
+(input, configuration, content parts, data files, ...) require the full run
+to be redone.
+"""
+
+
+def _get_file_stamp(fullpath):
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class RunDependencies:
+    r"""
+    The set of files a run read, each recorded along with the file type(s)
+    (``ftype``) it was read as and with the file's modification stamp at the
+    time it was first read.
+
+    A :py:class:`Run` records its dependencies in the instance found in
+    ``flm_run_info['dependencies']``, if any.  This information is used in
+    watch mode to figure out which files to watch and which pipeline stages
+    to redo when some of them change.
+    """
+    def __init__(self):
+        super().__init__()
+        # full path -> (set of ftypes, stamp)
+        self.files = {}
+
+    def add(self, fullpath, ftype):
+        r"""
+        Record that the run read the file `fullpath` as a file of type
+        `ftype`.
+        """
+        fullpath = os.path.abspath(fullpath)
+        entry = self.files.get(fullpath, None)
+        if entry is None:
+            entry = (set(), _get_file_stamp(fullpath))
+            self.files[fullpath] = entry
+        entry[0].add(ftype)
+
+    def get_file_stage(self, fullpath):
+        r"""
+        Return the first pipeline stage that needs to be redone if the file
+        `fullpath` changes, or `None` if the run doesn't depend on this file.
+        """
+        entry = self.files.get(os.path.abspath(fullpath), None)
+        if entry is None:
+            return None
+        return min(
+            (dependency_ftype_stages.get(ftype, 'load') for ftype in entry[0]),
+            key=run_stages.index
+        )
+
+    def get_invalidated_stage(self, fullpaths):
+        r"""
+        Return the first pipeline stage that needs to be redone if the given
+        files change, or `None` if the run doesn't depend on any of them.
+        """
+        stages = [ self.get_file_stage(fullpath) for fullpath in fullpaths ]
+        stages = [ stage for stage in stages if stage is not None ]
+        if not stages:
+            return None
+        return min(stages, key=run_stages.index)
+
+    def forget_stages_from(self, stage):
+        r"""
+        Forget the dependencies that were recorded by pipeline stage `stage`
+        and the later ones, in preparation for redoing these stages.
+        """
+        stage_index = run_stages.index(stage)
+        for fullpath, (ftypes, stamp) in list(self.files.items()):
+            ftypes.difference_update([
+                ftype for ftype in ftypes
+                if run_stages.index(dependency_ftype_stages.get(ftype, 'load'))
+                   >= stage_index
+            ])
+            if not ftypes:
+                del self.files[fullpath]
+
+    def get_changed_files(self):
+        r"""
+        Return a list of the files that were modified, created or removed since
+        they were recorded.
+        """
+        return [
+            fullpath
+            for fullpath, (ftypes, stamp) in self.files.items()
+            if _get_file_stamp(fullpath) != stamp
+        ]
+
 
 
 # ------------------
@@ -230,10 +434,19 @@ class ResourceInfo:
 
     :param source_path: Relative file path of the source, or ``None`` if
         the fragment does not originate from a file.
+
+    :param resource_accessor: The :class:`ResourceAccessorBase` instance used
+        by :meth:`read_resource_file` to read external files the fragment
+        refers to (e.g., data files loaded by ``\celldatafile``), or ``None``.
+
+    :param flm_run_info: The run-info dictionary that is passed on to the
+        `resource_accessor`.
     """
-    def __init__(self, source_path):
+    def __init__(self, source_path, resource_accessor=None, flm_run_info=None):
         super().__init__()
         self.source_path = source_path
+        self.resource_accessor = resource_accessor
+        self.flm_run_info = flm_run_info
 
         if source_path is not None:
             self._source_dirname = os.path.dirname(self.source_path)
@@ -247,6 +460,28 @@ class ResourceInfo:
         """
         return self._source_dirname
 
+    def read_resource_file(self, fname, ftype, binary=False):
+        r"""
+        Read and return the contents of the file `fname`, interpreted relative
+        to the directory of this fragment's source.
+
+        :param fname: Name of the file to read.
+        :param ftype: Descriptive file-type string (e.g. ``'cells_data'``).
+        :param binary: If ``True``, return raw bytes instead of a string.
+        :raises FLMMainRunError: If no `resource_accessor` was provided.
+        """
+        if self.resource_accessor is None:
+            raise FLMMainRunError(
+                f"Cannot read ‘{fname}’: no resource accessor available"
+            )
+        flm_run_info = self.flm_run_info
+        if flm_run_info is None:
+            flm_run_info = {}
+        cwd = self.resource_accessor.get_cwd_for_resource_info(self, flm_run_info)
+        return self.resource_accessor.read_file(
+            cwd, fname, ftype, flm_run_info, binary=binary
+        )
+
 
 
 
@@ -275,6 +510,8 @@ class ResourceInfo:
 #     'input_lineno_colno_offsets': ..... # passed on to flmfragment, adjust line/col numbers
 #     'metadata': ..... # to be merged into the document's metadata. Can
 #                       # include information about the FLM source, etc.
+#     'dependencies': ..... # optional RunDependencies instance in which
+#                           # the files read by the run are recorded
 # }
 
 
@@ -371,7 +608,7 @@ def load_features(features_merge_configs, flm_run_info):
 
         features.append( FeatureClass(**featureconfig) )
 
-        feature_configs[featurename] = feature_configs
+        feature_configs[featurename] = featureconfig
 
     return features, feature_configs
 
@@ -444,6 +681,22 @@ properties:
                 type: array
                 items:
                     type: string
+
+            math_prerender:
+                # see flm.main.mathprerender
+                type: ['object', 'null']
+                additionalProperties: false
+                properties:
+                    engine:
+                        type: string
+                    command:
+                        type: array
+                        items:
+                            type: string
+                    macros:
+                        type: object
+                    cache_file:
+                        type: ['string', 'null']
 """)
 
 
@@ -667,6 +920,88 @@ def get_config_json_schema(
 
 
 
+def _get_override_config(flm_run_info):
+    if flm_run_info.get('force_block_level', None) is not None:
+        return {
+            'flm': {
+                'parsing': {
+                    'force_block_level': flm_run_info['force_block_level']
+                }
+            }
+        }
+    return {}
+
+
+def _merge_main_config(merge_configs):
+    # Returns (config, features_merge_configs, workflows_merge_configs)
+
+    # make a deep copy of everything so we can modify configs
+    merge_configs = [
+        copy.deepcopy(x)
+        for x in merge_configs
+    ]
+
+    logger.debug('Merging configurations.  At this point, merge_configs = %s',
+                 ",\n    ".join([f"{repr(m)}" for m in merge_configs]))
+
+    # pull out feature-related config, don't merge these yet because we want to
+    # pull in the defaults first.  See load_features()
+    features_merge_configs = []
+    for c in merge_configs:
+        feature_merge_configs = {}
+        flmconfig = c.get('flm', {})
+        if flmconfig and flmconfig.get('features', None):
+            for featurename, featureconfig in flmconfig['features'].items():
+                if featurename.startswith('$'):
+                    raise ValueError(
+                        f"FIXME: presets not yet supported immediately inside "
+                        f"‘features:’ config, got {featurename}"
+                    )
+                feature_merge_configs[featurename] = featureconfig
+                if featureconfig is None or featureconfig is False:
+                    c['flm']['features'][featurename] = False
+                else:
+                    c['flm']['features'][featurename] = True
+
+        features_merge_configs.append(feature_merge_configs)
+
+    # pull out workflow-related config, don't merge these yet because we want to
+    # pull in the defaults first.
+    workflows_merge_configs = []
+    for c in merge_configs:
+        workflow_merge_configs = {}
+        flmconfig = c.get('flm', {})
+        if flmconfig and flmconfig.get('workflow_config', None):
+            for workflowname, workflowconfig in flmconfig['workflow_config'].items():
+                if workflowname.startswith('$'):
+                    raise ValueError(
+                        f"FIXME: $-instruction presets in YAML not yet supported immediately inside "
+                        f"‘workflow_config:’ config, got {workflowname}"
+                    )
+                workflow_merge_configs[workflowname] = workflowconfig
+                if workflowconfig is None or workflowconfig is False:
+                    c['flm']['workflow_config'][workflowname] = False
+                else:
+                    c['flm']['workflow_config'][workflowname] = True
+
+        workflows_merge_configs.append(workflow_merge_configs)
+
+    # merge the base config !
+    config = configmerger.recursive_assign_defaults(merge_configs)
+
+    logger.debug("Merged config (w/o workflow/feature configs) = %s",
+                 abbrev_value_str(config, maxstrlen=512) )
+    
+    # validate the overall config structure
+    validate_config_for_schema(
+        'flm',
+        _global_config_schema,
+        config.get('flm', {}),
+    )
+
+    return config, features_merge_configs, workflows_merge_configs
+
+
 def load_workflow_environment(*,
                               flm_run_info,
                               run_config,
@@ -731,87 +1066,18 @@ def load_workflow_environment(*,
             _builtin_default_config['_base'],
         ])
 
-    override_config = {}
-    if flm_run_info.get('force_block_level', None) is not None:
-        override_config = {
-            'flm': {
-                'parsing': {
-                    'force_block_level': flm_run_info['force_block_level']
-                }
-            }
-        }
+    override_config = _get_override_config(flm_run_info)
 
     merge_configs = [
         override_config,
         run_config,
         *merge_default_configs
     ]
-    # make a deep copy of everything so we can modify configs
-    merge_configs = [
-        copy.deepcopy(x)
-        for x in merge_configs
-    ]
-
-    logger.debug('Merging configurations.  At this point, merge_configs = %s',
-                 ",\n    ".join([f"{repr(m)}" for m in merge_configs]))
-
-    # pull out feature-related config, don't merge these yet because we want to
-    # pull in the defaults first.  See load_features()
-    features_merge_configs = []
-    for c in merge_configs:
-        feature_merge_configs = {}
-        flmconfig = c.get('flm', {})
-        if flmconfig and flmconfig.get('features', None):
-            for featurename, featureconfig in flmconfig['features'].items():
-                if featurename.startswith('$'):
-                    raise ValueError(
-                        f"FIXME: presets not yet supported immediately inside "
-                        f"‘features:’ config, got {featurename}"
-                    )
-                feature_merge_configs[featurename] = featureconfig
-                if featureconfig is None or featureconfig is False:
-                    c['flm']['features'][featurename] = False
-                else:
-                    c['flm']['features'][featurename] = True
-
-        features_merge_configs.append(feature_merge_configs)
-
-    # pull out workflow-related config, don't merge these yet because we want to
-    # pull in the defaults first.
-    workflows_merge_configs = []
-    for c in merge_configs:
-        workflow_merge_configs = {}
-        flmconfig = c.get('flm', {})
-        if flmconfig and flmconfig.get('workflow_config', None):
-            for workflowname, workflowconfig in flmconfig['workflow_config'].items():
-                if workflowname.startswith('$'):
-                    raise ValueError(
-                        f"FIXME: $-instruction presets in YAML not yet supported immediately inside "
-                        f"‘workflow_config:’ config, got {workflowname}"
-                    )
-                workflow_merge_configs[workflowname] = workflowconfig
-                if workflowconfig is None or workflowconfig is False:
-                    c['flm']['workflow_config'][workflowname] = False
-                else:
-                    c['flm']['workflow_config'][workflowname] = True
-
-        workflows_merge_configs.append(workflow_merge_configs)
-
-    # merge the base config !
-    config = configmerger.recursive_assign_defaults(merge_configs)
+    config, features_merge_configs, workflows_merge_configs = \
+        _merge_main_config(merge_configs)
 
     flm_run_info['main_config'] = config
 
-    logger.debug("Merged config (w/o workflow/feature configs) = %s",
-                 abbrev_value_str(config, maxstrlen=512) )
-    
-    # validate the overall config structure
-    validate_config_for_schema(
-        'flm',
-        _global_config_schema,
-        config.get('flm', {}),
-    )
-
     #
     # Set up the correct output directory (temporary directory, if applicable)
     #
@@ -878,6 +1144,10 @@ def load_workflow_environment(*,
         config=fragment_renderer_config
     )
 
+    math_prerender_config = config['flm'].get('math_prerender', None)
+    if math_prerender_config:
+        _setup_math_prerender(fragment_renderer, math_prerender_config, flm_run_info)
+
     #
     # Set up the workflow
     #
@@ -918,6 +1188,24 @@ def load_workflow_environment(*,
     # Set up the environment: parsing state and features
     #
 
+    environment, feature_configs = \
+        _make_environment(config, features_merge_configs, flm_run_info)
+
+    return WorkflowEnvironmentInformation(
+        environment=environment,
+        config=config,
+        feature_configs=feature_configs,
+        flm_run_info=flm_run_info,
+        workflow=workflow,
+        fragment_renderer_name=fragment_renderer_name,
+        use_temporary_directory_output=use_temporary_directory_output,
+    )
+
+
+
+
+def _make_environment(config, features_merge_configs, flm_run_info):
+
     parsing_config = config.get('flm', {}).get('parsing', {})
 
     validate_config_for_fn_kwargs(
@@ -936,17 +1224,106 @@ def load_workflow_environment(*,
         features=features,
     )
 
+    return environment, feature_configs
+
+
+def load_parsing_environment(*,
+                             flm_run_info,
+                             run_config,
+                             default_configs=None,
+                             add_builtin_default_configs=True):
+    r"""
+    Set up an environment to parse FLM content independently of any output
+    format or workflow.  The configuration is merged as in
+    :py:func:`load_workflow_environment`, but without the defaults that are
+    specific to an output format or to a workflow.
+
+    Fragments parsed with this environment can be rendered by the
+    environment of any workflow that has the same features and the same
+    parsing configuration (see :py:meth:`Run.run`), since features look up
+    their format-specific configuration from the render context at render
+    time.
+
+    The `flm_run_info` is not modified.  Returns a
+    :py:class:`WorkflowEnvironmentInformation` instance whose `workflow` is
+    `None`.
+    """
+
+    merge_configs = [
+        _get_override_config(flm_run_info),
+        run_config,
+        *(default_configs or []),
+    ]
+    if add_builtin_default_configs:
+        merge_configs.append(_builtin_default_config['_base'])
+
+    config, features_merge_configs, _ = _merge_main_config(merge_configs)
+
+    flm_run_info = dict(flm_run_info, main_config=config)
+
+    environment, feature_configs = \
+        _make_environment(config, features_merge_configs, flm_run_info)
+
     return WorkflowEnvironmentInformation(
         environment=environment,
         config=config,
         feature_configs=feature_configs,
         flm_run_info=flm_run_info,
-        workflow=workflow,
-        fragment_renderer_name=fragment_renderer_name,
-        use_temporary_directory_output=use_temporary_directory_output,
     )
 
 
+# ‘flm.math_prerender’ settings that run a program or write to a file.  They
+# are only accepted from the command line and configuration files, not from
+# the document itself (its front matter and any configuration it imports).
+_document_restricted_math_prerender_keys = ('command', 'cache_file')
+
+def _check_document_config(document_config):
+    if not document_config:
+        return
+    # resolve any $import's of the document's own configuration
+    document_config = configmerger.recursive_assign_defaults([ document_config ])
+    math_prerender_config = \
+        (document_config.get('flm', None) or {}).get('math_prerender', None)
+    if not math_prerender_config:
+        return
+    restricted = [
+        k for k in _document_restricted_math_prerender_keys
+        if math_prerender_config.get(k, None) is not None
+    ]
+    if math_prerender_config.get('engine', None) == 'command':
+        restricted.insert(0, 'engine')
+    if restricted:
+        raise FLMMainRunError(
+            "The document's front matter cannot set ‘flm.math_prerender’ "
+            + ", ".join(f"‘{k}’" for k in restricted)
+            + ".  Please set these in a flmconfig.yaml file or on the command line."
+        )
+
+
+def _setup_math_prerender(fragment_renderer, math_prerender_config, flm_run_info):
+
+    if not hasattr(fragment_renderer, 'prerender_math_fn'):
+        logger.warning(
+            "The %s fragment renderer does not support prerendering math, "
+            "ignoring ‘flm.math_prerender’ config",
+            fragment_renderer.__class__.__name__
+        )
+        return
+
+    math_prerender_config = dict(math_prerender_config)
+    cache_file = math_prerender_config.get('cache_file', None)
+    if cache_file:
+        cwd = flm_run_info.get('cwd', None)
+        if cwd:
+            cache_file = os.path.join(cwd, cache_file)
+        math_prerender_config['cache_file'] = os.path.abspath(cache_file)
+
+    try:
+        fragment_renderer.prerender_math_fn = \
+            mathprerender.get_shared_math_prerenderer(**math_prerender_config)
+    except ValueError as e:
+        raise FLMMainRunError(f"Invalid ‘flm.math_prerender’ config: {e}")
+
 
 
 class Run:
@@ -986,12 +1363,23 @@ class Run:
 
         resource_accessor = flm_run_info['resource_accessor']
 
-        wenv = load_workflow_environment(
-            flm_run_info=flm_run_info,
-            run_config=run_config,
-            default_configs=default_configs,
-            add_builtin_default_configs=add_builtin_default_configs
-        )
+        # record any config files read via `$import`
+        dependencies = flm_run_info.get('dependencies', None)
+        if dependencies is not None:
+            record_imports = recording_imported_files(
+                lambda fname: dependencies.add(fname, 'config')
+            )
+        else:
+            record_imports = contextlib.nullcontext()
+
+        with record_imports:
+            _check_document_config(self.run_config_initial)
+            wenv = load_workflow_environment(
+                flm_run_info=flm_run_info,
+                run_config=run_config,
+                default_configs=default_configs,
+                add_builtin_default_configs=add_builtin_default_configs
+            )
 
         environment = wenv.environment
         config = wenv.config
@@ -1094,28 +1482,115 @@ class Run:
         self.resource_accessor = resource_accessor
         self.wenv = wenv
 
+        # results of the pipeline stages of the last call to run()
+        self._stage_results = None
+
 
     def cleanup(self):
         self.wenv.cleanup()
 
 
-    def run(self):
+    def run(self, *, rerun_from_stage=None, parsed_fragments=None):
+        r"""
+        Parse and render the document.  Returns a tuple `(result,
+        result_info)`.
+
+        If `parsed_fragments` is specified, it should be the return value of
+        :py:meth:`parse_fragments` called on a run object with the same
+        input, possibly with another environment (e.g., one set up by
+        :py:func:`load_parsing_environment`).  These fragments are then
+        rendered instead of parsing the input again.  This way, the same input
+        can be rendered to several output formats that share the same parsing
+        setup while parsing it only once (see
+        :py:class:`flm.main.main.MultiFormatMain`).
+
+        If `rerun_from_stage` is ``'render'`` or ``'postprocess'``, the
+        document is processed again by this same run object, reusing the
+        results of the earlier pipeline stages (see :py:data:`run_stages`)
+        from the previous call to `run()`.  E.g., after a graphics file
+        changed, use ``rerun_from_stage='render'`` to render the already
+        parsed fragments again.  (Changes to the input or to the configuration
+        require a new :py:class:`Run` instance.)
+        """
+
+        if rerun_from_stage is not None:
+            if rerun_from_stage not in run_stages[1:]:
+                raise ValueError(f"Invalid stage to rerun from: {rerun_from_stage!r}")
+            if self._stage_results is None:
+                raise ValueError("Cannot rerun the processing from stage "
+                                 f"‘{rerun_from_stage}’, run() was not called yet")
+
+        if rerun_from_stage is None:
+            self._stage_results = None
+            if parsed_fragments is None:
+                parsed_fragments = self.parse_fragments()
+            fragment, parts_fragments = parsed_fragments
+            document_parts_fragments = []
+            for cpinfo, in_fragment in zip(self.content_parts_infos['parts'],
+                                           parts_fragments):
+                cpinfo['fragment'] = in_fragment
+                if in_fragment is not None:
+                    document_parts_fragments.append(in_fragment)
+            self._stage_results = {
+                'load': (fragment, document_parts_fragments),
+                'render': None,
+            }
+        else:
+            fragment, document_parts_fragments = self._stage_results['load']
+
+        if rerun_from_stage == 'postprocess' and self._stage_results['render'] is None:
+            # the workflow doesn't separate rendering from post-processing
+            rerun_from_stage = 'render'
+
+        if rerun_from_stage == 'postprocess':
+            doc, rendered_content, render_context = self._stage_results['render']
+            result = self.wenv.workflow.postprocess_rendered_document(
+                rendered_content, doc, render_context
+            )
+        else:
+            self._stage_results['render'] = None
+            result = self._render_document(fragment, document_parts_fragments)
+
+        #
+        # Prepare some information about the rendering & its result
+        #
+        wenv = self.wenv
+        result_info = {
+            'environment': wenv.environment,
+            'fragment_renderer_name': wenv.fragment_renderer_name,
+            #'fragment_renderer': fragment_renderer, # use workflow.fragment_renderer
+            'workflow': wenv.workflow,
+            'binary_output': wenv.workflow.binary_output,
+            'content_parts_infos': self.content_parts_infos,
+            'document_parts_fragments': document_parts_fragments,
+        }
+
+        #
+        # Done!
+        #
+        return result, result_info
+
+    def parse_fragments(self, environment=None):
+        r"""
+        Parse the main FLM content and the content parts.  Returns a tuple
+        `(fragment, parts_fragments)` where `fragment` is the main fragment
+        and where `parts_fragments` is a list with the fragment of each entry
+        in the config's ``content_parts`` (or `None` for parts without
+        content).
+
+        The content is parsed with this run's environment, unless another
+        `environment` is specified.
+        """
 
         flm_content = self.flm_content
         flm_run_info = self.flm_run_info
-        run_config = self.run_config
-        default_configs = self.default_configs
-        add_builtin_default_configs = self.add_builtin_default_configs
 
         content_parts_infos = self.content_parts_infos
         doc_metadata = self.doc_metadata
         resource_accessor = self.resource_accessor
-        wenv = self.wenv
 
-        environment = wenv.environment
-        config = wenv.config
-        workflow = wenv.workflow
-        fragment_renderer_name = wenv.fragment_renderer_name
+        if environment is None:
+            environment = self.wenv.environment
 
         #
         # Set up the fragment (MAIN fragment in case of content-chapters)
@@ -1140,7 +1615,9 @@ class Run:
             resource_info=ResourceInfo(
                 # resource_info.source_path is always relative to the document
                 # root folder.
-                source_path=doc_metadata.get('filepath', {}).get('basename', None)
+                source_path=doc_metadata.get('filepath', {}).get('basename', None),
+                resource_accessor=resource_accessor,
+                flm_run_info=flm_run_info,
             ),
         )
 
@@ -1148,7 +1625,7 @@ class Run:
         # Compile document fragments
         #
 
-        document_parts_fragments = []
+        parts_fragments = []
         for cpinfo in content_parts_infos['parts']:
 
             if cpinfo['flm_content'] is not None:
@@ -1158,17 +1635,23 @@ class Run:
                     input_lineno_colno_offsets=cpinfo['input_lineno_colno_offsets'],
                     what=f"Document Part ‘{cpinfo['input_source']}’",
                     resource_info=ResourceInfo(
-                        source_path=cpinfo['input_source']
+                        source_path=cpinfo['input_source'],
+                        resource_accessor=resource_accessor,
+                        flm_run_info=flm_run_info,
                     ),
                 )
             else:
                 in_fragment = None
 
-            cpinfo['fragment'] = in_fragment
+            parts_fragments.append(in_fragment)
 
-            if in_fragment is not None:
-                document_parts_fragments.append(in_fragment)
+        return fragment, parts_fragments
 
+    def _render_document(self, fragment, document_parts_fragments):
+
+        content_parts_infos = self.content_parts_infos
+        environment = self.wenv.environment
+        workflow = self.wenv.workflow
 
         #
         # Build the document, with the rendering function from the workflow.
@@ -1179,7 +1662,7 @@ class Run:
                     fragment, render_context,
                     content_parts_infos=content_parts_infos,
                 ),
-            metadata=doc_metadata,
+            metadata=self.doc_metadata,
         )
 
         doc.document_fragments = [ fragment ]
@@ -1203,26 +1686,17 @@ class Run:
         # Render the document according to the workflow
         #
 
-        result = workflow.render_document(doc, content_parts_infos=content_parts_infos)
-
+        if type(workflow).render_document is not RenderWorkflow.render_document:
+            # custom workflow rendering procedure, can't keep the rendered
+            # content for a later rerun of the post-processing stage only
+            return workflow.render_document(doc, content_parts_infos=content_parts_infos)
 
-        #
-        # Prepare some information about the rendering & its result
-        #
-        result_info = {
-            'environment': environment,
-            'fragment_renderer_name': fragment_renderer_name,
-            #'fragment_renderer': fragment_renderer, # use workflow.fragment_renderer
-            'workflow': workflow,
-            'binary_output': workflow.binary_output,
-            'content_parts_infos': content_parts_infos,
-            'document_parts_fragments': document_parts_fragments,
-        }
+        rendered_content, render_context = workflow.render_document_fragments(doc)
+        self._stage_results['render'] = (doc, rendered_content, render_context)
 
-        #
-        # Done!
-        #
-        return result, result_info
+        return workflow.postprocess_rendered_document(
+            rendered_content, doc, render_context
+        )
 
     def get_config_json_schema(self):
 
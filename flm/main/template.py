@@ -1,5 +1,6 @@
 import re
 import string
+import copy
 
 import logging
 logger = logging.getLogger(__name__)
@@ -79,6 +80,63 @@ _default_ifmarks = {
 }
 
 
+# Process-level cache of data loaded from template files (parsed template info
+# files, compiled template contents), so that batch builds and watch mode don't
+# read and parse the same template files again for every document.  Maps
+# (accessor type, ftype, resolved file name, load function) -> (stamp, data).
+_template_file_cache = {}
+
+
+def clear_template_cache():
+    r"""
+    Forget all template data cached by :py:func:`load_template_file_cached`.
+    """
+    _template_file_cache.clear()
+
+
+def load_template_file_cached(resource_accessor, fpath, fname, ftype,
+                              flm_run_info, load_fn):
+    r"""
+    Read the given file with the `resource_accessor` and return
+    `load_fn(content)`.  The result is cached across runs within the same
+    process, keyed by the file's resolved name, and reused as long as the
+    file's stamp (e.g., modification time) is unchanged.  See
+    :py:meth:`flm.main.run.ResourceAccessorBase.get_file_cache_stamp`.
+
+    The returned object is shared between callers and should not be modified.
+    The `load_fn` should be a module-level function, as it is part of the cache
+    key.
+    """
+    cache_info = None
+    get_file_cache_stamp = getattr(resource_accessor, 'get_file_cache_stamp', None)
+    if get_file_cache_stamp is not None:
+        cache_info = get_file_cache_stamp(fpath, fname, ftype, flm_run_info)
+
+    if cache_info is None or cache_info[1] is None:
+        # can't cache this one (or the file doesn't exist, in which case
+        # read_file() reports the error)
+        return load_fn(resource_accessor.read_file(
+            fpath, fname, ftype, flm_run_info=flm_run_info
+        ))
+
+    resolved_name, stamp = cache_info
+    key = (type(resource_accessor), ftype, resolved_name, load_fn)
+    entry = _template_file_cache.get(key, None)
+    if entry is not None and entry[0] == stamp:
+        # the run still depends on this file, even if we don't read it again
+        record_dependency = getattr(resource_accessor, 'record_dependency', None)
+        if record_dependency is not None:
+            record_dependency(fpath, fname, ftype, flm_run_info)
+        return entry[1]
+
+    logger.debug("Loading template file %s (%s)", resolved_name, ftype)
+    data = load_fn(resource_accessor.read_file(
+        fpath, fname, ftype, flm_run_info=flm_run_info
+    ))
+    _template_file_cache[key] = (stamp, data)
+    return data
+
+
 class TemplateEngineBase:
     r"""
     Abstract base class for template engines used to render final output
@@ -121,7 +179,141 @@ class OnlyContentTemplate(TemplateEngineBase):
         return config['content']
 
 
+# ------------------------------------------------------------------------------
+
+# A compiled template is a list of nodes, each of which is one of:
+#
+# - a literal string;
+# - ``(_TPL_VAR, key)`` -- substitute the value of the variable ``key``;
+# - ``(_TPL_IF, key, if_nodes, else_nodes)`` -- render ``if_nodes`` if the
+#   config value ``key`` is truthy and ``else_nodes`` otherwise.
+
+_TPL_VAR = 'var'
+_TPL_IF = 'if'
+
+
+def compile_template(template_content):
+    r"""
+    Parse `template_content`, a template using the syntax of
+    :py:class:`SimpleStringTemplate`, into a list of nodes that can be
+    rendered any number of times with :py:func:`render_compiled_template`.
+
+    The ``${if:key}``, ``${else}`` and ``${endif}`` constructs are resolved
+    here, so rendering never has to look for them in the rendered output.
+
+    Raises `ValueError` if the template contains an invalid placeholder or an
+    ill-formed if/else/endif construct.
+    """
+
+    root_nodes = []
+    nodes = root_nodes
+    # stack of (if node, nodes list we were filling before the if)
+    if_stack = []
+
+    def _near(pos):
+        return template_content[pos:pos+256]
+
+    pos = 0
+    for m in _StrTemplate.pattern.finditer(template_content):
+        if m.start() > pos:
+            nodes.append(template_content[pos:m.start()])
+        pos = m.end()
+
+        if m.group('escaped') is not None:
+            nodes.append(_StrTemplate.delimiter)
+            continue
+
+        if m.group('invalid') is not None:
+            i = m.start('invalid')
+            lines = template_content[:i].splitlines(keepends=True)
+            if not lines:
+                colno = 1
+                lineno = 1
+            else:
+                colno = i - len(''.join(lines[:-1]))
+                lineno = len(lines)
+            raise ValueError(
+                f"Invalid placeholder in template: line {lineno}, col {colno}"
+            )
+
+        key = m.group('named')
+        if key is None:
+            key = m.group('braced')
+
+        if key.startswith('if:'):
+            if_node = (_TPL_IF, key[3:], [], [])
+            nodes.append(if_node)
+            if_stack.append( (if_node, nodes) )
+            nodes = if_node[2]
+        elif key == 'else':
+            if not if_stack or nodes is not if_stack[-1][0][2]:
+                raise ValueError(
+                    f"Invalid if[/else]/endif construct, unexpected else near "
+                    f"“{_near(m.start())}”"
+                )
+            nodes = if_stack[-1][0][3]
+        elif key == 'endif':
+            if not if_stack:
+                raise ValueError(
+                    f"Invalid if[/else]/endif construct, unexpected endif near "
+                    f"“{_near(m.start())}”"
+                )
+            _, nodes = if_stack.pop()
+        else:
+            nodes.append( (_TPL_VAR, key) )
+
+    if pos < len(template_content):
+        nodes.append(template_content[pos:])
+
+    if if_stack:
+        raise ValueError(
+            f"Invalid if[/else]/endif construct, missing endif for "
+            f"if:{if_stack[-1][0][1]}"
+        )
+
+    return root_nodes
+
+
+def render_compiled_template(compiled_template, vars_proxy):
+    r"""
+    Render a template compiled with :py:func:`compile_template`.  Variables are
+    looked up with ``vars_proxy[key]`` and conditions are evaluated with
+    ``vars_proxy.get_config_value(key)`` (see `_ProxyDictVarConfig`).  Only
+    the variables in the branches that are selected are evaluated.
+    """
+    parts = []
+    _render_compiled_nodes(compiled_template, vars_proxy, parts)
+    return ''.join(parts)
+
+def _render_compiled_nodes(nodes, vars_proxy, parts):
+    for node in nodes:
+        if isinstance(node, str):
+            parts.append(node)
+        elif node[0] == _TPL_VAR:
+            parts.append(str(vars_proxy[node[1]]))
+        else:
+            _, key, if_nodes, else_nodes = node
+            if vars_proxy.get_config_value(key):
+                _render_compiled_nodes(if_nodes, vars_proxy, parts)
+            else:
+                _render_compiled_nodes(else_nodes, vars_proxy, parts)
+
+
+def _load_compiled_template(template_content):
+    return template_content, compile_template(template_content)
+
+
 class SimpleStringTemplate(TemplateEngineBase):
+    r"""
+    Template engine for templates using Python's `string.Template` syntax, with
+    ``${if:key}...${else}...${endif}`` conditionals.  Keys can refer to nested
+    config values with dots (``${page.title}``), and ``${flmrender:key}`` /
+    ``${flmrendertext:key}`` render the FLM text in the given config value.
+
+    The template is compiled once in :py:meth:`initialize`, and the compiled
+    template is cached for further runs (see
+    :py:func:`load_template_file_cached`).
+    """
 
     def initialize(self, template_content_extension='.html', template_content_filename=None,):
 
@@ -134,25 +326,22 @@ class SimpleStringTemplate(TemplateEngineBase):
                 + template_content_extension
             )
 
-        self.template_content = self.flm_run_info['resource_accessor'].read_file(
+        self.template_content, self.compiled_template = load_template_file_cached(
+            self.flm_run_info['resource_accessor'],
             self.template_info_path, template_content_file, 'template_content',
-            flm_run_info=self.flm_run_info
+            self.flm_run_info,
+            _load_compiled_template
         )
 
         self.ifmarks = dict(_default_ifmarks)
 
     def render_template(self, config, **kwargs):
-        
-        tpl = _StrTemplate(self.template_content)
 
-        content = tpl.substitute(
+        return render_compiled_template(
+            self.compiled_template,
             _ProxyDictVarConfig(config, self.ifmarks, document_template=self.document_template)
         )
-        
-        content = replace_ifmarks(content, self.ifmarks)
 
-        return content
-        
 
 
 def replace_ifmarks(content, ifmarks):
@@ -241,11 +430,13 @@ class DocumentTemplate:
                 self.template_name,
                 self.flm_run_info
             )
-        template_info_yaml = resource_accessor.read_file(
+        # copy the cached info, which is shared with other document templates
+        self.template_info = copy.deepcopy(load_template_file_cached(
+            resource_accessor,
             self.template_info_path, self.template_info_file, 'template_info',
-            flm_run_info=self.flm_run_info
-        )
-        self.template_info = yaml.safe_load(template_info_yaml)
+            self.flm_run_info,
+            yaml.safe_load
+        ))
 
         self.template_engine = self.template_info.get('template_engine',
                                                  'flm.main.template.SimpleStringTemplate')
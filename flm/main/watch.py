@@ -2,18 +2,17 @@ import logging
 logger = logging.getLogger(__name__)
 
 import json
+import time
 import tempfile
 import os
 import os.path
-import mimetypes
+import urllib.parse
 
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import threading
 import socket
 # import errno
 
-import watchfiles
-
 logging.getLogger("watchfiles").setLevel(logging.WARNING)
 logging.getLogger("websockets").setLevel(logging.WARNING)
 
@@ -25,6 +24,8 @@ from .run import ResourceAccessorBase
 from ._util import ReprValueFallbackJsonEncoder
 from .watch_util import find_available_port
 from .watch_hotreload import make_hotreloader
+from .watch_artifacts import ArtifactStore
+from .watch_rebuild import AdaptiveDebounce, DependencyWatcher, get_earliest_stage
 
 
 
@@ -54,6 +55,10 @@ def main_watch(**kwargs):
                 "with watch mode (no -o option)"
             )
 
+        arg_format = kwargs.get('format', None)
+        if arg_format is not None and ',' in arg_format:
+            raise ValueError("Watch mode supports only a single output format")
+
         #
         # inspect the run meta-information without running yet.
         #
@@ -150,36 +155,107 @@ def main_watch(**kwargs):
 
         server = None
 
-        def do_compile(hotreloader=None):
+        # The compiled document is kept in memory and served from there.
+        # Other output files (e.g. collected graphics) are still written to
+        # temp_dir by the run, and are served from there.
+        artifacts = ArtifactStore(fallback_dir=temp_dir)
+        output_artifact_path = os.path.basename(new_arg_output)
+
+        def _get_output_content(info):
+            content = info['result']
+            if not info['binary_output'] and not run_kwargs.get('suppress_final_newline'):
+                content += "\n"
+            return content
+
+        # The Run object of the last successful build, which can be reused to
+        # redo only some of the pipeline stages after some files changed.
+        last_build = {
+            'run_object': None,
+            'dependencies': None,
+        }
+        # The dependencies recorded by the last build, if it failed
+        failed_build_dependencies = None
+        # If the last build failed, the stage from which it has to be redone
+        failed_build_stage = None
+
+        debounce = AdaptiveDebounce()
+
+        def do_compile(hotreloader=None, stage='load'):
+            nonlocal failed_build_dependencies, failed_build_stage
+
+            stage = get_earliest_stage(stage, failed_build_stage)
+            if last_build['run_object'] is None:
+                stage = 'load'
 
             #
             # Compile - main run NOW!
             #
+            t0 = time.monotonic()
             try:
-                info = main.main(**run_kwargs)
+                if stage == 'load':
+                    compile_runner = main.Main(**run_kwargs)
+                    dependencies = compile_runner.dependencies
+                    failed_build_dependencies = dependencies
+                    run_object = compile_runner.make_run_object()
+                    try:
+                        result, result_info = run_object.run()
+                    except Exception:
+                        run_object.cleanup()
+                        raise
+                    if last_build['run_object'] is not None:
+                        last_build['run_object'].cleanup()
+                    last_build['run_object'] = run_object
+                    last_build['dependencies'] = dependencies
+                else:
+                    logger.debug("Reusing the parsed document, redoing the ‘%s’ stage "
+                                 "onwards", stage)
+                    run_object = last_build['run_object']
+                    dependencies = last_build['dependencies']
+                    dependencies.forget_stages_from(stage)
+                    result, result_info = run_object.run(rerun_from_stage=stage)
+                info = {
+                    'flm_run_info': run_object.flm_run_info,
+                    'result': result,
+                    'result_info': result_info,
+                    'binary_output': result_info['binary_output'],
+                }
             except LatexWalkerLocatedError as e:
+                failed_build_stage = stage
                 error_info = {'message': str(e), 'exc': e}
                 if hotreloader is not None and hotreloader.is_enabled():
                     hotreloader.new_run_send_error(error_info)
                 raise
             except Exception as e:
+                failed_build_stage = stage
                 error_info = {'message': str(e), 'exc': e}
                 if hotreloader is not None and hotreloader.is_enabled():
                     hotreloader.new_run_send_error(error_info)
                 raise
 
-            if hotreloader is not None and hotreloader.is_enabled():
-                # Inform our hotreloader of a new run.
-                with open(new_arg_output, 'r', encoding='utf-8') as f:
-                    content = f.read()
+            failed_build_dependencies = None
+            failed_build_stage = None
+            debounce.add_build_duration(time.monotonic() - t0)
+
+            content = _get_output_content(info)
 
+            if hotreloader is not None and hotreloader.is_enabled():
                 # Send update to our clients
                 hotreloader.new_run_send_update(info=info, content=content)
+                content = hotreloader.inject_hotreload_js_in_content(content)
+
+            artifacts.put(output_artifact_path, content)
 
             logger.info("🚀 Document recompiled successfully 🚀")
 
             return info
 
+        def get_watched_dependencies():
+            return [
+                deps
+                for deps in (last_build['dependencies'], failed_build_dependencies)
+                if deps is not None
+            ]
+
         logger.info("Compiling document")
         
         # first run does not have any hotreloader set, no existing client to update yet.
@@ -211,52 +287,19 @@ def main_watch(**kwargs):
         #
         class FlmRunServer(BaseHTTPRequestHandler):
             def do_GET(self):
-                path = self.path
+                path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
                 if path.endswith('/'):
                     path += 'index.html'
 
-                path = path.lstrip('/')
-                fullpath = os.path.realpath(os.path.join(temp_dir, path))
+                found = artifacts.send_response(self, path)
 
-                if not fullpath.startswith(temp_dir):
-                    logger.warning(
-                        'Requested path %r is invalid as fullpath=%r does not start '
-                        'with temp_dir=%r',
-                        path, fullpath, temp_dir
-                    )
-                    self.send_response(404)
-                    self.wfile.write(bytes("<html><body>404</body></html>", 'utf-8'))
-                    return
+                # Don't produce warning for some files that browsers tend to
+                # try to fetch on their own
+                if not found and path.lstrip('/') not in ('favicon.ico', ):
+                    logger.warning('Could not retrieve requested path %r', path)
 
-                try:
-
-                    with open(fullpath, 'rb') as f:
-                        self.send_response(200)
-                        (mime_type, mime_encoding) = mimetypes.guess_type('file://'+fullpath)
-                        if mime_type is not None:
-                            self.send_header("Content-Type", mime_type)
-                        self.end_headers()
-                        self.wfile.write(f.read())
-
-                except IOError as e:
-
-                    # Don't produce warning for some files that browsers tend to
-                    # try to fetch on their own
-                    if path not in ('favicon.ico', ):
-                        logger.warning(
-                            'Could not retrieve requested path %r: %s',
-                            path, e
-                        )
-
-                    self.send_response(404)
-                    self.wfile.write(bytes(
-                        f"<html><body>404 not found: {path}</body></html>",
-                        'utf-8'
-                    ))
-                    return
-
-                self.end_headers()
-                return
+            def do_HEAD(self):
+                self.do_GET()
 
         server_hostname = 'localhost'
         server_port = find_available_port(server_hostname, 18910)
@@ -278,7 +321,8 @@ def main_watch(**kwargs):
 
 
         # do it!
-        hotreloader.inject_hotreload_js()
+        artifacts.put(output_artifact_path,
+                      hotreloader.inject_hotreload_js_in_content(_get_output_content(info)))
 
 
         logger.info(f"""
@@ -297,17 +341,23 @@ def main_watch(**kwargs):
 
         try:
 
-            for changes in watchfiles.watch(*watch_files, raise_interrupt=False, debounce=2000):
+            watcher = DependencyWatcher(get_watched_dependencies(), debounce=debounce)
+
+            for changed_files in watcher:
+
+                stage = watcher.get_changed_stage(changed_files)
 
                 logger.info('Input file(s) changed: %s', ",".join([
-                    os.path.relpath(c[1], computed_main_input_dir)
-                    for c in changes
+                    os.path.relpath(fullpath, computed_main_input_dir)
+                    for fullpath in sorted(changed_files)
                 ]))
 
+                if stage is None:
+                    continue
+
                 try:
                     hotreloader.set_compiling_state('compiling')
-                    do_compile(hotreloader=hotreloader)
-                    hotreloader.inject_hotreload_js()
+                    do_compile(hotreloader=hotreloader, stage=stage)
 
                 except LatexWalkerLocatedError as e:
                     logger.error("Error!\n\n%s\n", e)
@@ -317,12 +367,15 @@ def main_watch(**kwargs):
 
                 finally:
                     hotreloader.set_compiling_state('idle')
+                    watcher.set_dependencies(get_watched_dependencies())
 
             logger.info('Okay, quitting now.')
 
         finally:
             logger.info('Shutting down server.')
             server.shutdown()
+            if last_build['run_object'] is not None:
+                last_build['run_object'].cleanup()
 
 
 
@@ -0,0 +1,220 @@
+r"""
+In-memory store of the files served by the web server in watch mode
+(``flm --watch``).
+
+The rendered document is put directly in the store after each run, without
+going through a file on disk.  Other files (e.g., graphics collected in the
+output folder) are read from the output folder on first request and kept in
+memory until they change on disk.
+
+Each file is served with an ``ETag`` header, so that browsers can revalidate
+their cached copy with a conditional request (answered with ``304 Not
+Modified`` if the file didn't change).  Text files are sent gzip-compressed to
+clients that accept it.
+
+This module is not available in the JavaScript version of FLM.
+"""
+
+import os
+import os.path
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+_compressible_mime_types = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def _guess_mime_type(path):
+    # text files are always written and served as UTF-8
+    mime_type, _ = mimetypes.guess_type('file:///' + path.lstrip('/'))
+    if mime_type is not None and mime_type.startswith('text/'):
+        mime_type += '; charset=utf-8'
+    return mime_type
+
+
+class Artifact:
+    r"""
+    A file held in an :py:class:`ArtifactStore`, with its contents `data`
+    (bytes), its `mime_type` and its `etag` (a quoted string computed from the
+    contents).
+    """
+
+    # Files smaller than this are not worth compressing
+    min_gzip_size = 1024
+
+    def __init__(self, data, mime_type=None, *, file_stamp=None):
+        super().__init__()
+        self.data = data
+        self.mime_type = mime_type or 'application/octet-stream'
+        self.etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+        self.file_stamp = file_stamp
+        self._gzip_data = None
+
+    def is_compressible(self):
+        return len(self.data) >= self.min_gzip_size and (
+            self.mime_type.startswith('text/')
+            or self.mime_type in _compressible_mime_types
+        )
+
+    def get_gzip_data(self):
+        r"""
+        Return the gzip-compressed contents.  They are computed on first use
+        and then kept with the artifact.
+        """
+        if self._gzip_data is None:
+            self._gzip_data = gzip.compress(self.data, compresslevel=6, mtime=0)
+        return self._gzip_data
+
+
+class ArtifactStore:
+    r"""
+    Store of files to be served by the watch mode web server, indexed by
+    their path relative to the server root (e.g. ``index.html``).
+
+    :param fallback_dir: A folder in which to look for files that have not
+        been :py:meth:`put` in the store.  Files read from this folder are
+        cached in memory and read again only if their modification time or
+        size changes.
+
+    The store can be used concurrently by the thread that compiles the
+    document and by the web server's request handler threads.
+    """
+
+    def __init__(self, fallback_dir=None):
+        super().__init__()
+        self.fallback_dir = None
+        if fallback_dir is not None:
+            self.fallback_dir = os.path.realpath(fallback_dir)
+        self._lock = threading.Lock()
+        self._artifacts = {}
+        self._file_artifacts = {}
+
+    @staticmethod
+    def _normalize_path(path):
+        return path.lstrip('/')
+
+    def put(self, path, data, mime_type=None):
+        r"""
+        Store the contents `data` (bytes, or str which is encoded as UTF-8) at
+        the given `path`, replacing any previous contents.  If `mime_type` is
+        `None`, it is guessed from the file name.  Returns the new
+        :py:class:`Artifact`.
+        """
+        path = self._normalize_path(path)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if mime_type is None:
+            mime_type = _guess_mime_type(path)
+        artifact = Artifact(data, mime_type)
+        with self._lock:
+            self._artifacts[path] = artifact
+        return artifact
+
+    def get(self, path):
+        r"""
+        Return the :py:class:`Artifact` stored at `path`, or `None` if there
+        is no such file.
+        """
+        path = self._normalize_path(path)
+        with self._lock:
+            artifact = self._artifacts.get(path, None)
+        if artifact is not None:
+            return artifact
+        return self._get_file_artifact(path)
+
+    def _get_file_artifact(self, path):
+        if self.fallback_dir is None or not path:
+            return None
+        fullpath = os.path.realpath(os.path.join(self.fallback_dir, path))
+        if not fullpath.startswith(self.fallback_dir + os.sep):
+            logger.warning(
+                'Requested path %r is invalid as fullpath=%r is not inside %r',
+                path, fullpath, self.fallback_dir
+            )
+            return None
+        try:
+            st = os.stat(fullpath)
+        except OSError:
+            # the file disappeared (or never existed), forget about it
+            with self._lock:
+                self._file_artifacts.pop(fullpath, None)
+            return None
+        file_stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            artifact = self._file_artifacts.get(fullpath, None)
+        if artifact is not None and artifact.file_stamp == file_stamp:
+            return artifact
+        try:
+            with open(fullpath, 'rb') as f:
+                data = f.read()
+        except IOError as e:
+            logger.warning('Could not read %r: %s', fullpath, e)
+            return None
+        artifact = Artifact(data, _guess_mime_type(fullpath), file_stamp=file_stamp)
+        with self._lock:
+            self._file_artifacts[fullpath] = artifact
+        return artifact
+
+    def send_response(self, request_handler, path):
+        r"""
+        Answer the GET (or HEAD) request being handled by `request_handler`
+        (a :py:class:`http.server.BaseHTTPRequestHandler` instance) with the
+        file stored at `path`.  Returns `False` if the file was not found (a
+        404 response is then sent), and `True` otherwise.
+        """
+        artifact = self.get(path)
+        send_body = (request_handler.command != 'HEAD')
+
+        if artifact is None:
+            body = f"<html><body>404 not found: {path}</body></html>".encode('utf-8')
+            request_handler.send_response(404)
+            request_handler.send_header('Content-Type', 'text/html; charset=utf-8')
+            request_handler.send_header('Content-Length', str(len(body)))
+            request_handler.end_headers()
+            if send_body:
+                request_handler.wfile.write(body)
+            return False
+
+        if_none_match = request_handler.headers.get('If-None-Match', None)
+        if if_none_match is not None:
+            etags = [ t.strip() for t in if_none_match.split(',') ]
+            if artifact.etag in etags or '*' in etags:
+                request_handler.send_response(304)
+                request_handler.send_header('ETag', artifact.etag)
+                request_handler.send_header('Cache-Control', 'no-cache')
+                request_handler.end_headers()
+                return True
+
+        body = artifact.data
+        use_gzip = False
+        if artifact.is_compressible():
+            accept_encoding = request_handler.headers.get('Accept-Encoding', '')
+            if 'gzip' in [ e.split(';')[0].strip() for e in accept_encoding.split(',') ]:
+                use_gzip = True
+                body = artifact.get_gzip_data()
+
+        request_handler.send_response(200)
+        request_handler.send_header('Content-Type', artifact.mime_type)
+        request_handler.send_header('Content-Length', str(len(body)))
+        request_handler.send_header('ETag', artifact.etag)
+        # always revalidate, the file may change with the next compilation
+        request_handler.send_header('Cache-Control', 'no-cache')
+        if artifact.is_compressible():
+            request_handler.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            request_handler.send_header('Content-Encoding', 'gzip')
+        request_handler.end_headers()
+        if send_body:
+            request_handler.wfile.write(body)
+        return True
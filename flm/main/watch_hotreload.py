@@ -5,8 +5,9 @@ import re
 import os.path
 import json
 import threading
+import difflib
 
-from html import escape as html_escape
+from html import escape as html_escape, unescape as html_unescape
 
 import asyncio
 import websockets.asyncio.server as websockets_server
@@ -17,16 +18,25 @@ from .watch_util import find_available_port
 
 
 
-def hotreload_js_code_to_inject(wsHost, wsPort):
-    js_src = os.path.realpath(os.path.join(os.path.dirname(__file__), 'dist', 'watch_hotreload_inject.js'));
-    with open(js_src, 'r', encoding='utf-8') as f:
-        js_code = f.read()
+_hotreload_js_code = None
 
-    js_code = re.sub(r'^\/\/\# sourceMappingURL\=.*$', '', js_code, flags=re.MULTILINE)
+def _load_hotreload_js_code():
+    global _hotreload_js_code
+    if _hotreload_js_code is None:
+        js_src = os.path.realpath(os.path.join(os.path.dirname(__file__), 'dist', 'watch_hotreload_inject.js'));
+        with open(js_src, 'r', encoding='utf-8') as f:
+            js_code = f.read()
 
-    return f"""(function(window, wsHost, wsPort){{
+        _hotreload_js_code = re.sub(r'^\/\/\# sourceMappingURL\=.*$', '', js_code, flags=re.MULTILINE)
+    return _hotreload_js_code
+
+
+def hotreload_js_code_to_inject(wsHost, wsPort, contentVersion=None):
+    js_code = _load_hotreload_js_code()
+
+    return f"""(function(window, wsHost, wsPort, contentVersion){{
 {js_code}
-}})(window,{json.dumps(wsHost)},{json.dumps(wsPort)});
+}})(window,{json.dumps(wsHost)},{json.dumps(wsPort)},{json.dumps(contentVersion)});
 """
 
 
@@ -35,6 +45,146 @@ template_hr_end_tag = '<!-- FLM_HOT_RELOAD_END_CONTENT -->'
 
 
 
+_rx_html_tag = re.compile(
+    r"""<(?:!--.*?-->|(?P<endtag>/)?(?P<name>[A-Za-z][^\s/>]*)"""
+    r"""(?P<attrs>(?:"[^"]*"|'[^']*'|[^'">])*)>)""",
+    flags=re.DOTALL
+)
+
+_html_void_elements = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'source', 'track', 'wbr',
+}
+_rx_html_raw_text_end = {
+    name: re.compile(r'</' + name + r'\s*>', flags=re.IGNORECASE)
+    for name in ('script', 'style')
+}
+
+def split_html_blocks(html):
+    r"""
+    Split the given HTML code into its top-level elements.  Returns a list of
+    strings containing the HTML code of each top-level element, without the
+    whitespace between them.
+
+    Returns `None` if the HTML code cannot be split this way, i.e., if it
+    contains text or comments outside of any element, or if its tags are not
+    balanced.
+    """
+    blocks = []
+    stack = []
+    block_start = None
+    pos = 0
+    while True:
+        m = _rx_html_tag.search(html, pos)
+        if m is None:
+            if stack or html[pos:].strip():
+                return None
+            return blocks
+        if not stack and html[pos:m.start()].strip():
+            return None
+        pos = m.end()
+        name = m.group('name')
+        if name is None:
+            # comment
+            if not stack:
+                return None
+            continue
+        name = name.lower()
+        if m.group('endtag'):
+            if not stack or stack[-1] != name:
+                return None
+            stack.pop()
+            if not stack:
+                blocks.append(html[block_start:pos])
+            continue
+        if not stack:
+            block_start = m.start()
+        if name in _html_void_elements or m.group('attrs').endswith('/'):
+            if not stack:
+                blocks.append(html[block_start:pos])
+            continue
+        stack.append(name)
+        if name in _rx_html_raw_text_end:
+            # skip to the closing tag, the contents are not HTML code
+            m_end = _rx_html_raw_text_end[name].search(html, pos)
+            if m_end is None:
+                return None
+            pos = m_end.start()
+
+
+_rx_data_sourcepath = re.compile(r'\sdata-sourcepath="([^"]*)"')
+
+def _block_key_sourcepaths(block_html):
+    # The data-sourcepath attributes (see flm.main.watch) change in all blocks
+    # that follow an edit which adds or removes lines; they are compared
+    # separately so that these blocks don't have to be sent again in full.
+    return (
+        _rx_data_sourcepath.sub('', block_html),
+        [ html_unescape(v) for v in _rx_data_sourcepath.findall(block_html) ],
+    )
+
+
+def compute_html_blocks_patches(old_blocks, new_blocks):
+    r"""
+    Compute the patches that transform the list of top-level HTML blocks
+    `old_blocks` into `new_blocks` (as returned by
+    :py:func:`split_html_blocks`).
+
+    Returns a list of patches, ordered by increasing index in `old_blocks`.
+    Each patch is a dictionary, either of the form ``{'index': i, 'remove': n,
+    'html': '...'}`` to replace the `n` blocks starting at index `i` by the
+    given HTML code, or of the form ``{'index': i, 'sourcepaths': [...]}`` if
+    the block at index `i` only differs by the values of its
+    ``data-sourcepath`` attributes.
+    """
+    old_keys = [ _block_key_sourcepaths(b) for b in old_blocks ]
+    new_keys = [ _block_key_sourcepaths(b) for b in new_blocks ]
+
+    # Usually only a small part of the document changed -- skip the common
+    # leading and trailing blocks before running the sequence matcher.
+    n_old, n_new = len(old_keys), len(new_keys)
+    i0 = 0
+    while i0 < n_old and i0 < n_new and old_keys[i0][0] == new_keys[i0][0]:
+        i0 += 1
+    n_common_end = 0
+    while (n_common_end < n_old - i0 and n_common_end < n_new - i0
+           and old_keys[n_old-1-n_common_end][0] == new_keys[n_new-1-n_common_end][0]):
+        n_common_end += 1
+
+    opcodes = [ ('equal', 0, i0, 0, i0) ]
+    matcher = difflib.SequenceMatcher(
+        None,
+        [ k for (k, _) in old_keys[i0:n_old-n_common_end] ],
+        [ k for (k, _) in new_keys[i0:n_new-n_common_end] ],
+        autojunk=False,
+    )
+    opcodes += [
+        (tag, i1+i0, i2+i0, j1+i0, j2+i0)
+        for (tag, i1, i2, j1, j2) in matcher.get_opcodes()
+    ]
+    opcodes.append(
+        ('equal', n_old-n_common_end, n_old, n_new-n_common_end, n_new)
+    )
+
+    patches = []
+    for (tag, i1, i2, j1, j2) in opcodes:
+        if tag == 'equal':
+            for k in range(i2 - i1):
+                new_sourcepaths = new_keys[j1+k][1]
+                if old_keys[i1+k][1] != new_sourcepaths:
+                    patches.append({ 'index': i1+k, 'sourcepaths': new_sourcepaths })
+            continue
+        patches.append({
+            'index': i1,
+            'remove': i2 - i1,
+            'html': ''.join(new_blocks[j1:j2]),
+        })
+    return patches
+
+
+
+
+
 
 
 
@@ -318,6 +468,9 @@ class HotReloaderDisabled:
     def inject_hotreload_js(self):
         pass
 
+    def inject_hotreload_js_in_content(self, content):
+        return content
+
     def new_run_send_update(self, info, content):
         pass
 
@@ -329,12 +482,23 @@ class HotReloaderDisabled:
 
 
 class HotReloaderHtml:
+
+    # Send the full content instead of patches if the patches would contain
+    # more than this fraction of the content's HTML code
+    max_patches_fraction = 0.5
+
     def __init__(self, hotreload_server, computed_format, output):
         super().__init__()
         self.hotreload_server = hotreload_server
         self.computed_format = computed_format
         self.output = output
 
+        # Version number of the content that is displayed by clients that are
+        # up to date, along with its top-level HTML blocks (used to compute
+        # patches).
+        self.content_version = 0
+        self.content_blocks = None
+
 
     def is_enabled(self):
         return True
@@ -345,44 +509,87 @@ class HotReloaderHtml:
         with open(fname, 'r', encoding='utf-8') as f:
             content = f.read()
 
+        content = self.inject_hotreload_js_in_content(content)
+
+        with open(fname, 'w', encoding='utf-8') as fw:
+            fw.write(content)
+
+    def inject_hotreload_js_in_content(self, content):
+        r"""
+        Return the HTML page `content` with the hot-reload JS code inserted
+        before its ``</body>`` tag.
+        """
+        if self.content_blocks is None:
+            # first run, remember the blocks of the content that the clients
+            # will load
+            content_html = self._get_content_html(content)
+            if content_html is not None:
+                self.content_blocks = split_html_blocks(content_html)
+
         # inject hot-reload code in generated HTML, if necessary
         ibodyend = content.rfind('</body>')
         if ibodyend == -1:
             logger.warning("Couldn't inject hot-reload JS code, didn't find </body>")
-            return
+            return content
 
         hotreload_js = (
             """<script type="text/javascript">"""
             + hotreload_js_code_to_inject(self.hotreload_server.get_host(),
-                                          self.hotreload_server.get_port())
+                                          self.hotreload_server.get_port(),
+                                          self.content_version)
             + """</script>"""
         )
 
-        content = (
+        return (
             content[:ibodyend]
             + hotreload_js
             + content[ibodyend:]
         )
 
-        with open(fname, 'w', encoding='utf-8') as fw:
-            fw.write(content)
-
-
-    def new_run_send_update(self, info, content):
 
+    def _get_content_html(self, content):
         ibegin = content.find(template_hr_begin_tag)
         iend = content.rfind(template_hr_end_tag)
         if ibegin == -1 or iend == -1:
             logger.debug("Content hot-reloading not supported by this template")
-            content_html = None
-        else:
-            content_html = content[ ibegin+len(template_hr_begin_tag) : iend ]
+            return None
+        return content[ ibegin+len(template_hr_begin_tag) : iend ]
+
+    def new_run_send_update(self, info, content):
+
+        content_html = self._get_content_html(content)
+
+        old_content_version = self.content_version
+        old_content_blocks = self.content_blocks
+
+        self.content_version += 1
+        self.content_blocks = None
+        if content_html is not None:
+            self.content_blocks = split_html_blocks(content_html)
 
         # update hot-reload clients
-        update_info = {
-            "action": 'update-main-content',
-            "content_html": content_html,
-        }
+        update_info = None
+        if old_content_blocks is not None and self.content_blocks is not None:
+            patches = compute_html_blocks_patches(old_content_blocks,
+                                                  self.content_blocks)
+            patches_size = sum( len(p.get('html', '')) for p in patches )
+            if patches_size <= self.max_patches_fraction * len(content_html):
+                logger.debug("Sending %d content patch(es) (%d/%d chars)",
+                             len(patches), patches_size, len(content_html))
+                update_info = {
+                    "action": 'patch-main-content',
+                    "base_version": old_content_version,
+                    "version": self.content_version,
+                    "num_blocks_before": len(old_content_blocks),
+                    "patches": patches,
+                }
+
+        if update_info is None:
+            update_info = {
+                "action": 'update-main-content',
+                "content_html": content_html,
+                "version": self.content_version,
+            }
 
         self.hotreload_server.send_update_info(update_info)
 
@@ -13,7 +13,7 @@
 // This code will be wrapped into a function(){...} body.  The
 // following variables are defined in this context:
 //
-//     window, wsHost, wsPort
+//     window, wsHost, wsPort, contentVersion
 //
 const document = window.document;
 
@@ -23,14 +23,38 @@ import cssText from 'bundle-text:./watch_hotreload_style.css';
 
 declare var wsHost: string;
 declare var wsPort: number;
+declare var contentVersion: number|null;
 
 const COMPILING_STATES = ['compiling', 'idle'];
 type CompilingState = 'compiling' | 'idle';
 
+type ContentPatch =
+    | {
+        // replace the `remove` top-level blocks starting at `index` by
+        // the blocks in `html`
+        index: number,
+        remove: number,
+        html: string,
+    }
+    | {
+        // the block at `index` is unchanged except for the values of its
+        // data-sourcepath attributes
+        index: number,
+        sourcepaths: string[],
+    }
+
 type UpdateInfo =
     | {
         action: 'update-main-content'|'error-display',
         content_html: string,
+        version?: number,
+    }
+    | {
+        action: 'patch-main-content',
+        base_version: number,
+        version: number,
+        num_blocks_before: number,
+        patches: ContentPatch[],
     }
     | {
         action: 'set-compiling-state',
@@ -42,137 +66,14 @@ function updateMainContentIncremental(mainContainer : HTMLElement, html : string
     //
     // use MORPHDOM to replace only the parts that have actually changed.
     //
-    
-    const maybeMathSpanType = (el: HTMLElement) => {
-        if (el.tagName !== "SPAN") {
-            return null;
-        }
-        if (el.classList.contains('display-math')) {
-            return 'display-math';
-        }
-        if (el.classList.contains('inline-math')) {
-            return 'inline-math';
-        }
-        return null;
-    };
 
     // let mathToTypeset : HTMLElement[] = [];
 
     console.log('About to call morphdom():', {mainContainer, html});
 
     morphdom(mainContainer, '<article>'+html+'</article>', {
-
         childrenOnly: true,
-
-        getNodeKey(node : Node) {
-            // Only element nodes
-            if (node.nodeType !== Node.ELEMENT_NODE) {
-                return undefined;
-            }
-            const elNode = node as HTMLElement;
-
-            // Prefer explicit id
-            const id = elNode.id;
-            if (id) {
-                return `id:${id}`;
-            }
-
-            return undefined;
-
-            // if (['MATH', 'MO', 'MI', 'MN', 'MSUP', 'MSUB'].includes(elNode.tagName.toUpperCase())
-            //     || elNode.tagName.startsWith('MJX-')) {
-            //     // will have to skip diffs on these.
-            //     return null;
-            // }
-
-            // // if a math span, use the source text.
-            // const mathType = maybeMathSpanType(elNode);
-            // if (mathType != null) {
-            //     const mathLatexSource =
-            //         elNode.dataset.mathLatexSource ?? elNode.textContent.trim();
-                
-            //     const t = mathLatexSource.replace(/[^A-Za-z0-9-_\\()[]]/g, '').slice(0,100);
-            //     const key = `${mathType}:${t}`;
-            //     console.log('getNodeKey:', node, {key}, {mathLatexSource});
-            //     return key;
-            // }
-
-            // Build a structural fingerprint for non-id elements
-            // const tag = elNode.tagName;
-            // const childCount = elNode.childElementCount;
-
-            // Create a simple text sample for the node.
-            // Use only the element's *own* direct text nodes, not descendants',
-            // so that a wrapper div doesn't get keyed by deeply nested content.
-            // let text = '';
-            // for (const child of elNode.childNodes) {
-            //     if (child.nodeType === Node.TEXT_NODE) {
-            //         text += child.nodeValue;
-            //     }
-            // }
-            // const textSample = text
-            //     .trim()
-            //     //.replace(/\s+/g, '-')
-            //     .replace(/[^a-z0-9-]/g, '')
-            //     .slice(0, 200);
-            
-            //const key = `el:${tag}:${childCount}`; //:${textSample}`;
-            //console.log('getNodeKey:', node, key);
-            //return key;
-        },
-
-        onBeforeElUpdated(fromEl : HTMLElement, toEl : HTMLElement) {
-            //console.log(`onBeforeElUpdated()`, {fromEl, toEl});
-            const toMathType = maybeMathSpanType(toEl);
-            if (toMathType == null) {
-                //console.log(`[new node is not math, normal diff requested]`);
-                return true; // new node is not a math node, normal diffing
-            }
-            // New node is a math node.  Before anything else, make sure
-            // we stamp the latex source for that node.
-            stampMathContentSourcesElement(toEl);
-
-            const fromMathType = maybeMathSpanType(fromEl);
-            if (fromMathType != toMathType) {
-                //console.log(`[different math type, normal diff requested]`, {fromMathType, toMathType});
-                // mathToTypeset.push(toEl);
-                return true; // different math types, let morphdom replace the node
-            }
-
-            // Both are math spans of same type — compare source
-            const oldSrc = fromEl.dataset.mathLatexSource;
-            const newSrc = toEl.dataset.mathLatexSource;
-            //console.log({oldSrc, newSrc});
-
-            if (oldSrc === newSrc) {
-                //console.log(`[math unchanged, skip update!]`);
-                // Math unchanged — keep the existing typeset node entirely
-                return false;
-            }
-
-            // Math changed — substitute in the new node ourselves.
-            // Then maybe queue for typesetting:
-            // mathToTypeset.push(toEl);
-            //console.log(`[math changed, forced manual update.]`);
-            fromEl.parentNode!.replaceChild(toEl.cloneNode(true), fromEl);
-            return false;
-        },
-
-        //onElUpdated(el : HTMLElement) {
-            //console.log(`Element updated!`, el);
-        //},
-
-        //onNodeAdded(node : Node) {
-            //console.log(`Node added!`, node);
-            // if (node.nodeType === 1 && isMathSpan(node)) {
-            //     mathToTypeset.push(node);
-            // }
-        //    return node;
-        //},
-
-        //onNodeDiscarded(node: Node) {
-            // console.log(`Node discarded`, node);
-        //}
+        ...morphdomOptions,
     });
 
     console.log('morphdom finished :)');
@@ -197,6 +98,132 @@ function updateMainContentIncremental(mainContainer : HTMLElement, html : string
     // }
 }
 
+const maybeMathSpanType = (el: HTMLElement) => {
+    if (el.tagName !== "SPAN") {
+        return null;
+    }
+    if (el.classList.contains('display-math')) {
+        return 'display-math';
+    }
+    if (el.classList.contains('inline-math')) {
+        return 'inline-math';
+    }
+    return null;
+};
+
+const morphdomOptions = {
+
+    getNodeKey(node : Node) {
+        // Only element nodes
+        if (node.nodeType !== Node.ELEMENT_NODE) {
+            return undefined;
+        }
+        const elNode = node as HTMLElement;
+
+        // Prefer explicit id
+        const id = elNode.id;
+        if (id) {
+            return `id:${id}`;
+        }
+
+        return undefined;
+
+        // if (['MATH', 'MO', 'MI', 'MN', 'MSUP', 'MSUB'].includes(elNode.tagName.toUpperCase())
+        //     || elNode.tagName.startsWith('MJX-')) {
+        //     // will have to skip diffs on these.
+        //     return null;
+        // }
+
+        // // if a math span, use the source text.
+        // const mathType = maybeMathSpanType(elNode);
+        // if (mathType != null) {
+        //     const mathLatexSource =
+        //         elNode.dataset.mathLatexSource ?? elNode.textContent.trim();
+            
+        //     const t = mathLatexSource.replace(/[^A-Za-z0-9-_\\()[]]/g, '').slice(0,100);
+        //     const key = `${mathType}:${t}`;
+        //     console.log('getNodeKey:', node, {key}, {mathLatexSource});
+        //     return key;
+        // }
+
+        // Build a structural fingerprint for non-id elements
+        // const tag = elNode.tagName;
+        // const childCount = elNode.childElementCount;
+
+        // Create a simple text sample for the node.
+        // Use only the element's *own* direct text nodes, not descendants',
+        // so that a wrapper div doesn't get keyed by deeply nested content.
+        // let text = '';
+        // for (const child of elNode.childNodes) {
+        //     if (child.nodeType === Node.TEXT_NODE) {
+        //         text += child.nodeValue;
+        //     }
+        // }
+        // const textSample = text
+        //     .trim()
+        //     //.replace(/\s+/g, '-')
+        //     .replace(/[^a-z0-9-]/g, '')
+        //     .slice(0, 200);
+        
+        //const key = `el:${tag}:${childCount}`; //:${textSample}`;
+        //console.log('getNodeKey:', node, key);
+        //return key;
+    },
+
+    onBeforeElUpdated(fromEl : HTMLElement, toEl : HTMLElement) {
+        //console.log(`onBeforeElUpdated()`, {fromEl, toEl});
+        const toMathType = maybeMathSpanType(toEl);
+        if (toMathType == null) {
+            //console.log(`[new node is not math, normal diff requested]`);
+            return true; // new node is not a math node, normal diffing
+        }
+        // New node is a math node.  Before anything else, make sure
+        // we stamp the latex source for that node.
+        stampMathContentSourcesElement(toEl);
+
+        const fromMathType = maybeMathSpanType(fromEl);
+        if (fromMathType != toMathType) {
+            //console.log(`[different math type, normal diff requested]`, {fromMathType, toMathType});
+            // mathToTypeset.push(toEl);
+            return true; // different math types, let morphdom replace the node
+        }
+
+        // Both are math spans of same type — compare source
+        const oldSrc = fromEl.dataset.mathLatexSource;
+        const newSrc = toEl.dataset.mathLatexSource;
+        //console.log({oldSrc, newSrc});
+
+        if (oldSrc === newSrc) {
+            //console.log(`[math unchanged, skip update!]`);
+            // Math unchanged — keep the existing typeset node entirely
+            return false;
+        }
+
+        // Math changed — substitute in the new node ourselves.
+        // Then maybe queue for typesetting:
+        // mathToTypeset.push(toEl);
+        //console.log(`[math changed, forced manual update.]`);
+        fromEl.parentNode!.replaceChild(toEl.cloneNode(true), fromEl);
+        return false;
+    },
+
+    //onElUpdated(el : HTMLElement) {
+        //console.log(`Element updated!`, el);
+    //},
+
+    //onNodeAdded(node : Node) {
+        //console.log(`Node added!`, node);
+        // if (node.nodeType === 1 && isMathSpan(node)) {
+        //     mathToTypeset.push(node);
+        // }
+    //    return node;
+    //},
+
+    //onNodeDiscarded(node: Node) {
+        // console.log(`Node discarded`, node);
+    //}
+};
+
 function updateMainContent(mainContainer : HTMLElement, info : UpdateInfo)
 {
     if (info.action !== 'update-main-content') {
@@ -220,6 +247,62 @@ function updateMainContent(mainContainer : HTMLElement, info : UpdateInfo)
     }
 }
 
+function patchMainContent(mainContainer : HTMLElement, info : UpdateInfo)
+{
+    if (info.action !== 'patch-main-content') {
+        return;
+    }
+    //
+    // Only the top-level blocks that have changed since the last update are
+    // sent by the server.  The patches refer to the block indices of the
+    // previous version of the content.
+    //
+    const blocks = Array.from(mainContainer.children) as HTMLElement[];
+    if (blocks.length !== info.num_blocks_before) {
+        // our content isn't what the server thinks it is ... need a full reload.
+        throw new Error(`Mismatching number of blocks, cannot apply patches`);
+    }
+    // Apply the patches starting from the end, so that the indices of the
+    // blocks that remain to be patched are unaffected
+    for (let k = info.patches.length - 1; k >= 0; --k) {
+        const patch = info.patches[k];
+        if ('sourcepaths' in patch) {
+            const block = blocks[patch.index];
+            const els = [block, ...Array.from(block.querySelectorAll('[data-sourcepath]'))]
+                .filter( (el) => el.hasAttribute('data-sourcepath') ) as HTMLElement[];
+            if (els.length !== patch.sourcepaths.length) {
+                throw new Error(`Mismatching data-sourcepath attributes, cannot apply patch`);
+            }
+            els.forEach( (el, j) => { el.dataset.sourcepath = patch.sourcepaths[j]; } );
+            continue;
+        }
+        const oldEls = blocks.slice(patch.index, patch.index + patch.remove);
+        const template = document.createElement('template');
+        template.innerHTML = patch.html;
+        const newEls = Array.from(template.content.children) as HTMLElement[];
+        if (oldEls.length === newEls.length) {
+            // same number of blocks (typically, an edited paragraph) -- morph
+            // each block so that unchanged math is not typeset again
+            oldEls.forEach( (oldEl, j) => morphdom(oldEl, newEls[j], morphdomOptions) );
+            continue;
+        }
+        const nextEl = (patch.index + patch.remove < blocks.length)
+            ? blocks[patch.index + patch.remove]
+            : null;
+        for (const newEl of newEls) {
+            stampMathContentSources(newEl);
+            mainContainer.insertBefore(newEl, nextEl);
+        }
+        for (const oldEl of oldEls) {
+            oldEl.remove();
+        }
+    }
+    console.log(`Applied ${info.patches.length} patch(es) to main content`);
+    if ((window as any).flmSetup) {
+        (window as any).flmSetup();
+    }
+}
+
 function stampMathContentSourcesElement(spanEl : HTMLElement)
 {
     const textContent = spanEl.textContent.trim();
@@ -327,10 +410,12 @@ class HotReloadClient
     private mainContainer: HTMLElement;
     private errorPanel: ErrorPanel;
     private compilingWidgetDiv: HTMLElement;
+    private contentVersion: number|null;
 
-    constructor(url: string, mainContainer: HTMLElement)
+    constructor(url: string, mainContainer: HTMLElement, contentVersion: number|null)
     {
         this.mainContainer = mainContainer;
+        this.contentVersion = contentVersion;
         this.ws = new WebSocket(url);
         this.ws.addEventListener("message", (m) => this._onMessage(m));
         this.ws.addEventListener("open",  () => console.log("websocket open"));
@@ -363,10 +448,25 @@ class HotReloadClient
             this.setCompilingState('idle');
             try {
                 updateMainContent(this.mainContainer, info);
+                this.contentVersion = info.version ?? null;
             } catch (err) {
                 // failure in the incremental update, so reload everything ... :/
                 window.location.reload();
             }
+        } else if (info.action === 'patch-main-content') {
+            this.errorPanel.clear();
+            this.setCompilingState('idle');
+            try {
+                if (this.contentVersion == null || this.contentVersion !== info.base_version) {
+                    // we missed an update
+                    throw new Error(`Patches do not apply to our content version`);
+                }
+                patchMainContent(this.mainContainer, info);
+                this.contentVersion = info.version;
+            } catch (err) {
+                console.warn('Could not apply patches, reloading page', err);
+                window.location.reload();
+            }
         } else if (info.action === 'error-display') {
             this.errorPanel.show(info.content_html);
             this.setCompilingState('idle');
@@ -556,7 +656,8 @@ window.addEventListener("DOMContentLoaded", () => {
     //
     // Set up the WebSocket client.
     //
-    const hotReloadClient = new HotReloadClient(`ws://${wsHost}:${wsPort}/`, mainContainer);
+    const hotReloadClient = new HotReloadClient(`ws://${wsHost}:${wsPort}/`, mainContainer,
+                                                contentVersion);
 
     // Expose public API for use by page templates
     (window as any).flmHotReload = hotReloadClient;
@@ -0,0 +1,197 @@
+r"""
+Tools to decide when and how to rebuild the document in watch mode (``flm
+--watch``).
+
+A run records all the files it reads (see
+:py:class:`flm.main.run.RunDependencies`): the input, configuration files
+(including those read by ``$import``), content parts, templates and graphics.
+The :py:class:`DependencyWatcher` watches these files and reports which ones
+changed, so that only the pipeline stages that depend on them need to be
+redone.  Changes are grouped together over a delay that is adapted to how long
+the document takes to build, see :py:class:`AdaptiveDebounce`.
+
+This module is not available in the JavaScript version of FLM.
+"""
+
+import os.path
+import time
+
+import watchfiles
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .run import run_stages
+
+
+
+def get_earliest_stage(*stages):
+    r"""
+    Return the earliest of the given pipeline stages (see
+    :py:data:`flm.main.run.run_stages`), ignoring any `None` values.  Returns
+    `None` if all given stages are `None`.
+    """
+    stages = [ stage for stage in stages if stage is not None ]
+    if not stages:
+        return None
+    return min(stages, key=run_stages.index)
+
+
+class AdaptiveDebounce:
+    r"""
+    Compute how long to wait for further changes after a file changed, before
+    rebuilding the document.
+
+    The delay is a fraction `build_time_factor` of the typical build time (an
+    exponential moving average of the durations reported with
+    :py:meth:`add_build_duration`), kept between `min_delay` and `max_delay`
+    (in seconds).  Small documents are thus rebuilt almost immediately, while
+    changes to documents that take long to build are grouped together, e.g.,
+    when several files are saved at once.
+    """
+    def __init__(self, min_delay=0.1, max_delay=2.0, build_time_factor=0.5,
+                 smoothing=0.3):
+        super().__init__()
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.build_time_factor = build_time_factor
+        self.smoothing = smoothing
+        self.typical_build_duration = None
+
+    def add_build_duration(self, duration):
+        r"""
+        Report that the last build took `duration` seconds.
+        """
+        if self.typical_build_duration is None:
+            self.typical_build_duration = duration
+        else:
+            self.typical_build_duration += \
+                self.smoothing * (duration - self.typical_build_duration)
+
+    def get_delay(self):
+        r"""
+        Return the current delay, in seconds.
+        """
+        if self.typical_build_duration is None:
+            return self.max_delay
+        return min(self.max_delay, max(
+            self.min_delay,
+            self.build_time_factor * self.typical_build_duration
+        ))
+
+
+class DependencyWatcher:
+    r"""
+    Watch the files listed in one or more
+    :py:class:`~flm.main.run.RunDependencies` instances.
+
+    Iterating over the watcher (see :py:meth:`iter_changes`) yields sets of
+    full paths of files that changed.  The set of dependencies to watch can be
+    updated with :py:meth:`set_dependencies` between two iterations, e.g.,
+    after the document was rebuilt.
+
+    The folders containing the dependencies are watched (not the files
+    themselves), so that files that are replaced by a new file, as many
+    editors do when saving, are still followed.
+
+    :param debounce: An :py:class:`AdaptiveDebounce` instance that determines
+        how long to wait for further changes before reporting them.
+
+    :param poll_interval: How often (in seconds) to check whether the debounce
+        delay has expired.
+
+    :param stop_event: An optional :py:class:`threading.Event` that stops the
+        iteration when set.
+    """
+    def __init__(self, dependencies_list=(), *, debounce=None, poll_interval=0.05,
+                 stop_event=None):
+        super().__init__()
+        self.dependencies_list = list(dependencies_list)
+        if debounce is None:
+            debounce = AdaptiveDebounce()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.stop_event = stop_event
+
+    def set_dependencies(self, dependencies_list):
+        self.dependencies_list = list(dependencies_list)
+
+    def get_watched_files(self):
+        watched_files = set()
+        for dependencies in self.dependencies_list:
+            watched_files.update(dependencies.files.keys())
+        return watched_files
+
+    def get_changed_stage(self, changed_files):
+        r"""
+        Return the first pipeline stage that needs to be redone following
+        changes to the given files, or `None` if none of the watched
+        dependencies depends on them.
+        """
+        return get_earliest_stage(*[
+            dependencies.get_invalidated_stage(changed_files)
+            for dependencies in self.dependencies_list
+        ])
+
+    def __iter__(self):
+        return self.iter_changes()
+
+    def iter_changes(self):
+        r"""
+        Yield sets of full paths of watched files that changed.  Returns when
+        the `stop_event` is set or when the process is interrupted (Ctrl+C).
+        """
+        while True:
+            watched_files = self.get_watched_files()
+            watched_dirs = sorted(set(
+                os.path.dirname(fullpath) for fullpath in watched_files
+            ))
+            watched_dirs = [ d for d in watched_dirs if os.path.isdir(d) ]
+
+            # Files might have changed since they were read by the last run,
+            # before we started watching them.
+            pending = set()
+            for dependencies in self.dependencies_list:
+                pending.update(dependencies.get_changed_files())
+            last_change_time = time.monotonic()
+
+            logger.debug("Watching %d files in %d folders", len(watched_files),
+                         len(watched_dirs))
+
+            if not watched_dirs:
+                return
+
+            def _watch_filter(change, path):
+                return os.path.abspath(path) in watched_files
+
+            restart = False
+            poll_interval_ms = max(1, int(self.poll_interval * 1000))
+            for changes in watchfiles.watch(
+                    *watched_dirs,
+                    watch_filter=_watch_filter,
+                    recursive=False,
+                    debounce=poll_interval_ms,
+                    step=poll_interval_ms,
+                    rust_timeout=poll_interval_ms,
+                    yield_on_timeout=True,
+                    stop_event=self.stop_event,
+                    raise_interrupt=False,
+            ):
+                now = time.monotonic()
+                if changes:
+                    pending.update(os.path.abspath(path) for (_, path) in changes)
+                    last_change_time = now
+                if not pending or now - last_change_time < self.debounce.get_delay():
+                    continue
+
+                yield pending
+                pending = set()
+
+                if self.get_watched_files() != watched_files:
+                    # dependencies changed, restart the watcher with the new
+                    # set of files
+                    restart = True
+                    break
+
+            if not restart:
+                return
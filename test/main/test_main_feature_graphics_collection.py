@@ -7,7 +7,10 @@ import base64
 import tempfile
 
 from flm.main.main import main
-from flm.main.feature_graphics_collection import FeatureGraphicsCollection
+from flm.main import feature_graphics_collection
+from flm.main.feature_graphics_collection import (
+    FeatureGraphicsCollection, GraphicsConverter, SharedGraphicsStore
+)
 
 
 def _make_png_data_url(width=10, height=20, dpi=96):
@@ -57,6 +60,27 @@ class TestFetchInspectUrl(unittest.TestCase):
         self.assertEqual(len(feat._url_cache), 1)
         self.assertEqual(feat._url_download_counter, 1)
 
+    def test_data_url_downloaded_once_concurrently(self):
+        import concurrent.futures
+        data_urls = [ _make_png_data_url(width=10+j) for j in range(3) ]
+        feat = FeatureGraphicsCollection()
+
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            entries = list(executor.map(
+                feat.fetch_inspect_url,
+                [ data_urls[k % 3] for k in range(30) ]
+            ))
+
+        for k, entry in enumerate(entries):
+            self.assertIs(entry, entries[k % 3])
+            self.assertEqual(entry['info']['pixel_dimensions'], (10 + k % 3, 20))
+        self.assertEqual(len(feat._url_cache), 3)
+        self.assertEqual(feat._url_download_counter, 3)
+        self.assertEqual(
+            len(set(entry['temp_file_path'] for entry in entries)),
+            3
+        )
+
     def test_bad_url_failure_marker(self):
         feat = FeatureGraphicsCollection()
         # malformed data URL -> failure marker cached, no exception raised
@@ -122,5 +146,88 @@ class TestDataUrlRender(unittest.TestCase):
         self.assertTrue(data_url in sout.getvalue())
 
 
+# ---------------------------------------------------------------------------
+#  Shared content-addressed store of converted graphics
+# ---------------------------------------------------------------------------
+
+class _CountingCopyConverter(GraphicsConverter):
+    # "converts" by copying, and counts how many times it was invoked
+
+    name = 'testcountingcopy'
+
+    num_converts = 0
+
+    @classmethod
+    def can_convert(cls, ext, to_ext):
+        return True
+
+    def convert(self, source_type, src_url, target_path, converter_info, options=None):
+        type(self).num_converts += 1
+        with open(src_url, 'rb') as fr:
+            data = fr.read()
+        with open(target_path, 'wb') as fw:
+            fw.write(data)
+
+
+class TestSharedGraphicsStore(unittest.TestCase):
+
+    def setUp(self):
+        feature_graphics_collection._graphics_converters.insert(0, _CountingCopyConverter)
+        _CountingCopyConverter.num_converts = 0
+
+    def tearDown(self):
+        feature_graphics_collection._graphics_converters.remove(_CountingCopyConverter)
+
+    def test_store_path_depends_on_converter_and_options(self):
+        store = SharedGraphicsStore('/store')
+        p1 = store.get_store_path('abc', 'gs', {'dpi': 192}, '.png')
+        self.assertEqual(os.path.dirname(p1), '/store')
+        self.assertTrue(os.path.basename(p1).startswith('abc-gs-'))
+        self.assertTrue(p1.endswith('.png'))
+        self.assertEqual(p1, store.get_store_path('abc', 'gs', {'dpi': 192}, '.png'))
+        self.assertNotEqual(p1, store.get_store_path('abc', 'gs', {'dpi': 96}, '.png'))
+        self.assertNotEqual(p1, store.get_store_path('abc', 'magick', {'dpi': 192}, '.png'))
+        self.assertNotEqual(p1, store.get_store_path('abd', 'gs', {'dpi': 192}, '.png'))
+
+    def _run(self, tmpdir, outname, store_dir):
+        data_url = _make_png_data_url(width=10, height=20)
+        output_path = os.path.join(tmpdir, outname, 'out.html')
+        os.makedirs(os.path.dirname(output_path))
+        main(
+            output=output_path,
+            flm_content=(r'\begin{figure}\includegraphics{' + data_url
+                         + r'}\end{figure}'),
+            format='html',
+            inline_config=(
+                '{"flm": {"features": {"flm.main.feature_graphics_collection":'
+                ' {"shared_graphics_store": "' + store_dir + '",'
+                ' "collect_format_conversion_rules": ['
+                '   {"from": ".png", "to": ".gif", "via": "testcountingcopy"}'
+                ' ]}}}}'
+            ),
+        )
+        collected_dir = os.path.join(tmpdir, outname, '_flm_collected_graphics')
+        return [
+            os.path.join(collected_dir, fn)
+            for fn in os.listdir(collected_dir) if fn.endswith('.gif')
+        ]
+
+    def test_conversion_reused_across_output_folders(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store_dir = os.path.join(tmpdir, 'store')
+
+            files1 = self._run(tmpdir, 'out1', store_dir)
+            self.assertEqual(_CountingCopyConverter.num_converts, 1)
+            self.assertEqual(len(files1), 1)
+            self.assertEqual(len(os.listdir(store_dir)), 1)
+
+            files2 = self._run(tmpdir, 'out2', store_dir)
+            # not converted again, fetched from the shared store
+            self.assertEqual(_CountingCopyConverter.num_converts, 1)
+            self.assertEqual(len(files2), 1)
+            with open(files1[0], 'rb') as f1, open(files2[0], 'rb') as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+
 if __name__ == '__main__':
     unittest.main()
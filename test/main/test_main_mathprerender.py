@@ -0,0 +1,263 @@
+import unittest
+import os
+import os.path
+import sys
+import json
+import tempfile
+
+from flm.flmenvironment import make_standard_environment
+from flm.stdfeatures import standard_features
+from flm.fragmentrenderer.html import HtmlFragmentRenderer
+from flm.main.main import Main
+from flm.main.run import FLMMainRunError
+
+from flm.main.mathprerender import (
+    MathPrerenderEngineBase,
+    MathPrerenderer,
+    CommandEngine,
+    expand_math_macros,
+)
+
+try:
+    import latex2mathml
+except ImportError:
+    latex2mathml = None
+
+
+class _CountingEngine(MathPrerenderEngineBase):
+    def __init__(self):
+        super().__init__()
+        self.converted = []
+
+    def get_engine_id(self):
+        return 'counting'
+
+    def convert(self, latex, *, displaytype, environmentname=None):
+        self.converted.append(latex)
+        if 'FAIL' in latex:
+            raise ValueError("can't convert")
+        return f'<math data-displaytype="{displaytype}">{latex}</math>'
+
+
+# ---------------------------------------------------------------------------
+# expand_math_macros
+# ---------------------------------------------------------------------------
+
+class TestExpandMathMacros(unittest.TestCase):
+
+    def test_no_macros(self):
+        self.assertEqual(expand_math_macros(r'\R x', {}), r'\R x')
+
+    def test_simple_macro(self):
+        self.assertEqual(
+            expand_math_macros(r'x \in \R, \Rx', {'R': r'\mathbb{R}'}),
+            r'x \in \mathbb{R}, \Rx'
+        )
+
+    def test_macro_with_arguments(self):
+        macros = {'ket': [r'\left|#1\right\rangle', 1], 'ip': [r'\langle #1,#2\rangle', 2]}
+        self.assertEqual(
+            expand_math_macros(r'\ket{\psi_{0}} + \ip ab', macros),
+            r'\left|\psi_{0}\right\rangle + \langle a,b\rangle'
+        )
+
+    def test_no_letter_glued_after_macro_name(self):
+        self.assertEqual(
+            expand_math_macros(r'\ket{a}b', {'ket': [r'\left|#1\right\rangle', 1]}),
+            r'\left|a\right\rangle b'
+        )
+
+    def test_nested_macros(self):
+        macros = {'RR': r'\R^2', 'R': r'\mathbb{R}'}
+        self.assertEqual(expand_math_macros(r'\RR', macros), r'\mathbb{R}^2')
+
+    def test_escaped_backslash(self):
+        # "\\" followed by "R" is not the macro "\R"
+        self.assertEqual(expand_math_macros(r'a\\R', {'R': r'\mathbb{R}'}), r'a\\R')
+        self.assertEqual(
+            expand_math_macros(r'a\\\R', {'R': r'\mathbb{R}'}),
+            r'a\\\mathbb{R}'
+        )
+
+    def test_recursive_macro_raises(self):
+        with self.assertRaises(ValueError):
+            expand_math_macros(r'\x', {'x': r'\x\x'})
+
+
+# ---------------------------------------------------------------------------
+# MathPrerenderer
+# ---------------------------------------------------------------------------
+
+class TestMathPrerenderer(unittest.TestCase):
+
+    def test_converts_once(self):
+        engine = _CountingEngine()
+        p = MathPrerenderer(engine)
+        for _ in range(3):
+            self.assertEqual(
+                p('x^2', displaytype='inline'),
+                '<math data-displaytype="inline">x^2</math>'
+            )
+        self.assertEqual(p('x^2', displaytype='display'),
+                         '<math data-displaytype="display">x^2</math>')
+        self.assertEqual(engine.converted, ['x^2', 'x^2'])
+
+    def test_expands_macros(self):
+        engine = _CountingEngine()
+        p = MathPrerenderer(engine, macros={'R': r'\mathbb{R}'})
+        p(r'\R', displaytype='inline')
+        self.assertEqual(engine.converted, [r'\mathbb{R}'])
+
+    def test_failure_returns_none(self):
+        engine = _CountingEngine()
+        p = MathPrerenderer(engine)
+        with self.assertLogs('flm.main.mathprerender', level='WARNING'):
+            self.assertIsNone(p('FAIL', displaytype='inline'))
+        self.assertIsNone(p('FAIL', displaytype='inline'))
+        self.assertEqual(engine.converted, ['FAIL'])
+
+    def test_invalid_engine_raises(self):
+        with self.assertRaises(ValueError):
+            MathPrerenderer('no-such-engine')
+
+    def test_cache_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_file = os.path.join(tmpdir, 'mathcache.jsonl')
+
+            engine = _CountingEngine()
+            p = MathPrerenderer(engine, cache_file=cache_file)
+            p('a', displaytype='inline')
+            p('b', displaytype='display', environmentname='align')
+            p('a', displaytype='inline')
+            p('FAIL', displaytype='inline')
+            with open(cache_file, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+            engine2 = _CountingEngine()
+            p2 = MathPrerenderer(engine2, cache_file=cache_file)
+            self.assertEqual(p2('a', displaytype='inline'),
+                             '<math data-displaytype="inline">a</math>')
+            self.assertEqual(p2('b', displaytype='display', environmentname='align'),
+                             '<math data-displaytype="display">b</math>')
+            self.assertEqual(engine2.converted, [])
+
+            # different macros -> different cache keys
+            engine3 = _CountingEngine()
+            p3 = MathPrerenderer(engine3, cache_file=cache_file,
+                                 macros={'R': r'\mathbb{R}'})
+            p3('a', displaytype='inline')
+            self.assertEqual(engine3.converted, ['a'])
+
+    def test_cache_file_ignores_incomplete_line(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_file = os.path.join(tmpdir, 'mathcache.jsonl')
+            engine = _CountingEngine()
+            p = MathPrerenderer(engine, cache_file=cache_file)
+            p('a', displaytype='inline')
+            with open(cache_file, 'a', encoding='utf-8') as f:
+                f.write('["abc", "<ma')
+            p2 = MathPrerenderer(_CountingEngine(), cache_file=cache_file)
+            self.assertEqual(p2('a', displaytype='inline'),
+                             '<math data-displaytype="inline">a</math>')
+
+    def test_command_engine(self):
+        engine = CommandEngine([
+            sys.executable, '-c',
+            'import sys; print("<math data-d={displaytype}>" + sys.stdin.read() + "</math>")'
+        ])
+        p = MathPrerenderer(engine)
+        self.assertEqual(
+            p('a&=b', displaytype='display', environmentname='align'),
+            r'<math data-d=display>\begin{align*}a&=b\end{align*}</math>'
+        )
+
+    def test_with_html_fragment_renderer(self):
+        engine = _CountingEngine()
+        fr = HtmlFragmentRenderer()
+        fr.prerender_math_fn = MathPrerenderer(engine)
+        environ = make_standard_environment(standard_features())
+        frag = environ.make_fragment(r'\(x\) and \(x\) and \(y\)',
+                                     is_block_level=False, standalone_mode=True)
+        self.assertEqual(
+            frag.render_standalone(fr),
+            '<span class="inline-math prerendered-math">'
+            '<math data-displaytype="inline">x</math></span> and '
+            '<span class="inline-math prerendered-math">'
+            '<math data-displaytype="inline">x</math></span> and '
+            '<span class="inline-math prerendered-math">'
+            '<math data-displaytype="inline">y</math></span>'
+        )
+        self.assertEqual(engine.converted, ['x', 'y'])
+
+
+class TestMathPrerenderDocumentConfig(unittest.TestCase):
+
+    def _write(self, fname, content):
+        with open(fname, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_front_matter_cannot_run_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            marker = os.path.join(tmpdir, 'PWNED')
+            self._write(os.path.join(tmpdir, 'evil.yaml'), json.dumps({
+                'flm': { 'math_prerender': {
+                    'engine': 'command',
+                    'command': [ sys.executable, '-c', f'open({marker!r}, "w")' ],
+                } }
+            }))
+            front_matters = [
+                'flm:\n  math_prerender:\n    engine: command\n'
+                '    command: ["sh", "-c", "cat"]\n',
+                'flm:\n  math_prerender:\n    engine: latex2mathml\n'
+                '    cache_file: /tmp/somewhere.jsonl\n',
+                '$import: evil.yaml\n',
+            ]
+            for front_matter in front_matters:
+                with self.subTest(front_matter=front_matter):
+                    fname = os.path.join(tmpdir, 'doc.flm')
+                    self._write(fname, '---\n' + front_matter + '---\nHi \\(x\\).\n')
+                    with self.assertRaises(FLMMainRunError):
+                        Main(files=[fname], format='html').make_run_object()
+            self.assertFalse(os.path.exists(marker))
+
+    def test_config_can_run_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config = {
+                'flm': { 'math_prerender': {
+                    'engine': 'command',
+                    'command': [
+                        sys.executable, '-c',
+                        'import sys; print("<math>" + sys.stdin.read() + "</math>")'
+                    ],
+                } }
+            }
+            fname = os.path.join(tmpdir, 'doc.flm')
+            self._write(fname, '---\nflm:\n  math_prerender:\n    macros:\n'
+                        '      R: "y"\n---\nHi \\(\\R\\).\n')
+            run_object = Main(files=[fname], format='html', config=config).make_run_object()
+            try:
+                result, _ = run_object.run()
+            finally:
+                run_object.cleanup()
+            self.assertIn('<math>y</math>', result)
+
+
+@unittest.skipIf(latex2mathml is None, "latex2mathml is not installed")
+class TestLatex2MathMLEngine(unittest.TestCase):
+
+    def test_inline(self):
+        p = MathPrerenderer('latex2mathml')
+        html = p(r'\frac{a}{b}', displaytype='inline')
+        self.assertTrue(html.startswith('<math '))
+        self.assertIn('<mfrac>', html)
+        self.assertIn('display="inline"', html)
+
+    def test_display_environment(self):
+        p = MathPrerenderer('latex2mathml')
+        html = p(r'a &= b\tag*{(1)}', displaytype='display', environmentname='align')
+        self.assertIn('display="block"', html)
+        self.assertIn('<mtable', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
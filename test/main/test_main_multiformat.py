@@ -0,0 +1,125 @@
+import unittest
+from unittest import mock
+import os
+import os.path
+import tempfile
+
+from flm.main import run
+from flm.main.main import (
+    main,
+    split_output_formats,
+    MultiFormatMain,
+)
+
+
+def _write(fname, content):
+    with open(fname, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def _read(fname):
+    with open(fname, encoding='utf-8') as f:
+        return f.read()
+
+
+class TestSplitOutputFormats(unittest.TestCase):
+
+    def test_split(self):
+        self.assertIsNone(split_output_formats(None))
+        self.assertEqual(split_output_formats('html'), ['html'])
+        self.assertEqual(split_output_formats('html, latex,,html,text'),
+                         ['html', 'latex', 'text'])
+
+
+class TestMultiFormatMain(unittest.TestCase):
+
+    def test_output_names(self):
+        m = MultiFormatMain(flm_content='Hello', format='html,latex,markdown,text',
+                            output='out/doc.html')
+        self.assertEqual(m.outputs, {
+            'html': 'out/doc.html',
+            'latex': 'out/doc.tex',
+            'markdown': 'out/doc.md',
+            'text': 'out/doc.txt',
+        })
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_file = os.path.join(tmpdir, 'doc.flm')
+            _write(input_file, 'Hello')
+            m = MultiFormatMain(files=[input_file], format='html,text')
+            self.assertEqual(m.outputs, {
+                'html': os.path.join(tmpdir, 'doc.html'),
+                'text': os.path.join(tmpdir, 'doc.txt'),
+            })
+
+        m = MultiFormatMain(flm_content='Hello', format='html,text', output='doc.v2')
+        self.assertEqual(m.outputs, {'html': 'doc.v2.html', 'text': 'doc.v2.txt'})
+
+    def test_invalid_output(self):
+        with self.assertRaises(ValueError):
+            MultiFormatMain(flm_content='Hello', format='html,text')
+        with self.assertRaises(ValueError):
+            MultiFormatMain(flm_content='Hello', format='html,text', output='-')
+        with self.assertRaises(ValueError):
+            MultiFormatMain(files=['doc.txt'], format='html,text', output='doc')
+
+    def test_same_as_single_format(self):
+        flm_content = (
+            '---\n'
+            'flm:\n'
+            '  parsing:\n'
+            '    dollar_inline_math_mode: true\n'
+            '---\n'
+            r'\section{Intro}' '\n\n'
+            r'Hello, \emph{world}, with $x$ and a footnote\footnote{See here.}.' '\n'
+        )
+        formats = ['html', 'latex', 'markdown', 'text']
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_file = os.path.join(tmpdir, 'doc.flm')
+            _write(input_file, flm_content)
+
+            real_parse_fragments = run.Run.parse_fragments
+            parse_calls = []
+            def _parse_fragments(self, *args, **kwargs):
+                parse_calls.append(self)
+                return real_parse_fragments(self, *args, **kwargs)
+
+            with mock.patch.object(run.Run, 'parse_fragments', _parse_fragments):
+                main(files=[input_file], format=','.join(formats),
+                     output=os.path.join(tmpdir, 'multi'))
+
+            # the formats' default configs only differ in rendering settings
+            # (e.g., endnote counter formatters), so all formats share one parse
+            self.assertEqual(len(parse_calls), 1)
+
+            for fmt, ext in zip(formats, ['.html', '.tex', '.md', '.txt']):
+                single_output = os.path.join(tmpdir, 'single' + ext)
+                main(files=[input_file], format=fmt, output=single_output)
+                self.assertEqual(_read(os.path.join(tmpdir, 'multi' + ext)),
+                                 _read(single_output))
+
+    def test_format_specific_config(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            _write(os.path.join(tmpdir, 'flmconfig.yaml'), (
+                'flm:\n  features:\n    substmacros:\n      definitions:\n'
+                '        macros:\n          Tool:\n            content: GENERIC\n'
+            ))
+            _write(os.path.join(tmpdir, 'flmconfig.latex.yaml'), (
+                'flm:\n  features:\n    substmacros:\n      definitions:\n'
+                '        macros:\n          Tool:\n            content: LATEXSPECIFIC\n'
+            ))
+            _write(os.path.join(tmpdir, 'doc.flm'), 'Use \\Tool{}.\n')
+
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                main(files=['doc.flm'], format='html,latex,text', output='out')
+            finally:
+                os.chdir(cwd)
+
+            self.assertIn('GENERIC', _read(os.path.join(tmpdir, 'out.html')))
+            self.assertIn('LATEXSPECIFIC', _read(os.path.join(tmpdir, 'out.tex')))
+            self.assertIn('GENERIC', _read(os.path.join(tmpdir, 'out.txt')))
+
+
+if __name__ == '__main__':
+    unittest.main()
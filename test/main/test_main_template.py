@@ -1,5 +1,9 @@
 import unittest
+import os
+import os.path
+import tempfile
 
+from flm.main.main import ResourceAccessor
 from flm.main.template import (
     _ProxyDictVarConfig,
     _StrTemplate,
@@ -8,6 +12,10 @@ from flm.main.template import (
     TemplateEngineBase,
     OnlyContentTemplate,
     SimpleStringTemplate,
+    compile_template,
+    render_compiled_template,
+    DocumentTemplate,
+    clear_template_cache,
 )
 
 
@@ -252,6 +260,156 @@ class TestSimpleStringTemplate(unittest.TestCase):
             'Hello World, active!'
         )
 
+    def test_nested_conditions_render(self):
+        t, _ = self._make('<${if:a}A${if:b}B${else}b${endif}${else}-${endif}>')
+        self.assertEqual(t.render_template({'a': True, 'b': True}), '<AB>')
+        self.assertEqual(t.render_template({'a': True, 'b': False}), '<Ab>')
+        self.assertEqual(t.render_template({'a': False, 'b': True}), '<->')
+
+    def test_escaped_dollar(self):
+        t, _ = self._make('$$${price} $$x')
+        self.assertEqual(t.render_template({'price': 3}), '$3 $x')
+
+    def test_inserted_content_is_not_rescanned(self):
+        t, _ = self._make('${if:flag}[${content}]${endif}')
+        content = '${title} ' + _default_ifmarks['iffalse'] + 'x' \
+            + _default_ifmarks['endif']
+        self.assertEqual(
+            t.render_template({'flag': True, 'content': content, 'title': 'T'}),
+            '[' + content + ']'
+        )
+
+    def test_unbalanced_if_raises_at_initialize(self):
+        with self.assertRaises(ValueError):
+            self._make('${if:flag}never closed')
+        with self.assertRaises(ValueError):
+            self._make('stray ${endif}')
+        with self.assertRaises(ValueError):
+            self._make('stray ${else}')
+        with self.assertRaises(ValueError):
+            self._make('${if:a}x${else}y${else}z${endif}')
+
+    def test_invalid_placeholder_raises_at_initialize(self):
+        with self.assertRaises(ValueError):
+            self._make('line one\nprice: $ 3')
+
+
+# ---------------------------------------------------------------------------
+# compile_template / render_compiled_template
+# ---------------------------------------------------------------------------
+
+class _DictVars:
+    def __init__(self, d):
+        self.d = d
+        self.looked_up = []
+    def __getitem__(self, key):
+        self.looked_up.append(key)
+        return self.d[key]
+    def get_config_value(self, key):
+        return self.d.get(key)
+
+class TestCompiledTemplate(unittest.TestCase):
+
+    def test_compile_structure(self):
+        self.assertEqual(
+            compile_template('a${x}b${if:c}d${else}e${endif}'),
+            ['a', ('var', 'x'), 'b', ('if', 'c', ['d'], ['e'])]
+        )
+
+    def test_render_skips_unselected_branch(self):
+        compiled = compile_template('${if:c}${x}${else}${y}${endif}')
+        v = _DictVars({'c': True, 'x': 'X'})
+        self.assertEqual(render_compiled_template(compiled, v), 'X')
+        self.assertEqual(v.looked_up, ['x'])
+
+    def test_render_repeatedly(self):
+        compiled = compile_template('<${x}>')
+        self.assertEqual(render_compiled_template(compiled, _DictVars({'x': 1})), '<1>')
+        self.assertEqual(render_compiled_template(compiled, _DictVars({'x': 2})), '<2>')
+
+
+
+# ---------------------------------------------------------------------------
+# template caching
+# ---------------------------------------------------------------------------
+
+class _CountingResourceAccessor(ResourceAccessor):
+    def __init__(self, template_path):
+        super().__init__()
+        self.template_path = template_path
+        self.read_files = []
+        self.probed_files = []
+
+    def read_file(self, fpath, fname, ftype, flm_run_info, binary=False):
+        self.read_files.append(fname)
+        return super().read_file(fpath, fname, ftype, flm_run_info, binary=binary)
+
+    def file_exists(self, fpath, fname, ftype, flm_run_info):
+        self.probed_files.append(fname)
+        return super().file_exists(fpath, fname, ftype, flm_run_info)
+
+
+class TestDocumentTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        clear_template_cache()
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+        self.emptydir = os.path.join(self.tmpdir, 'empty')
+        self.tpldir = os.path.join(self.tmpdir, 'templates')
+        os.makedirs(os.path.join(self.emptydir, 'html'))
+        os.makedirs(os.path.join(self.tpldir, 'html'))
+        self._write('html/mytpl.yaml', 'default_config:\n  title: Default\n')
+        self._write('html/mytpl.html', '<h1>${title}</h1>${content}')
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+        clear_template_cache()
+
+    def _write(self, fname, content, folder=None):
+        fullname = os.path.join(folder or self.tpldir, fname)
+        with open(fullname, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return fullname
+
+    def _render(self, ra):
+        tpl = DocumentTemplate('mytpl', 'html', {}, {'resource_accessor': ra}, None)
+        return tpl.render_template([{'content': 'C'}])
+
+    def test_template_files_read_once(self):
+        ra = _CountingResourceAccessor([self.emptydir, self.tpldir])
+        self.assertEqual(self._render(ra), '<h1>Default</h1>C')
+        self.assertEqual(ra.read_files, ['html/mytpl.yaml', 'html/mytpl.html'])
+        ra = _CountingResourceAccessor([self.emptydir, self.tpldir])
+        self.assertEqual(self._render(ra), '<h1>Default</h1>C')
+        self.assertEqual(ra.read_files, [])
+
+    def test_modified_template_is_reloaded(self):
+        ra = _CountingResourceAccessor([self.tpldir])
+        self.assertEqual(self._render(ra), '<h1>Default</h1>C')
+        fname = self._write('html/mytpl.html', '<h2>${title}</h2>${content}')
+        os.utime(fname, ns=(0, 0)) # make sure the stamp changes
+        self.assertEqual(self._render(ra), '<h2>Default</h2>C')
+        self.assertEqual(ra.read_files[-1], 'html/mytpl.html')
+
+    def test_missing_files_not_probed_again(self):
+        ra = _CountingResourceAccessor([self.emptydir, self.tpldir])
+        self._render(ra)
+        self.assertIn('html/mytpl', ra.probed_files)
+        ra = _CountingResourceAccessor([self.emptydir, self.tpldir])
+        self._render(ra)
+        # only the file that exists is checked again
+        self.assertEqual(ra.probed_files, ['html/mytpl.yaml'])
+
+    def test_new_file_in_probed_folder_is_found(self):
+        ra = _CountingResourceAccessor([self.emptydir, self.tpldir])
+        self.assertEqual(self._render(ra), '<h1>Default</h1>C')
+        self._write('html/mytpl.yaml', 'default_config:\n  title: Other\n',
+                    folder=self.emptydir)
+        self._write('html/mytpl.html', '<p>${title}</p>', folder=self.emptydir)
+        os.utime(os.path.join(self.emptydir, 'html'), ns=(0, 0))
+        self.assertEqual(self._render(ra), '<p>Other</p>')
+
 
 if __name__ == '__main__':
     unittest.main()
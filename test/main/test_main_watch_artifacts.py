@@ -0,0 +1,124 @@
+import unittest
+import os
+import os.path
+import gzip
+import tempfile
+import threading
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flm.main.watch_artifacts import ArtifactStore
+
+
+class TestArtifactStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(fallback_dir=self.tmpdir.name)
+
+        store = self.store
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                store.send_response(self, self.path)
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('localhost', 0), Handler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever,
+                                              daemon=True)
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def _get(self, path, headers=None):
+        conn = http.client.HTTPConnection('localhost', self.server.server_address[1])
+        try:
+            conn.request('GET', path, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            conn.close()
+
+    def test_put_get(self):
+        artifact = self.store.put('/index.html', '<html>é</html>')
+        self.assertIs(self.store.get('index.html'), artifact)
+        self.assertEqual(artifact.data, '<html>é</html>'.encode('utf-8'))
+        self.assertEqual(artifact.mime_type, 'text/html; charset=utf-8')
+        self.assertIsNone(self.store.get('other.html'))
+
+        status, headers, body = self._get('/index.html')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, '<html>é</html>'.encode('utf-8'))
+        self.assertEqual(headers['Content-Type'], 'text/html; charset=utf-8')
+        self.assertEqual(headers['ETag'], artifact.etag)
+
+    def test_conditional_get(self):
+        artifact = self.store.put('index.html', '<html>A</html>')
+        status, headers, body = self._get('/index.html',
+                                          headers={'If-None-Match': artifact.etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+        new_artifact = self.store.put('index.html', '<html>B</html>')
+        self.assertNotEqual(new_artifact.etag, artifact.etag)
+        status, headers, body = self._get('/index.html',
+                                          headers={'If-None-Match': artifact.etag})
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'<html>B</html>')
+
+    def test_gzip(self):
+        content = '<html>' + 'Hello world. ' * 1000 + '</html>'
+        self.store.put('index.html', content)
+        status, headers, body = self._get('/index.html',
+                                          headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertLess(len(body), len(content))
+        self.assertEqual(gzip.decompress(body), content.encode('utf-8'))
+
+        # not compressed if the client doesn't accept it
+        status, headers, body = self._get('/index.html')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, content.encode('utf-8'))
+
+    def test_fallback_dir(self):
+        fname = os.path.join(self.tmpdir.name, 'gr1.png')
+        with open(fname, 'wb') as f:
+            f.write(b'PNG1')
+        artifact = self.store.get('gr1.png')
+        self.assertEqual(artifact.data, b'PNG1')
+        self.assertEqual(artifact.mime_type, 'image/png')
+        self.assertIs(self.store.get('gr1.png'), artifact)
+
+        with open(fname, 'wb') as f:
+            f.write(b'PNG22')
+        self.assertEqual(self.store.get('gr1.png').data, b'PNG22')
+
+        status, headers, body = self._get('/gr1.png')
+        self.assertEqual((status, body), (200, b'PNG22'))
+
+        # removed files are forgotten
+        os.remove(fname)
+        self.assertIsNone(self.store.get('gr1.png'))
+        self.assertEqual(self.store._file_artifacts, {})
+
+    def test_fallback_dir_text_charset(self):
+        with open(os.path.join(self.tmpdir.name, 'notes.txt'), 'wb') as f:
+            f.write('é'.encode('utf-8'))
+        status, headers, body = self._get('/notes.txt')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(self.store.get('notes.txt').mime_type,
+                         self.store.put('other.txt', 'é').mime_type)
+
+    def test_not_found(self):
+        status, headers, body = self._get('/missing.png')
+        self.assertEqual(status, 404)
+        self.assertIsNone(self.store.get('../' + os.path.basename(self.tmpdir.name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
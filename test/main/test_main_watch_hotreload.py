@@ -1,4 +1,172 @@
 import unittest
+import os.path
+import re
+import tempfile
+
+import flm.main
+
+from flm.main.watch_hotreload import (
+    split_html_blocks,
+    compute_html_blocks_patches,
+    HotReloaderHtml,
+    template_hr_begin_tag,
+    template_hr_end_tag,
+)
+
+
+class _FakeHotReloadServer:
+    def __init__(self):
+        self.sent = []
+
+    def get_host(self):
+        return 'localhost'
+
+    def get_port(self):
+        return 12345
+
+    def send_update_info(self, update_info):
+        self.sent.append(update_info)
+
+
+def _page(content_html):
+    return (
+        '<html><body><article id="Main">' + template_hr_begin_tag
+        + content_html + template_hr_end_tag + '</article></body></html>'
+    )
+
+
+class TestSplitHtmlBlocks(unittest.TestCase):
+
+    def test_simple(self):
+        self.assertEqual(
+            split_html_blocks(
+                '\n<p>Hello <em>world</em></p>\n<h1 id="sec-a">A</h1>\n'
+                '<hr/>\n<br>\n<div><p>x<br>y</p><!-- comment --></div>\n'
+            ),
+            [ '<p>Hello <em>world</em></p>', '<h1 id="sec-a">A</h1>', '<hr/>',
+              '<br>', '<div><p>x<br>y</p><!-- comment --></div>' ]
+        )
+
+    def test_attributes_and_scripts(self):
+        self.assertEqual(
+            split_html_blocks(
+                '<p title="a > b">x</p>'
+                '<script type="application/json">{"x": "</p><p>"}</script>'
+            ),
+            [ '<p title="a > b">x</p>',
+              '<script type="application/json">{"x": "</p><p>"}</script>' ]
+        )
+
+    def test_cannot_split(self):
+        self.assertIsNone(split_html_blocks('<p>x</p> text <p>y</p>'))
+        self.assertIsNone(split_html_blocks('<p>x</p><!-- comment -->'))
+        self.assertIsNone(split_html_blocks('<p>x</div>'))
+        self.assertIsNone(split_html_blocks('<p>x'))
+
+
+class TestComputeHtmlBlocksPatches(unittest.TestCase):
+
+    def test_no_change(self):
+        blocks = [ '<p>a</p>', '<p>b</p>' ]
+        self.assertEqual(compute_html_blocks_patches(blocks, list(blocks)), [])
+
+    def test_changed_block(self):
+        self.assertEqual(
+            compute_html_blocks_patches(
+                [ '<p>a</p>', '<p>b</p>', '<p>c</p>' ],
+                [ '<p>a</p>', '<p>B</p>', '<p>c</p>' ],
+            ),
+            [ { 'index': 1, 'remove': 1, 'html': '<p>B</p>' } ]
+        )
+
+    def test_insert_and_delete(self):
+        self.assertEqual(
+            compute_html_blocks_patches(
+                [ '<p>a</p>', '<p>b</p>', '<p>c</p>', '<p>d</p>' ],
+                [ '<p>a</p>', '<p>x</p>', '<p>y</p>', '<p>b</p>', '<p>d</p>' ],
+            ),
+            [ { 'index': 1, 'remove': 0, 'html': '<p>x</p><p>y</p>' },
+              { 'index': 2, 'remove': 1, 'html': '' } ]
+        )
+
+    def test_sourcepaths(self):
+        def p(text, line):
+            return (
+                f'<p data-sourcepath="[&quot;a.flm&quot;, {line}, 0]">{text}'
+                f'<span data-sourcepath="[&quot;a.flm&quot;, {line}, 2]">!</span></p>'
+            )
+        self.assertEqual(
+            compute_html_blocks_patches(
+                [ p('a', 1), p('b', 3), p('c', 5) ],
+                [ p('a', 1), p('A', 1), p('b', 4), p('c', 6) ],
+            ),
+            [ { 'index': 1, 'remove': 0, 'html': p('A', 1) },
+              { 'index': 1, 'sourcepaths': [ '["a.flm", 4, 0]', '["a.flm", 4, 2]' ] },
+              { 'index': 2, 'sourcepaths': [ '["a.flm", 6, 0]', '["a.flm", 6, 2]' ] } ]
+        )
+
+
+class TestHotReloaderHtml(unittest.TestCase):
+
+    def test_sends_patches(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'index.html')
+            paragraphs = [ f'<p>Paragraph number {j}.</p>' for j in range(10) ]
+            content = _page('\n'.join(paragraphs))
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+            server = _FakeHotReloadServer()
+            hotreloader = HotReloaderHtml(server, 'html', output)
+            hotreloader.inject_hotreload_js()
+            with open(output, encoding='utf-8') as f:
+                self.assertIn('})(window,"localhost",12345,0);', f.read())
+
+            paragraphs[4] = '<p>Changed paragraph.</p>'
+            hotreloader.new_run_send_update(info={},
+                                            content=_page('\n'.join(paragraphs)))
+            self.assertEqual(
+                server.sent[-1],
+                {
+                    'action': 'patch-main-content',
+                    'base_version': 0,
+                    'version': 1,
+                    'num_blocks_before': 10,
+                    'patches': [
+                        { 'index': 4, 'remove': 1, 'html': '<p>Changed paragraph.</p>' }
+                    ],
+                }
+            )
+
+            # large changes -> full content
+            new_content_html = '\n'.join([ '<p>New content</p>' ] * 10)
+            hotreloader.new_run_send_update(info={}, content=_page(new_content_html))
+            self.assertEqual(
+                server.sent[-1],
+                {
+                    'action': 'update-main-content',
+                    'content_html': new_content_html,
+                    'version': 2,
+                }
+            )
+
+
+class TestHotReloadInjectBundle(unittest.TestCase):
+
+    # The shipped client bundle is built from watch_hotreload_inject.ts with
+    # `yarn build` in flm/main/.  Check that it wasn't left behind by a change
+    # to the messages that the server sends.
+    def test_bundle_handles_server_messages(self):
+        with open(os.path.join(os.path.dirname(flm.main.__file__), 'dist',
+                               'watch_hotreload_inject.js'), encoding='utf-8') as f:
+            bundle = f.read()
+        for action in ('update-main-content', 'patch-main-content',
+                       'error-display', 'set-compiling-state'):
+            self.assertIn(f'"{action}"', bundle)
+        for key in ('action', 'content_html', 'version', 'base_version',
+                    'num_blocks_before', 'patches', 'index', 'remove', 'html',
+                    'sourcepaths', 'state'):
+            self.assertRegex(bundle, r'\.' + re.escape(key) + r'\b')
 
 
 if __name__ == '__main__':
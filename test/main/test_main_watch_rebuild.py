@@ -0,0 +1,189 @@
+import unittest
+import os
+import os.path
+import tempfile
+import threading
+import time
+
+from flm.main.main import Main
+from flm.main.run import RunDependencies
+from flm.main.watch_rebuild import (
+    get_earliest_stage,
+    AdaptiveDebounce,
+    DependencyWatcher,
+)
+
+
+def _write(fname, content):
+    with open(fname, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+class TestRunDependencies(unittest.TestCase):
+
+    def test_stages(self):
+        deps = RunDependencies()
+        deps.add('doc.flm', 'input')
+        deps.add('fig.png', 'graphics')
+        deps.add('tpl.html', 'template_content')
+        deps.add('data.yaml', 'cells_data')
+
+        self.assertEqual(deps.get_file_stage('fig.png'), 'render')
+        self.assertEqual(deps.get_file_stage(os.path.abspath('tpl.html')), 'postprocess')
+        self.assertEqual(deps.get_file_stage('data.yaml'), 'load')
+        self.assertIsNone(deps.get_file_stage('other.png'))
+
+        self.assertEqual(deps.get_invalidated_stage(['tpl.html', 'fig.png']), 'render')
+        self.assertEqual(deps.get_invalidated_stage(['tpl.html', 'doc.flm']), 'load')
+        self.assertIsNone(deps.get_invalidated_stage(['other.png']))
+
+        # a file read both as a graphics file and as a template
+        deps.add('tpl.html', 'graphics')
+        self.assertEqual(deps.get_file_stage('tpl.html'), 'render')
+
+        deps.forget_stages_from('render')
+        self.assertEqual(sorted(os.path.basename(f) for f in deps.files),
+                         ['data.yaml', 'doc.flm'])
+
+    def test_changed_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'a.flm')
+            _write(fname, 'Hello')
+            deps = RunDependencies()
+            deps.add(fname, 'input')
+            deps.add(os.path.join(tmpdir, 'missing.yaml'), 'config')
+            self.assertEqual(deps.get_changed_files(), [])
+            _write(fname, 'Hello world')
+            self.assertEqual(deps.get_changed_files(), [fname])
+
+
+class TestRunRecordsDependencies(unittest.TestCase):
+
+    maxDiff = None
+
+    def test_dependencies_and_rerun(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = os.path.realpath(tmpdir)
+            os.makedirs(os.path.join(tmpdir, 'html'))
+            _write(os.path.join(tmpdir, 'html', 'tpl.yaml'),
+                   'template_engine: flm.main.template.SimpleStringTemplate\n')
+            _write(os.path.join(tmpdir, 'html', 'tpl.html'),
+                   '<main>${content}</main>')
+            _write(os.path.join(tmpdir, 'extra.yaml'),
+                   'flm:\n  parsing:\n    dollar_inline_math_mode: true\n')
+            _write(os.path.join(tmpdir, 'doc.flm'),
+                   '---\n$import: extra.yaml\n---\nHello $x$.\n')
+
+            m = Main(files=[os.path.join(tmpdir, 'doc.flm')], format='html',
+                     template='tpl')
+            run_object = m.make_run_object()
+            try:
+                result, _ = run_object.run()
+                self.assertEqual(
+                    result,
+                    r'<main>Hello <span class="inline-math">\(x\)</span>.</main>'
+                )
+                self.assertEqual(
+                    { os.path.relpath(fullpath, tmpdir): ftypes
+                      for (fullpath, (ftypes, stamp)) in m.dependencies.files.items() },
+                    {
+                        'doc.flm': {'input'},
+                        'extra.yaml': {'config'},
+                        os.path.join('html', 'tpl.yaml'): {'template_info'},
+                        os.path.join('html', 'tpl.html'): {'template_content'},
+                    }
+                )
+
+                # only redo the templating after the template changed
+                _write(os.path.join(tmpdir, 'html', 'tpl.html'),
+                       '<article>${content}</article>')
+                m.dependencies.forget_stages_from('postprocess')
+                result, _ = run_object.run(rerun_from_stage='postprocess')
+                self.assertEqual(
+                    result,
+                    r'<article>Hello <span class="inline-math">\(x\)</span>.</article>'
+                )
+                self.assertIn(os.path.join(tmpdir, 'html', 'tpl.html'),
+                              m.dependencies.files)
+
+                result, _ = run_object.run(rerun_from_stage='render')
+                self.assertEqual(
+                    result,
+                    r'<article>Hello <span class="inline-math">\(x\)</span>.</article>'
+                )
+            finally:
+                run_object.cleanup()
+
+    def test_rerun_requires_run(self):
+        m = Main(flm_content='Hello', format='html')
+        run_object = m.make_run_object()
+        with self.assertRaises(ValueError):
+            run_object.run(rerun_from_stage='render')
+        run_object.run()
+        with self.assertRaises(ValueError):
+            run_object.run(rerun_from_stage='load')
+
+
+class TestAdaptiveDebounce(unittest.TestCase):
+
+    def test_delay(self):
+        debounce = AdaptiveDebounce(min_delay=0.1, max_delay=2.0,
+                                    build_time_factor=0.5, smoothing=0.5)
+        self.assertEqual(debounce.get_delay(), 2.0)
+        debounce.add_build_duration(0.01)
+        self.assertEqual(debounce.get_delay(), 0.1)
+        debounce.add_build_duration(1.19)
+        self.assertAlmostEqual(debounce.get_delay(), 0.3)
+        for _ in range(10):
+            debounce.add_build_duration(30)
+        self.assertEqual(debounce.get_delay(), 2.0)
+
+    def test_earliest_stage(self):
+        self.assertEqual(get_earliest_stage('postprocess', None, 'render'), 'render')
+        self.assertEqual(get_earliest_stage('postprocess', 'load'), 'load')
+        self.assertIsNone(get_earliest_stage(None, None))
+
+
+class TestDependencyWatcher(unittest.TestCase):
+
+    def test_watch(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = os.path.realpath(tmpdir)
+            fname_a = os.path.join(tmpdir, 'a.flm')
+            fname_b = os.path.join(tmpdir, 'b.png')
+            fname_other = os.path.join(tmpdir, 'other.txt')
+            for fname in (fname_a, fname_b, fname_other):
+                _write(fname, 'x')
+
+            deps = RunDependencies()
+            deps.add(fname_a, 'input')
+            deps.add(fname_b, 'graphics')
+
+            debounce = AdaptiveDebounce(min_delay=0.05)
+            debounce.add_build_duration(0)
+            stop_event = threading.Event()
+            watcher = DependencyWatcher([deps], debounce=debounce,
+                                        stop_event=stop_event)
+
+            def _touch_files():
+                time.sleep(0.5)
+                _write(fname_other, 'y')
+                _write(fname_b, 'y')
+
+            thread = threading.Thread(target=_touch_files, daemon=True)
+            thread.start()
+            timer = threading.Timer(10, stop_event.set)
+            timer.start()
+            try:
+                changed_files = next(iter(watcher))
+            finally:
+                stop_event.set()
+                timer.cancel()
+                thread.join()
+
+            self.assertEqual(changed_files, {fname_b})
+            self.assertEqual(watcher.get_changed_stage(changed_files), 'render')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,22 +1,26 @@
 import unittest
 
 from pylatexenc.latexnodes import LatexWalkerLocatedError
+from pylatexenc.latexnodes.nodes import LatexNodeList
 
 from flm.flmenvironment import make_standard_environment
 from flm.stdfeatures import standard_features
 from flm.feature.cells import (
     CellIndexRangeModel,
     CellPlacementModel,
+    CellModel,
     CellPlacementsMappingModel,
     CellsModel,
     CellsEnvironment,
     FeatureCells,
     CellMacro,
     CelldataMacroSpec,
+    CelldatafileMacroSpec,
     MergeMacroSpec,
     LatexTabularRowSeparatorSpec,
     LatexTabularColumnSeparatorSpec,
     _splfysidews,
+    _split_cells_data_file_contents,
 )
 from flm.fragmentrenderer.html import HtmlFragmentRenderer
 from flm.fragmentrenderer.latex import LatexFragmentRenderer
@@ -246,6 +250,61 @@ class TestCellsModelOperations(unittest.TestCase):
         self.assertTrue('cells_size=' in r)
         self.assertTrue('cells_data=' in r)
 
+    def _mk_model_with_cells(self, cells_size, placements):
+        m = CellsModel()
+        for (r0, r1, c0, c1) in placements:
+            m.cells_data.append(CellModel(
+                placement=CellPlacementModel(
+                    row_range=CellIndexRangeModel(r0, r1),
+                    col_range=CellIndexRangeModel(c0, c1),
+                ),
+                styles=[],
+                content_nodes=LatexNodeList([]),
+            ))
+        m.cells_size = cells_size
+        m.finalize()
+        return m
+
+    def test_get_row_items(self):
+        # A A . B
+        # A A . C
+        # . D D D
+        m = self._mk_model_with_cells([3, 4], [
+            (0, 2, 0, 2), (0, 1, 3, 4), (1, 2, 3, 4), (2, 3, 1, 4),
+        ])
+        A, B, C, D = m.cells_data
+        self.assertEqual(m.get_grid_size(), (3, 4))
+        self.assertEqual(
+            m.get_row_items(0),
+            [ ('cell', 0, 2, A), ('empty', 2, 3, None), ('cell', 3, 4, B) ]
+        )
+        self.assertEqual(
+            m.get_row_items(1),
+            [ ('covered', 0, 2, A), ('empty', 2, 3, None), ('cell', 3, 4, C) ]
+        )
+        self.assertEqual(
+            m.get_row_items(2),
+            [ ('empty', 0, 1, None), ('cell', 1, 4, D) ]
+        )
+
+    def test_get_grid_data(self):
+        m = self._mk_model_with_cells([2, 3], [ (0, 2, 0, 1), (0, 1, 1, 3) ])
+        A, B = m.cells_data
+        self.assertIsNone(m.grid_data)
+        self.assertEqual(
+            m.get_grid_data(),
+            [
+                [ {'cell': A, 'is_topleft': True},
+                  {'cell': B, 'is_topleft': True},
+                  {'cell': B, 'is_topleft': False}, ],
+                [ {'cell': A, 'is_topleft': False}, None, None, ],
+            ]
+        )
+
+    def test_finalize_overlap_raises(self):
+        with self.assertRaises(ValueError):
+            self._mk_model_with_cells([2, 2], [ (0, 2, 0, 1), (1, 2, 0, 2) ])
+
 
 # ---------------------------------------------------------------
 # Spec classes
@@ -711,5 +770,181 @@ class TestCellsRecomposer(unittest.TestCase):
         self.assertTrue('City' in result['latex'])
 
 
+# ---------------------------------------------------------------
+# External data files
+# ---------------------------------------------------------------
+
+
+class _FakeResourceInfo:
+    def __init__(self, files):
+        self.files = files
+        self.read_files = []
+
+    def read_resource_file(self, fname, ftype, binary=False):
+        self.read_files.append( (fname, ftype) )
+        return self.files[fname]
+
+
+def render_doc_with_files(environ, flm_input, files, fr_cls=HtmlFragmentRenderer):
+    resource_info = _FakeResourceInfo(files)
+    frag = environ.make_fragment(flm_input.strip(), resource_info=resource_info)
+    doc = environ.make_document(frag.render)
+    fr = fr_cls()
+    result, _ = doc.render(fr)
+    return result, frag, resource_info
+
+
+class TestCellsDataFile(unittest.TestCase):
+
+    maxDiff = None
+
+    def test_split_csv(self):
+        self.assertEqual(
+            _split_cells_data_file_contents('a,b\r\n\n1,2\n', ','),
+            [['a', 'b'], ['1', '2']]
+        )
+
+    def test_split_csv_quoted(self):
+        self.assertEqual(
+            _split_cells_data_file_contents(
+                'x,"a, ""b"""\n"multi\nline",3\n', ','
+            ),
+            [['x', 'a, "b"'], ['multi\nline', '3']]
+        )
+
+    def test_split_tsv(self):
+        self.assertEqual(
+            _split_cells_data_file_contents('a\t"b\n1\t2', '\t', quoting=False),
+            [['a', '"b'], ['1', '2']]
+        )
+
+    def test_celldatafile_csv(self):
+        environ = mk_flm_environ()
+        result, frag, resource_info = render_doc_with_files(environ, r'''
+\begin{cells}
+\celldata<H>{Name & Value}
+\celldatafile{data/values.csv}
+\end{cells}''', {
+            'data/values.csv': 'alpha, 1.5\nbeta,-2e3\n',
+        })
+        self.assertEqual(resource_info.read_files,
+                         [('data/values.csv', 'cells_data')])
+        self.assertEqual(
+            result,
+            '<table class="cells">'
+            '<tr>'
+            '<th class="cell cellstyle-H celltbledge-top celltbledge-left"><p>Name</p></th>'
+            '<th class="cell cellstyle-H celltbledge-top celltbledge-right"><p>Value</p></th>'
+            '</tr>'
+            '<tr>'
+            '<td class="cell celltbledge-left">alpha</td>'
+            '<td class="cell celltbledge-right">1.5</td>'
+            '</tr>'
+            '<tr>'
+            '<td class="cell celltbledge-left celltbledge-bottom">beta</td>'
+            '<td class="cell celltbledge-bottom celltbledge-right">-2e3</td>'
+            '</tr>'
+            '</table>'
+        )
+
+    def test_celldatafile_only_markup_is_parsed(self):
+        environ = mk_flm_environ()
+        _, frag, _ = render_doc_with_files(environ, r'''
+\begin{cells}
+\celldatafile{t.tsv}
+\end{cells}''', {
+            't.tsv': '1 < 2\t\\emph{x}\t\t"q"\n',
+        })
+        cells_model = frag.nodes[0].flm_cells_model
+        self.assertEqual(len(cells_model.cells_data), 3)
+        c1, c2, c3 = cells_model.cells_data
+        self.assertIsNone(c1.content_nodes)
+        self.assertEqual(c1.content_value, '1 < 2')
+        self.assertIsNotNone(c2.content_nodes)
+        self.assertEqual(c2.content_nodes.latex_verbatim(), r'\emph{x}')
+        # empty value is skipped
+        self.assertEqual(c3.placement.col_range.start, 3)
+        self.assertIsNotNone(c3.content_nodes)
+
+    def test_celldatafile_render_html(self):
+        environ = mk_flm_environ()
+        result, _, _ = render_doc_with_files(environ, r'''
+\begin{cells}
+\celldatafile<H,>{t.csv}
+\end{cells}''', {
+            't.csv': 'a<b,\\emph{x}\n',
+        })
+        self.assertEqual(
+            result,
+            '<table class="cells">'
+            '<tr>'
+            '<th class="cell cellstyle-H celltbledge-top celltbledge-left '
+            'celltbledge-bottom">a&lt;b</th>'
+            '<td class="cell celltbledge-top celltbledge-bottom celltbledge-right">'
+            '<span class="textit">x</span></td>'
+            '</tr>'
+            '</table>'
+        )
+
+    def test_celldatafile_render_latex(self):
+        environ = mk_flm_environ()
+        result, _, _ = render_doc_with_files(environ, r'''
+\begin{cells}
+\celldatafile{t.csv}
+\end{cells}''', {
+            't.csv': 'a<b,\\emph{x}\n',
+        }, fr_cls=LatexFragmentRenderer)
+        self.assertTrue('\\toprule\na\\ensuremath{<}b&\\textit{x}\\\\\n\\bottomrule' in result)
+
+    def test_celldatafile_placement_mapping(self):
+        environ = mk_flm_environ()
+        _, frag, _ = render_doc_with_files(environ, r'''
+\begin{cells}
+\cell{X}
+\celldatafile[2;3,5]{t.csv}
+\end{cells}''', {
+            't.csv': 'a,b\n',
+        })
+        cells_model = frag.nodes[0].flm_cells_model
+        self.assertEqual(
+            [ (repr(c.placement), c.content_value) for c in cells_model.cells_data ],
+            [ ('1,1', None), ('2,3', 'a'), ('2,5', 'b') ]
+        )
+
+    def test_celldatafile_custom_specials(self):
+        environ = mk_flm_environ(substmacros_definitions={
+            'specials': {
+                '!': {
+                    'content': '[bang]',
+                }
+            }
+        })
+        result, frag, _ = render_doc_with_files(environ, r'''
+\begin{cells}
+\celldatafile{t.csv}
+\end{cells}''', {
+            't.csv': 'a!,b\n',
+        })
+        cells_model = frag.nodes[0].flm_cells_model
+        c1, c2 = cells_model.cells_data
+        self.assertIsNotNone(c1.content_nodes)
+        self.assertIn('a[bang]', result)
+
+    def test_celldatafile_missing_file_raises(self):
+        environ = mk_flm_environ()
+        with self.assertRaises(LatexWalkerLocatedError) as cm:
+            render_doc_with_files(environ, r'''\begin{cells}
+\celldatafile{missing.csv}
+\end{cells}''', {})
+        self.assertIn('missing.csv', str(cm.exception))
+
+    def test_celldatafile_without_resource_accessor_raises(self):
+        environ = mk_flm_environ()
+        with self.assertRaises(LatexWalkerLocatedError):
+            render_doc(environ, r'''\begin{cells}
+\celldatafile{t.csv}
+\end{cells}''')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from pylatexenc.latexnodes import LatexWalkerLocatedError
+from pylatexenc.latexnodes.nodes import LatexGroupNode
 
 from flm.flmenvironment import make_standard_environment
 from flm.stdfeatures import standard_features
@@ -780,6 +781,33 @@ Test: \notblank{#1}{\notblank{#2}{1NOBLK:#1,2NOBLK:#2}{1NOBLK:#1,2BLK}}{\notblan
             r'''Test: 1BLK,2BLK'''
         )
 
+    def test_subst_nested_macros_placeholders(self):
+
+        environ = mk_flm_environ(substmacros_definitions={
+            'macros': {
+                'inner': {
+                    'arguments_spec_list': '[{',
+                    'content': r'<\IfNoValueTF{#1}{#2}{#1:#2}>',
+                },
+                'outer': {
+                    'arguments_spec_list': '[{',
+                    'content': r'\IfNoValueTF{#1}{\inner{#2}}{\inner[#2]{#1}}!',
+                },
+            }
+        })
+
+        html_renderer = HtmlFragmentRenderer()
+
+        frag1 = environ.make_fragment(
+            r'''\outer{A} \outer[B]{C} \inner[D]{E}''',
+            standalone_mode=True
+        )
+
+        self.assertEqual(
+            frag1.render_standalone(html_renderer),
+            r'''&lt;A&gt;! &lt;C:B&gt;! &lt;D:E&gt;'''
+        )
+
 
 
 
@@ -1049,6 +1077,61 @@ class TestSubstMacrosErrors(unittest.TestCase):
             environ.make_fragment(r'\mymacro{hello}', standalone_mode=True)
 
 
+class TestSubstMacrosExpansionCost(unittest.TestCase):
+
+    def test_content_parsing_state_does_not_grow(self):
+        # Expanding a substitution macro many times must not make the latex
+        # context used to parse the replacement content grow, nor rebuild it
+        # for each invocation in the same parsing state.
+        environ = mk_flm_environ(substmacros_definitions={
+            'macros': {
+                'mymacro': {
+                    'arguments_spec_list': '[{',
+                    'default_argument_values': {
+                        1: r'\url{https://example.com/#2}',
+                    },
+                    'content': r'#2 (#1)',
+                },
+            }
+        })
+
+        spec = environ.latex_context.get_macro_spec('mymacro')
+        delta = spec.macro_content_substitutor_manager \
+            .get_macro_content_parsing_state_delta(environ)
+        num_delta_macros = len(delta.extend_latex_context['macros'])
+
+        def get_content_latex_contexts(n):
+            frag = environ.make_fragment(
+                ' '.join([ r'\mymacro{a}' ] * n),
+                standalone_mode=True,
+            )
+            return [
+                node.nodelist.parsing_state.latex_context
+                for node in frag.nodes
+                if node.isNodeType(LatexGroupNode)
+            ]
+
+        ctxs_few = get_content_latex_contexts(5)
+        ctxs_many = get_content_latex_contexts(200)
+
+        self.assertEqual(len(ctxs_few), 5)
+        self.assertEqual(len(ctxs_many), 200)
+        for ctxs in (ctxs_few, ctxs_many):
+            for ctx in ctxs:
+                self.assertIs(ctx, ctxs[0])
+
+        self.assertEqual(
+            len(ctxs_few[0].lookup_chain_maps['macros'].maps[0]),
+            len(ctxs_many[0].lookup_chain_maps['macros'].maps[0]),
+        )
+        self.assertEqual(len(delta.extend_latex_context['macros']), num_delta_macros)
+        self.assertIs(
+            spec.macro_content_substitutor_manager
+            .get_macro_content_parsing_state_delta(environ),
+            delta
+        )
+
+
 class TestSubstMacrosRecomposer(unittest.TestCase):
 
     maxDiff = None
@@ -515,5 +515,88 @@ class TestFLMDocumentEnableFeatures(unittest.TestCase):
         self.assertEqual(result, '<span class="textbf">Hello</span> world')
 
 
+### BEGIN_TEST_FLM_SKIP
+# no threads in Transcrypt
+
+import sys
+import concurrent.futures
+
+class TestFLMDocumentConcurrentRendering(unittest.TestCase):
+
+    maxDiff = None
+
+    def _src(self, j):
+        return r'''
+\section{Section ''' + str(j) + r'''}\label{sec:a}
+\hello{world ''' + str(j) + r'''} and \hello[Bye]{you}, with
+\(\vec{v}_{''' + str(j) + r'''}\)\footnote{Note ''' + str(j) + r''', see \ref{eq:x}.}.
+\begin{equation}\label{eq:x}
+  a_{''' + str(j) + r'''} = \vec{b}
+\end{equation}
+See \eqref{eq:x} and \ref{sec:a}.
+\begin{enumerate}
+\item One \textbf{''' + str(j) + r'''}
+\item Two
+\end{enumerate}
+\begin{defterm}{Term} Definition ''' + str(j) + r'''. \end{defterm}
+A \term{Term}.
+'''
+
+    def _make_environ(self):
+        return mk_flm_environ(
+            substmacros_definitions={
+                'macros': {
+                    'vec': {
+                        'arguments_spec_list': '{',
+                        'content': r'\mathbf{#1}',
+                    },
+                    'hello': {
+                        'arguments_spec_list': '[{',
+                        'default_argument_values': {'1': 'Hi'},
+                        'content': r'#1, \emph{#2}!',
+                    },
+                },
+            },
+        )
+
+    def _run_concurrently(self, fn, num_jobs):
+        expected = [ fn(k) for k in range(num_jobs) ]
+        # switch threads very often to make races more likely
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(8) as executor:
+                results = list(executor.map(fn, range(num_jobs)))
+        finally:
+            sys.setswitchinterval(switch_interval)
+        for k in range(num_jobs):
+            self.assertEqual(results[k], expected[k])
+
+    def test_parse_and_render_concurrently_shared_environment(self):
+        environ = self._make_environ()
+        def parse_and_render(k):
+            frag = environ.make_fragment(self._src(k), what=f'doc{k}')
+            doc = environ.make_document(frag.render)
+            result, _ = doc.render(HtmlFragmentRenderer())
+            return result
+        self._run_concurrently(parse_and_render, 32)
+
+    def test_render_shared_fragments_concurrently(self):
+        environ = self._make_environ()
+        fragments = [
+            environ.make_fragment(self._src(j), what=f'doc{j}')
+            for j in range(4)
+        ]
+        fragment_renderer = HtmlFragmentRenderer()
+        def render(k):
+            frag = fragments[k % len(fragments)]
+            doc = environ.make_document(frag.render)
+            result, _ = doc.render(fragment_renderer)
+            return result
+        self._run_concurrently(render, 32)
+
+### END_TEST_FLM_SKIP
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -96,7 +96,7 @@ class TestFLMDataDumper(unittest.TestCase):
                 'FLMLatexWalker': {
                     lw_reskey: {
                         '$type': 'FLMLatexWalker',
-                        'flm_text': r'\%',
+                        'flm_text': {'$reskey': '0', '$restype': 'FLMText'},
                         'input_lineno_colno_offsets': {},
                         'is_block_level': None,
                         'parsing_mode': None,
@@ -139,6 +139,9 @@ class TestFLMDataDumper(unittest.TestCase):
                         'value': '%',
                     },
                 },
+                'FLMText': {
+                    '0': r'\%',
+                },
             }
         )
 
@@ -473,6 +476,41 @@ class TestFLMDataDumperBasic(unittest.TestCase):
         self.assertEqual(len(dumper.get_data()['dumps']), 2)
 
 
+    def test_equal_parsing_states_are_interned(self):
+        env = mk_flm_environ()
+        dumper = flmdump.FLMDataDumper(environment=env)
+        f1 = env.make_fragment(r'One \emph{two} \(x\)', is_block_level=True)
+        f2 = env.make_fragment(r'Three \emph{four} \(y\)', is_block_level=True)
+        dumper.add_object_dump('f1', f1)
+        dumper.add_object_dump('f2', f2)
+        data = dumper.get_data()
+        # the two fragments' parsing states are distinct objects, but they
+        # are stored only once
+        self.assertIsNot(f1.nodes.parsing_state, f2.nodes.parsing_state)
+        self.assertEqual(
+            data['dumps']['f1']['nodes']['parsing_state'],
+            data['dumps']['f2']['nodes']['parsing_state'],
+        )
+        ps_dumps = [ json.dumps(ps) for ps in
+                     data['resources']['FLMParsingState'].values() ]
+        self.assertEqual(len(ps_dumps), len(dict.fromkeys(ps_dumps)))
+
+    def test_flm_text_stored_once(self):
+        env = mk_flm_environ()
+        dumper = flmdump.FLMDataDumper(environment=env)
+        text = r'A \textbf{rather} unique text'
+        dumper.add_object_dump('f1', env.make_fragment(text, standalone_mode=True))
+        dumper.add_object_dump('f2', env.make_fragment(text, standalone_mode=True))
+        data_json = json.dumps(dumper.get_data())
+        self.assertEqual(data_json.count(json.dumps(text)), 1)
+        loader = flmdump.FLMDataLoader(json.loads(data_json), environment=env)
+        lf1 = loader.get_object_dump('f1')
+        lf2 = loader.get_object_dump('f2')
+        self.assertEqual(lf1.flm_text, text)
+        self.assertEqual(lf2.flm_text, text)
+        self.assertEqual(lf1.nodes.latex_walker.s, text)
+
+
 class TestFLMDataLoaderBasic(unittest.TestCase):
 
     def test_get_keys(self):
@@ -493,6 +531,32 @@ class TestFLMDataLoaderBasic(unittest.TestCase):
         with self.assertRaises(ValueError):
             flmdump.FLMDataLoader(bad_data, environment=env)
 
+    def test_load_version_2_dump(self):
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        frag = env.make_fragment(r'Hello \textbf{world}', standalone_mode=True)
+        dumper = flmdump.FLMDataDumper(environment=env)
+        dumper.add_object_dump('frag', frag)
+        data = json.loads(json.dumps(dumper.get_data()))
+        # version 2 dumps have the source texts in place, without FLMText
+        # resources
+        texts = data['resources'].pop('FLMText')
+        def _inline_texts(x):
+            if isinstance(x, dict):
+                if x.get('$restype', None) == 'FLMText':
+                    return texts[x['$reskey']]
+                return { k: _inline_texts(v) for (k, v) in x.items() }
+            if isinstance(x, list):
+                return [ _inline_texts(v) for v in x ]
+            return x
+        data = _inline_texts(data)
+        data['_dump']['version'] = 2
+        loader = flmdump.FLMDataLoader(data, environment=env)
+        loaded_frag = loader.get_object_dump('frag')
+        self.assertEqual(loaded_frag.flm_text, r'Hello \textbf{world}')
+        self.assertEqual(loaded_frag.render_standalone(HtmlFragmentRenderer()),
+                         'Hello <span class="textbf">world</span>')
+
     def test_roundtrip_standalone_html(self):
         from flm.fragmentrenderer.html import HtmlFragmentRenderer
         env = mk_flm_environ()
@@ -536,7 +600,336 @@ class TestFLMDumpHelpers(unittest.TestCase):
         self.assertFalse(flmdump._is_known_serializable_object_type_names('FakeType'))
 
     def test_dump_version_is_int(self):
-        self.assertEqual(flmdump._dump_version, 2)
+        self.assertEqual(flmdump._dump_version, 3)
+
+
+### BEGIN_TEST_FLM_SKIP
+# binary dump format is only available in Python
+
+from flm import flmdumpbinary
+
+class TestFLMDumpBinary(unittest.TestCase):
+
+    maxDiff = None
+
+    def _dump_fragments(self, env, sources):
+        dumper = flmdump.FLMDataDumper(environment=env)
+        fragments = {}
+        for key, src in sources.items():
+            fragments[key] = env.make_fragment(src, standalone_mode=True)
+            dumper.add_object_dump(key, fragments[key])
+        return fragments, dumper.get_data()
+
+    def test_roundtrip_values(self):
+        data = {
+            'a': [None, True, False, 0, -1, 123456, -(2**40), 2**64, 1.5, 'é—x'],
+            'b': {'x': [], 'y': {}, 'z': ('t', 'u')},
+        }
+        for compress in (False, True):
+            self.assertEqual(
+                flmdumpbinary.load_binary(
+                    flmdumpbinary.dump_binary(data, compress=compress)
+                ),
+                {
+                    'a': [None, True, False, 0, -1, 123456, -(2**40), 2**64, 1.5,
+                          'é—x'],
+                    'b': {'x': [], 'y': {}, 'z': ['t', 'u']},
+                }
+            )
+
+    def test_roundtrip_render(self):
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        _, data = self._dump_fragments(env, {
+            'f1': r'Hello \textbf{world}',
+            'f2': r'A \emph{second} fragment, with math \(a+b\).',
+        })
+        for compress in (False, True):
+            binary_data = flmdumpbinary.dump_binary(data, compress=compress)
+            loader = flmdump.FLMDataLoader(flmdumpbinary.load_binary(binary_data),
+                                           environment=env)
+            self.assertEqual(sorted(loader.get_keys()), ['f1', 'f2'])
+            self.assertEqual(
+                loader.get_object_dump('f1').render_standalone(HtmlFragmentRenderer()),
+                'Hello <span class="textbf">world</span>'
+            )
+            self.assertEqual(
+                loader.get_object_dump('f2').render_standalone(HtmlFragmentRenderer()),
+                r'A <span class="textit">second</span> fragment, with math '
+                r'<span class="inline-math">\(a+b\)</span>.'
+            )
+
+    def test_same_data_up_to_resource_keys(self):
+        env = mk_flm_environ()
+        _, data = self._dump_fragments(env, {'f1': r'Hello \textbf{world}'})
+        loaded_data = flmdumpbinary.load_binary(flmdumpbinary.dump_binary(data))
+        self.assertEqual(
+            { restype: len(resdict) for restype, resdict in data['resources'].items() },
+            { restype: len(resdict)
+              for restype, resdict in loaded_data['resources'].items() },
+        )
+        # re-encoding the loaded data is stable
+        self.assertEqual(
+            flmdumpbinary.load_binary(flmdumpbinary.dump_binary(loaded_data)),
+            loaded_data
+        )
+
+    def test_smaller_than_json(self):
+        env = mk_flm_environ()
+        _, data = self._dump_fragments(env, {
+            f'f{j}': r'Hello \textbf{world} number ' + str(j) + '.'
+            for j in range(10)
+        })
+        self.assertTrue(
+            len(flmdumpbinary.dump_binary(data)) < len(json.dumps(data)) / 3
+        )
+
+    def test_lazy_loader_decodes_only_requested_dumps(self):
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        _, data = self._dump_fragments(env, {
+            'f1': r'Hello \textbf{world}',
+            'f2': r'Some \emph{other} fragment',
+        })
+        binary_data = flmdumpbinary.dump_binary(data)
+        loader = flmdumpbinary.FLMBinaryDataLoader(binary_data, environment=env)
+        self.assertEqual(sorted(loader.get_keys()), ['f1', 'f2'])
+        frag1 = loader.get_object_dump('f1')
+        self.assertEqual(
+            frag1.render_standalone(HtmlFragmentRenderer()),
+            'Hello <span class="textbf">world</span>'
+        )
+        decoded_strings = [ s for s in loader.binary_dump_reader.strings
+                            if s is not None ]
+        self.assertTrue('Hello ' in decoded_strings)
+        self.assertFalse(r'Some \emph{other} fragment' in decoded_strings)
+        self.assertFalse('other' in decoded_strings)
+
+    def test_lazy_loader_from_file(self):
+        import tempfile
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        _, data = self._dump_fragments(env, {'f1': r'Hello \textbf{world}'})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpb')
+            with open(fname, 'wb') as fw:
+                fw.write(flmdumpbinary.dump_binary(data))
+            loader = flmdumpbinary.FLMBinaryDataLoader.from_file(fname, environment=env)
+            frag = loader.get_object_dump('f1')
+            self.assertEqual(
+                frag.render_standalone(HtmlFragmentRenderer()),
+                'Hello <span class="textbf">world</span>'
+            )
+            with self.assertRaises(KeyError):
+                loader.get_object_dump('nonexistent')
+            with self.assertRaises(ValueError):
+                loader._get_resource_data('LatexNode', 'xyz')
+            mm = loader._mmap
+            loader.close()
+            self.assertTrue(mm.closed)
+            loader.close()
+            with self.assertRaises(ValueError):
+                loader.get_keys()
+            # objects that were already loaded remain valid
+            self.assertEqual(
+                frag.render_standalone(HtmlFragmentRenderer()),
+                'Hello <span class="textbf">world</span>'
+            )
+
+            with open(fname, 'wb') as fw:
+                fw.write(flmdumpbinary.dump_binary(data, compress=True))
+            with flmdumpbinary.FLMBinaryDataLoader.from_file(fname, environment=env) \
+                 as loader:
+                self.assertEqual(loader.get_keys(), ['f1'])
+                mm = loader._mmap
+            self.assertTrue(mm.closed)
+
+    def test_invalid_data_raises(self):
+        with self.assertRaises(ValueError):
+            flmdumpbinary.load_binary(b'not a dump')
+        binary_data = bytearray(flmdumpbinary.dump_binary({'x': 1}))
+        binary_data[0:8] = b'XXXXXXXX'
+        with self.assertRaises(ValueError):
+            flmdumpbinary.load_binary(bytes(binary_data))
+
+
+from flm import flmdumpstream
+
+class TestFLMDumpStream(unittest.TestCase):
+
+    maxDiff = None
+
+    def _write_stream_dump(self, env, fname, sources, **kwargs):
+        fragments = {}
+        with flmdumpstream.FLMDataStreamDumper(fname, environment=env,
+                                               **kwargs) as dumper:
+            for key, src in sources.items():
+                fragments[key] = env.make_fragment(src, standalone_mode=True)
+                dumper.add_object_dump(key, fragments[key])
+        return fragments
+
+    def test_roundtrip_render(self):
+        import tempfile
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            self._write_stream_dump(env, fname, {
+                'f1': r'Hello \textbf{world}',
+                'f2': r'A \emph{second} fragment, with math \(a+b\).',
+            })
+            self.assertTrue(os.path.exists(fname + '.index.json'))
+            loader = flmdumpstream.FLMDataStreamLoader(fname, environment=env)
+            self.assertEqual(sorted(loader.get_keys()), ['f1', 'f2'])
+            self.assertEqual(
+                loader.get_object_dump('f2').render_standalone(HtmlFragmentRenderer()),
+                r'A <span class="textit">second</span> fragment, with math '
+                r'<span class="inline-math">\(a+b\)</span>.'
+            )
+            self.assertEqual(
+                loader.get_object_dump('f1').render_standalone(HtmlFragmentRenderer()),
+                'Hello <span class="textbf">world</span>'
+            )
+            with self.assertRaises(KeyError):
+                loader.get_object_dump('nonexistent')
+            with self.assertRaises(ValueError):
+                loader._get_resource_data('LatexNode', 'xyz')
+            del loader
+
+    def test_same_data_as_dumper(self):
+        import tempfile
+        env = mk_flm_environ()
+        sources = {
+            'f1': r'Hello \textbf{world}',
+            'f2': r'Some \emph{other} fragment',
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            fragments = self._write_stream_dump(env, fname, sources)
+            dumper = flmdump.FLMDataDumper(environment=env)
+            for key, fragment in fragments.items():
+                dumper.add_object_dump(key, fragment)
+            data = dumper.get_data()
+            with open(fname, 'r', encoding='utf-8') as f:
+                lines = [ json.loads(line) for line in f ]
+            del fragments
+        self.assertEqual(lines[0], {'_dump': data['_dump']})
+        self.assertEqual([ line[1] for line in lines[1:] if line[0] == 'dump' ],
+                         ['f1', 'f2'])
+        # shared resources (e.g., spec infos) are written only once
+        self.assertEqual(
+            { restype: len(resdict) for restype, resdict in data['resources'].items() },
+            { restype: len([ line for line in lines[1:]
+                             if line[0] == 'resource' and line[1] == restype ])
+              for restype in data['resources'] },
+        )
+
+    def test_scan_without_index(self):
+        import tempfile
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            index_fname = os.path.join(tmpdir, 'my-index.json')
+            self._write_stream_dump(env, fname, {'f1': r'Hello \textbf{world}'},
+                                    index_filename=index_fname)
+            with open(index_fname, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            os.remove(index_fname)
+            loader = flmdumpstream.FLMDataStreamLoader(fname, environment=env)
+            self.assertEqual(loader.stream_index, index)
+            self.assertEqual(
+                loader.get_object_dump('f1').render_standalone(HtmlFragmentRenderer()),
+                'Hello <span class="textbf">world</span>'
+            )
+            del loader
+
+    def test_stale_index_not_used(self):
+        import tempfile
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            self._write_stream_dump(env, fname, {'a': r'Hello \textbf{world}'})
+
+            # new dump over the old one, not closed yet
+            dumper = flmdumpstream.FLMDataStreamDumper(fname, environment=env)
+            self.assertFalse(os.path.exists(fname + '.index.json'))
+            frag = env.make_fragment(r'Second \emph{dump}', standalone_mode=True)
+            dumper.add_object_dump('b', frag)
+            loader = flmdumpstream.FLMDataStreamLoader(fname, environment=env)
+            self.assertEqual(loader.get_keys(), ['b'])
+            self.assertEqual(
+                loader.get_object_dump('b').render_standalone(HtmlFragmentRenderer()),
+                'Second <span class="textit">dump</span>'
+            )
+            del loader
+            dumper.close()
+
+            # an index file that doesn't match the dump file is ignored
+            with open(fname + '.index.json', 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            index['dumps'] = {'a': 0}
+            index['size'] += 1
+            with open(fname + '.index.json', 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            loader = flmdumpstream.FLMDataStreamLoader(fname, environment=env)
+            self.assertEqual(loader.get_keys(), ['b'])
+            del loader
+
+    def test_loader_close(self):
+        import tempfile
+        from flm.fragmentrenderer.html import HtmlFragmentRenderer
+        env = mk_flm_environ()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            self._write_stream_dump(env, fname, {'f1': r'Hello \textbf{world}'})
+            with flmdumpstream.FLMDataStreamLoader(fname, environment=env) as loader:
+                stream_data = loader.stream_data
+                self.assertEqual(
+                    loader.get_object_dump('f1').render_standalone(HtmlFragmentRenderer()),
+                    'Hello <span class="textbf">world</span>'
+                )
+            self.assertTrue(stream_data.closed)
+            with self.assertRaises(ValueError):
+                loader.get_object_dump('f1')
+            loader.close() # no effect
+
+    def test_load_empty_file(self):
+        import tempfile
+        env = mk_flm_environ()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            with open(fname, 'wb'):
+                pass
+            with flmdumpstream.FLMDataStreamLoader(fname, environment=env) as loader:
+                self.assertEqual(loader.get_keys(), [])
+                with self.assertRaises(KeyError):
+                    loader.get_object_dump('f1')
+
+    def test_does_not_keep_dumped_objects_alive(self):
+        import tempfile
+        import weakref
+        import gc
+        env = mk_flm_environ()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'dump.flmdumpl')
+            with flmdumpstream.FLMDataStreamDumper(fname, environment=env) as dumper:
+                frag = env.make_fragment(r'Hello \textbf{world}', standalone_mode=True)
+                dumper.add_object_dump('f1', frag)
+                nodes_ref = weakref.ref(frag.nodes)
+                num_tracked = len(dumper._resource_objects['LatexNode'])
+                del frag
+                gc.collect()
+                self.assertIsNone(nodes_ref())
+                self.assertTrue(
+                    len(dumper._resource_objects['LatexNode']) < num_tracked
+                )
+            with self.assertRaises(ValueError):
+                dumper.add_object_dump('f2', env.make_fragment('Two'))
+
+
+### END_TEST_FLM_SKIP
 
 
 if __name__ == '__main__':
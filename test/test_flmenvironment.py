@@ -288,6 +288,75 @@ Hello ‘world’. Does this "work" or does it “function?”
         self.assertEqual(frag1.nodes.flm_blocks[1][0].flm_chars_value, r"""
 It does—doesn’t it? Maybe…
 """.strip())
+    def test_reuse_frozen_latex_context(self):
+        environ = make_standard_environment(standard_features())
+        self.assertTrue(environ.latex_context.frozen)
+
+        environ2 = make_standard_environment(
+            standard_features(),
+            latex_context=environ.latex_context,
+        )
+        self.assertIs(environ2.latex_context, environ.latex_context)
+        self.assertIs(environ2.parsing_state.latex_context, environ.latex_context)
+        self.assertIsNot(environ2.parsing_state, environ.parsing_state)
+
+        frag = environ2.make_fragment(r'Hello \emph{world}', standalone_mode=True)
+        self.assertEqual(
+            frag.render_standalone(HtmlFragmentRenderer()),
+            'Hello <span class="textit">world</span>'
+        )
+
+    def test_reuse_frozen_latex_context_with_other_features_raises(self):
+        environ = make_standard_environment(standard_features())
+        with self.assertRaises(ValueError):
+            make_standard_environment(
+                standard_features(defterm=False),
+                latex_context=environ.latex_context,
+            )
+
+    def test_reuse_frozen_latex_context_with_more_features_raises(self):
+        environ = make_standard_environment(standard_features(defterm=False))
+        with self.assertRaises(ValueError):
+            make_standard_environment(
+                standard_features(),
+                latex_context=environ.latex_context,
+            )
+
+    def test_reuse_frozen_latex_context_not_from_environment_raises(self):
+        latex_context = LatexContextDb()
+        latex_context.freeze()
+        with self.assertRaises(ValueError):
+            make_standard_environment(
+                standard_features(),
+                latex_context=latex_context,
+            )
+
+### BEGIN_TEST_FLM_SKIP
+    def test_reuse_frozen_latex_context_with_other_config_raises(self):
+        from flm.feature.substmacros import FeatureSubstMacros
+        def _substmacros(content):
+            return FeatureSubstMacros(definitions={
+                'macros': { 'foo': { 'content': content, 'arguments_spec_list': '[{' } },
+            })
+
+        environ = make_standard_environment(
+            standard_features() + [ _substmacros('AAA#2') ]
+        )
+
+        # same configuration, different feature instances
+        environ2 = make_standard_environment(
+            standard_features() + [ _substmacros('AAA#2') ],
+            latex_context=environ.latex_context,
+        )
+        frag = environ2.make_fragment(r'\foo{x}', standalone_mode=True)
+        self.assertEqual(frag.render_standalone(HtmlFragmentRenderer()), 'AAAx')
+
+        with self.assertRaises(ValueError):
+            make_standard_environment(
+                standard_features() + [ _substmacros('BBB#2') ],
+                latex_context=environ.latex_context,
+            )
+### END_TEST_FLM_SKIP
 
 
 
@@ -1,9 +1,10 @@
 import unittest
 
-from flm.flmfragment import FLMFragment
+from flm.flmfragment import FLMFragment, _NodeListTruncator
 from flm.flmenvironment import make_standard_environment
 from flm.stdfeatures import standard_features
 from flm.fragmentrenderer.html import HtmlFragmentRenderer
+from flm.flmrecomposer import FLMNodesFlmRecomposer
 
 import pylatexenc.latexnodes.nodes as latexnodes_nodes
 from pylatexenc.latexnodes import LatexWalkerParseError
@@ -139,6 +140,64 @@ with two newline characters.
         self.assertEqual(frag_1.nodes[1].macroname, 'emph')
         self.assertEqual(frag_1.nodes[1].nodeargd.argnlist[0].nodelist[0].chars, 'an ...')
 
+    def test_truncate_memoized(self):
+
+        env = mk_flm_environ()
+
+        s = r'''
+Here is \emph{an example} of text.
+
+Here is another \textit{paragraph}.
+'''.strip()
+
+        frag_full = FLMFragment(
+            s,
+            env,
+            what='example text fragment'
+        )
+
+        frag_1 = frag_full.truncate_to(chars=16)
+        self.assertTrue(frag_full.truncate_to(chars=16) is frag_1)
+        frag_2 = frag_full.truncate_to(chars=16, truncation_marker=' ...')
+        self.assertTrue(frag_2 is not frag_1)
+        self.assertEqual(frag_2.nodes[1].nodeargd.argnlist[0].nodelist[0].chars,
+                         'an ...')
+
+        self.assertTrue(frag_full.get_first_paragraph()
+                        is frag_full.get_first_paragraph())
+
+    def test_truncate_indexed_many_lengths(self):
+
+        env = mk_flm_environ()
+
+        s = r'''
+Here is \emph{an example of a \textbf{FLM} fragment} of text.
+Some math \(a+b\) and more text follows here.
+
+Here is another \textit{paragraph}.
+ It is separated from the previous one with two newline characters.
+'''.strip()
+
+        frag_full = FLMFragment(
+            s,
+            env,
+            what='example text fragment'
+        )
+
+        recomposer = FLMNodesFlmRecomposer()
+
+        # the indexed truncation gives the same result as truncating the full
+        # node list from the start
+        for chars in range(-1, 200, 3):
+            for min_chars in [None, 5, 40]:
+                frag_t = frag_full.truncate_to(chars=chars, min_chars=min_chars)
+                nodes_ref = _NodeListTruncator(
+                    chars=chars, min_chars=min_chars, truncation_marker=' …'
+                ).truncate_node_list(frag_full.nodes)
+                self.assertEqual(
+                    recomposer.recompose_flm_text(frag_t.nodes),
+                    recomposer.recompose_flm_text(nodes_ref),
+                )
 
 
     def test_truncate_no_modif_original(self):
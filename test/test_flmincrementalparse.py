@@ -0,0 +1,197 @@
+### BEGIN_TEST_FLM_SKIP
+# incremental parsing is only available in Python
+
+import unittest
+
+from pylatexenc.latexnodes import LatexWalkerParseError, LatexWalkerLocatedError
+import pylatexenc.latexnodes.nodes as latexnodes_nodes
+
+from flm.flmenvironment import make_standard_environment
+from flm.stdfeatures import standard_features
+from flm.fragmentrenderer.html import HtmlFragmentRenderer
+from flm.flmincrementalparse import (
+    find_text_edit,
+    reparse_fragment_edit,
+    reparse_fragment_text,
+)
+
+
+def mk_flm_environ(**kwargs):
+    features = standard_features(**kwargs)
+    return make_standard_environment(features)
+
+
+def _tree_signature(x):
+    # Everything that should be equal in an incrementally reparsed fragment
+    # and in a freshly parsed one.
+    if x is None or isinstance(x, (str, int, bool)):
+        return x
+    if isinstance(x, (list, tuple)):
+        return [ _tree_signature(y) for y in x ]
+    if isinstance(x, latexnodes_nodes.LatexNodeList):
+        return [
+            'NodeList', x.pos, x.pos_end,
+            _tree_signature(x.nodelist),
+            _tree_signature(getattr(x, 'flm_blocks', None)),
+        ]
+    sig = [ x.__class__.__name__, x.pos, x.pos_end, x.latex_verbatim(),
+            getattr(x, 'flm_chars_value', None) ]
+    if getattr(x, 'nodelist', None) is not None:
+        sig.append(_tree_signature(x.nodelist))
+    if getattr(x, 'nodeargd', None) is not None:
+        sig.append(_tree_signature(x.nodeargd.argnlist))
+    return sig
+
+
+_doc = r'''
+Hello \emph{world}, this is ``the first'' paragraph -- with math \(a+b\).
+
+\section{A section}\label{sec:a}
+Text with a footnote\footnote{Footnote \textbf{text}}.
+
+\begin{enumerate}
+\item One
+
+\item Two, see \ref{sec:a}
+\end{enumerate}
+
+\paragraph{Run-in} heading paragraph.
+\begin{align}
+  x &= y \label{eq:a}
+\end{align}
+Final paragraph.
+'''
+
+
+class TestFindTextEdit(unittest.TestCase):
+
+    def test_no_change(self):
+        self.assertIsNone(find_text_edit('abc', 'abc'))
+
+    def test_insertion(self):
+        self.assertEqual(find_text_edit('abcdef', 'abcXYdef'), (3, 0, 'XY'))
+
+    def test_deletion(self):
+        self.assertEqual(find_text_edit('abcdef', 'abf'), (2, 3, ''))
+
+    def test_replacement(self):
+        self.assertEqual(find_text_edit('abcdef', 'abXef'), (2, 2, 'X'))
+
+    def test_repeated_characters(self):
+        self.assertEqual(find_text_edit('aaaa', 'aaaaaa'), (4, 0, 'aa'))
+        self.assertEqual(find_text_edit('', 'abc'), (0, 0, 'abc'))
+        self.assertEqual(find_text_edit('abc', ''), (0, 3, ''))
+
+
+class TestReparseFragmentEdit(unittest.TestCase):
+
+    maxDiff = None
+
+    def assert_reparse_equals_full_parse(self, flm_text, offset, removed_length,
+                                         inserted_text, **kwargs):
+        environ = mk_flm_environ()
+        new_text = flm_text[:offset] + inserted_text + flm_text[offset+removed_length:]
+        fragment = environ.make_fragment(flm_text, **kwargs)
+        new_fragment = reparse_fragment_edit(fragment, offset, removed_length,
+                                             inserted_text)
+        full_fragment = environ.make_fragment(new_text, **kwargs)
+        self.assertEqual(new_fragment.flm_text, new_text)
+        self.assertEqual(new_fragment.latex_walker.s, new_text)
+        self.assertEqual(_tree_signature(new_fragment.nodes),
+                         _tree_signature(full_fragment.nodes))
+        return new_fragment
+
+    def test_edit_in_paragraph(self):
+        offset = _doc.index('footnote')
+        self.assert_reparse_equals_full_parse(_doc, offset, 0, r'\emph{long} ')
+
+    def test_edits_everywhere(self):
+        for inserted_text in ['X', '\n\n', '', r'\textbf{Y}', '\n\nNew para\n']:
+            for offset in range(0, len(_doc), 7):
+                removed_length = min(3, len(_doc) - offset)
+                with self.subTest(offset=offset, inserted_text=inserted_text):
+                    try:
+                        environ = mk_flm_environ()
+                        environ.make_fragment(
+                            _doc[:offset] + inserted_text + _doc[offset+removed_length:],
+                            silent=True,
+                        )
+                    except LatexWalkerLocatedError:
+                        continue
+                    self.assert_reparse_equals_full_parse(
+                        _doc, offset, removed_length, inserted_text
+                    )
+
+    def test_reuses_nodes(self):
+        environ = mk_flm_environ()
+        fragment = environ.make_fragment(_doc)
+        first_node = fragment.nodes[0]
+        last_node = fragment.nodes[-1]
+        offset = _doc.index('A section')
+        new_fragment = reparse_fragment_edit(fragment, offset, 1, 'The')
+        self.assertIs(new_fragment.nodes[0], first_node)
+        self.assertIs(new_fragment.nodes[-1], last_node)
+        self.assertEqual(last_node.pos, _doc.index('Final paragraph') + 1)
+        self.assertEqual(last_node.latex_verbatim(), '\nFinal paragraph.\n')
+
+    def test_line_numbers(self):
+        environ = mk_flm_environ()
+        fragment = environ.make_fragment(_doc)
+        new_text = _doc.replace('the first', 'the\n\nvery\nfirst')
+        new_fragment = reparse_fragment_text(fragment, new_text)
+        full_fragment = environ.make_fragment(new_text)
+        pos = new_text.index('Final paragraph')
+        self.assertEqual(
+            new_fragment.latex_walker.pos_to_lineno_colno(pos),
+            full_fragment.latex_walker.pos_to_lineno_colno(pos)
+        )
+        self.assertEqual(new_fragment.latex_walker.pos_to_lineno_colno(pos)[1], 0)
+
+    def test_edit_merges_paragraphs(self):
+        # the comment swallows the paragraph break that follows it
+        text = 'Hello world.\n\nSecond paragraph.\n\nThird paragraph.\n\nFourth.'
+        new_fragment = self.assert_reparse_equals_full_parse(
+            text, text.index('\n\nThird'), 1, '%%'
+        )
+        self.assertEqual(len(new_fragment.nodes.flm_blocks), 3)
+
+    def test_inline_fragment(self):
+        self.assert_reparse_equals_full_parse(
+            r'Inline \emph{text} with math \(x\).', 7, 0, r'\textbf{bold} ',
+            is_block_level=False,
+        )
+
+    def test_render(self):
+        environ = mk_flm_environ()
+        fragment = environ.make_fragment(_doc.split(r'\section')[0],
+                                         standalone_mode=True)
+        new_text = fragment.flm_text.replace('world', 'there')
+        new_fragment = reparse_fragment_text(fragment, new_text)
+        self.assertEqual(
+            new_fragment.render_standalone(HtmlFragmentRenderer()),
+            environ.make_fragment(new_text, standalone_mode=True)
+                .render_standalone(HtmlFragmentRenderer()),
+        )
+
+    def test_parse_error_keeps_fragment(self):
+        environ = mk_flm_environ()
+        fragment = environ.make_fragment(_doc)
+        offset = _doc.index('Final paragraph')
+        with self.assertRaises(LatexWalkerParseError):
+            reparse_fragment_edit(fragment, offset, 0, r'\invalidmacro ')
+        # the original fragment is left untouched
+        self.assertEqual(fragment.latex_walker.s, _doc)
+        self.assertEqual(fragment.nodes[-1].latex_verbatim(), '\nFinal paragraph.\n')
+
+    def test_invalid_edit(self):
+        environ = mk_flm_environ()
+        fragment = environ.make_fragment('Hello world.')
+        with self.assertRaises(ValueError):
+            reparse_fragment_edit(fragment, 10, 5, 'X')
+
+
+### END_TEST_FLM_SKIP
+
+
+if __name__ == '__main__':
+    unittest.main()
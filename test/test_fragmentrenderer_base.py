@@ -1,9 +1,11 @@
 import unittest
 
 from pylatexenc.latexnodes import LatexWalkerLocatedError
+from pylatexenc.latexnodes.nodes import LatexNodeList
 
 from flm.fragmentrenderer import FragmentRenderer
 from flm.flmrendercontext import FLMRenderContext
+from flm.flmrecomposer import FLMNodesFlmRecomposer
 
 from flm.flmenvironment import make_standard_environment
 from flm.stdfeatures import standard_features
@@ -414,6 +416,33 @@ class TestRenderNodelistErrors(unittest.TestCase):
             fr.render_nodelist(frag.nodes, None, is_block_level=False)
 
 
+class TestRenderNodeDispatch(unittest.TestCase):
+
+    def test_handlers_cached_per_node_class(self):
+        env = mk_flm_environ()
+        frag = env.make_fragment(r'Hello \textbf{world} and {more} text', what='test')
+        store = {'calls': []}
+        fr = _MyTestFragmentRenderer(store)
+        result = fr.render_fragment(frag, None)
+        self.assertEqual(result, 'Hello [world] and more text')
+        handlers = fr._render_node_handlers
+        self.assertEqual(
+            sorted([ h.__name__ for h in handlers.values() ]),
+            ['render_node_chars', 'render_node_group', 'render_node_macro'],
+        )
+
+    def test_node_subclass_dispatch(self):
+        from pylatexenc.latexnodes import nodes
+        class MyCharsNode(nodes.LatexCharsNode):
+            pass
+        store = {'calls': []}
+        fr = _MyTestFragmentRenderer(store)
+        n = MyCharsNode(chars='abc')
+        self.assertEqual(fr.render_node(n, None), 'abc')
+        self.assertEqual(fr._render_node_handlers[MyCharsNode].__name__,
+                         'render_node_chars')
+
+
 class TestAbstractMethodsRaise(unittest.TestCase):
 
     # Use Exception instead of RuntimeError for Transcrypt compatibility
@@ -554,6 +583,41 @@ class TestRenderMathContent(unittest.TestCase):
         self.assertEqual(verbatim_calls[0][1][2], ['inline-math'])  # annotations
 
 
+class TestRecomposeLatex(unittest.TestCase):
+
+    def _get_math_node(self, s):
+        env = mk_flm_environ()
+        frag = env.make_fragment(s, what='test')
+        return frag.nodes[0]
+
+    def test_recompose_matches_recomposer(self):
+        node = self._get_math_node(r'\(\frac{a}{b} + c_{1}\)')
+        fr = _MyTestFragmentRenderer({'calls': []})
+        expected = FLMNodesFlmRecomposer().recompose_flm_text(node.nodelist)
+        self.assertEqual(fr.recompose_latex(node.nodelist), expected)
+        self.assertEqual(fr.recompose_latex(node.nodelist), expected)
+        self.assertEqual(fr.recompose_latex(node), r'\(' + expected + r'\)')
+
+    def test_recompose_is_cached_on_node(self):
+        node = self._get_math_node(r'\(a+b\)')
+        fr = _MyTestFragmentRenderer({'calls': []})
+        self.assertEqual(fr.recompose_latex(node.nodelist), 'a+b')
+        self.assertEqual(node.nodelist._flm_recomposed_flm_text, 'a+b')
+        # the cached value is shared by all renderers
+        fr2 = _MyTestFragmentRenderer({'calls': []})
+        self.assertEqual(fr2.recompose_latex(node.nodelist), 'a+b')
+
+    def test_recompose_new_nodelist_of_recomposed_nodes(self):
+        node = self._get_math_node(r'\(x \alpha\)')
+        fr = _MyTestFragmentRenderer({'calls': []})
+        self.assertEqual(fr.recompose_latex(node.nodelist), r'x \alpha')
+        new_nodelist = LatexNodeList(list(node.nodelist) + list(node.nodelist))
+        self.assertEqual(
+            fr.recompose_latex(new_nodelist),
+            FLMNodesFlmRecomposer().recompose_flm_text(new_nodelist)
+        )
+
+
 class TestRenderNodelistInlineForced(unittest.TestCase):
 
     maxDiff = None
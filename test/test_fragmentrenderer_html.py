@@ -98,6 +98,31 @@ class TestHtmlEscape(unittest.TestCase):
         fr = HtmlFragmentRenderer()
         self.assertEqual(fr.htmlescape('\u2003'), '&emsp;')
 
+    def test_htmlescape_punctuation_and_figure_space(self):
+        fr = HtmlFragmentRenderer()
+        self.assertEqual(fr.htmlescape('\u2008|\u2007'), '&puncsp;|&numsp;')
+
+    def test_htmlescape_mixed_unicode_and_entities(self):
+        fr = HtmlFragmentRenderer()
+        self.assertEqual(
+            fr.htmlescape('caf\u00e9\u00a0<b>\u2009&\u2003\'x\''),
+            'caf\u00e9&nbsp;&lt;b&gt;&thinsp;&amp;&emsp;&#x27;x&#x27;'
+        )
+
+    def test_htmlescape_long_string(self):
+        fr = HtmlFragmentRenderer()
+        value = ('Some text\u00a0with <tags> & "quotes". ' * 50)
+        self.assertEqual(
+            fr.htmlescape(value),
+            'Some text&nbsp;with &lt;tags&gt; &amp; &quot;quotes&quot;. ' * 50
+        )
+
+    def test_htmlescape_memoized_result_stable(self):
+        fr = HtmlFragmentRenderer()
+        self.assertEqual(fr.htmlescape('a < b'), 'a &lt; b')
+        self.assertEqual(fr.htmlescape('a < b'), 'a &lt; b')
+        self.assertEqual(HtmlFragmentRenderer().htmlescape('a < b'), 'a &lt; b')
+
     def test_htmlescape_attribute_plain_ampersand_unchanged(self):
         fr = HtmlFragmentRenderer()
         self.assertEqual(
@@ -1079,6 +1104,35 @@ class TestRenderMathContent(unittest.TestCase):
             r'\begin{align*}a = b\end{align*}</span>'
         )
 
+    def test_prerender_math_fn(self):
+        calls = []
+        def prerender_math_fn(latex, displaytype, environmentname=None, **kwargs):
+            calls.append( (latex, displaytype, environmentname) )
+            return '<math>' + latex + '</math>'
+        fr = HtmlFragmentRenderer()
+        fr.prerender_math_fn = prerender_math_fn
+        nodelist = _make_nodelist('a = b')
+        result = fr.render_math_content(
+            (r'\[', r'\]'), nodelist, None, 'display', environmentname='align'
+        )
+        self.assertEqual(
+            result,
+            '<span class="display-math env-align prerendered-math">'
+            '<math>a = b</math></span>'
+        )
+        self.assertEqual(calls, [ ('a = b', 'display', 'align') ])
+
+    def test_prerender_math_fn_fallback(self):
+        def prerender_math_fn(latex, displaytype, environmentname=None, **kwargs):
+            return None
+        fr = HtmlFragmentRenderer()
+        fr.prerender_math_fn = prerender_math_fn
+        nodelist = _make_nodelist('x^2')
+        result = fr.render_math_content(
+            (r'\(', r'\)'), nodelist, None, 'inline'
+        )
+        self.assertEqual(result, '<span class="inline-math">\\(x^2\\)</span>')
+
     def test_invalid_displaytype_raises(self):
         fr = HtmlFragmentRenderer()
         nodelist = _make_nodelist('x')
@@ -215,6 +215,52 @@ class TestLatexJoin(unittest.TestCase):
         self.assertEqual(fr._latex_join('', 'x'), 'x')
 
 
+# ---- render_join ----
+
+class TestRenderJoin(unittest.TestCase):
+
+    def _iterated_latex_join(self, fr, pieces):
+        result = ''
+        for p in pieces:
+            result = fr._latex_join(result, p)
+        return result
+
+    def test_matches_iterated_latex_join(self):
+        fr = LatexFragmentRenderer()
+        rc = FLMStandaloneModeRenderContext(fr)
+        for pieces in [
+                [],
+                ['hello', 'world'],
+                ['a % comment', 'b', 'c'],
+                [r'\textbf', 'x', r'\cite', '{a}'],
+                [r'\foo', 'bar', 'baz', r'\\', 'q'],
+                [r'x\\', 'abc', 'def'],
+                ['a%', '', '', 'b'],
+                [r'\x', '', 'y'],
+                [r'\foo', '\n', 'x'],
+                [r'\foo\n', 'x'],
+                ['50\\%', 'done', r'\relax'],
+        ]:
+            self.assertEqual(
+                fr.render_join(pieces, rc),
+                self._iterated_latex_join(fr, pieces)
+            )
+
+    def test_letter_run_spanning_pieces(self):
+        fr = LatexFragmentRenderer()
+        rc = FLMStandaloneModeRenderContext(fr)
+        self.assertEqual(fr.render_join(['\\', 'ab', 'cd', 'e'], rc), r'\ab cde')
+
+    def test_long_paragraph(self):
+        fr = LatexFragmentRenderer()
+        rc = FLMStandaloneModeRenderContext(fr)
+        pieces = ['Word ', r'\emph', '{x}', '% c', ' and ', r'\cite', '{a}'] * 500
+        self.assertEqual(
+            fr.render_join(pieces, rc),
+            self._iterated_latex_join(fr, pieces)
+        )
+
+
 # ---- render_value / render_empty_error_placeholder / render_nothing ----
 
 class TestRenderBasicMethods(unittest.TestCase):